@@ -15,6 +15,7 @@ from dotenv import load_dotenv
 
 from src.core.converter import NL2SQLConverter
 from src.core.async_converter import AsyncNL2SQLConverter
+from src.core.llm_provider import close_http_client
 from src.models.sql_query import DatabaseType
 from src.services.chat_service import ChatService
 from src.services.async_chat_service import AsyncChatService
@@ -148,6 +149,7 @@ async def lifespan(app: FastAPI):
         converter.close()
     if async_chat_service:
         await async_chat_service.close()
+    close_http_client()
     logger.info("✓ Server shut down successfully")
 
 
@@ -1,22 +1,16 @@
 """Core modules for NL2SQL conversion"""
 
+import importlib
+
 from src.core.converter import NL2SQLConverter
 from src.core.schema_extractor import SchemaExtractor
 from src.core.query_executor import QueryExecutor
-from src.core.embedding_provider import (
-    get_embedder,
-    get_default_embedder,
-    EmbeddingProvider,
-    EmbeddingConfig
-)
-from src.core.semantic_cache import (
-    SemanticCache,
-    get_semantic_cache,
-    reset_semantic_cache
-)
+from src.core.db_engine import get_engine, dispose_engines
 from src.core.async_llm_provider import (
     AsyncLLMClient,
     AsyncLLMPool,
+    AdmissionController,
+    RateLimiter,
     get_async_llm_client,
     reset_async_client,
     run_with_timeout,
@@ -51,16 +45,44 @@ from src.core.query_plan_cache import (
     reset_query_plan_cache
 )
 
+# Embedding-backed modules pull in numpy (and torch for local models), so they
+# are imported on first attribute access rather than with the package
+_LAZY_EXPORTS = {
+    "get_embedder": "src.core.embedding_provider",
+    "get_default_embedder": "src.core.embedding_provider",
+    "EmbeddingProvider": "src.core.embedding_provider",
+    "EmbeddingConfig": "src.core.embedding_provider",
+    "ExampleRetriever": "src.core.example_retriever",
+    "SemanticCache": "src.core.semantic_cache",
+    "get_semantic_cache": "src.core.semantic_cache",
+    "reset_semantic_cache": "src.core.semantic_cache",
+}
+
+
+def __getattr__(name):
+    """Import lazily exported names on first access"""
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
 __all__ = [
     # Sync
     "NL2SQLConverter", 
     "SchemaExtractor", 
     "QueryExecutor",
+    "get_engine",
+    "dispose_engines",
     # Async
     "AsyncNL2SQLConverter",
     "async_nl2sql",
     "AsyncLLMClient",
     "AsyncLLMPool",
+    "AdmissionController",
+    "RateLimiter",
     "get_async_llm_client",
     "reset_async_client",
     "run_with_timeout",
@@ -73,6 +95,7 @@ __all__ = [
     "SemanticCache",
     "get_semantic_cache",
     "reset_semantic_cache",
+    "ExampleRetriever",
     # Query Decomposition
     "QueryDecomposer",
     "DecomposedQuery",
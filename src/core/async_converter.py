@@ -4,7 +4,8 @@ import os
 import re
 import logging
 import asyncio
-from typing import Optional, List, Dict, Any, Tuple
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Tuple, FrozenSet, ClassVar, TYPE_CHECKING
 
 from src.models.sql_query import (
     SQLQuery, 
@@ -32,7 +33,7 @@ from src.core.sql_validator import SQLValidator, SQLPostProcessor, ValidationRes
 from src.core.schema_version_manager import SchemaVersionManager
 from src.core.cache_manager import CacheManager, get_cache_manager, CacheLevel
 from src.core.prompt_builder import PromptBuilder, build_nl2sql_prompt
-from src.core.semantic_cache import SemanticCache, get_semantic_cache
+from src.core.query_decomposer import QueryDecomposer, DecompositionStrategy
 from src.prompts.system_prompt import (
     get_full_system_prompt, 
     get_user_prompt_template,
@@ -43,6 +44,10 @@ from src.prompts.few_shot_examples import get_few_shot_examples, format_examples
 from src.utils.validation import validate_query_against_schema
 from src.utils.formatting import format_sql
 
+if TYPE_CHECKING:
+    # Imported in initialize(): embedders pull in numpy and, for local models, torch
+    from src.core.semantic_cache import SemanticCache
+
 logger = logging.getLogger(__name__)
 
 
@@ -58,6 +63,41 @@ SCHEMA_QUERY_PATTERNS = [
     r'\bdesc(ribe)?\s+\w+\b',
 ]
 
+# One alternation compiled at import, so a question is scanned once rather than
+# once per pattern; questions are lowercased before matching so no IGNORECASE
+_SCHEMA_QUERY_RE = re.compile("|".join(f"(?:{p})" for p in SCHEMA_QUERY_PATTERNS))
+
+# Every pattern above contains at least one of these substrings, so a question
+# with none of them can skip the regex pass entirely (the common analytical case).
+# Plain substring checks; false positives ("db" in "feedback") just fall through
+# to the regex.
+_SCHEMA_TRIGGER_KEYWORDS = (
+    "schema", "cấu trúc", "structure",
+    "table", "bảng",
+    "desc", "mô tả", "giải thích",
+    "database", "db", "show",
+)
+
+# High-confidence plain SELECTs passing these cheap checks (and reading only
+# known tables) skip full validation
+_QUICK_ACCEPT_CONFIDENCE = 0.9
+_QUICK_SQL_RE = re.compile(r'^\s*(SELECT|WITH)\b', re.IGNORECASE)
+_FORBIDDEN_SQL_RE = re.compile(
+    r'\b(DROP|TRUNCATE|DELETE|UPDATE|INSERT|ALTER|CREATE|GRANT|REVOKE)\b',
+    re.IGNORECASE
+)
+
+
+@lru_cache(maxsize=32)
+def _cached_system_prompt(schema_text: str, database_type: str) -> str:
+    """
+    Fallback system prompt for a schema text, assembled once
+    
+    Shared across converters (they are often created per request), and the
+    same string is returned each time, keeping the prompt prefix stable.
+    """
+    return get_full_system_prompt(schema_text, database_type)
+
 
 class AsyncNL2SQLConverter:
     """
@@ -70,6 +110,51 @@ class AsyncNL2SQLConverter:
     - Concurrent cache operations
     """
     
+    # No per-instance __dict__: converters may be created per request (async_nl2sql)
+    __slots__ = (
+        "connection_string",
+        "database_type",
+        "enable_few_shot",
+        "enable_auto_execute",
+        "default_limit",
+        "enable_caching",
+        "llm_timeout",
+        "enable_streaming",
+        "max_schema_tokens",
+        "llm_config",
+        "model",
+        "_async_client",
+        "schema_extractor",
+        "schema",
+        "schema_text",
+        "_table_names",
+        "_table_name_set",
+        "_table_names_joined",
+        "_schema_summary",
+        "query_executor",
+        "schema_optimizer",
+        "query_preprocessor",
+        "sql_validator",
+        "sql_postprocessor",
+        "schema_version_manager",
+        "cache_manager",
+        "prompt_builder",
+        "semantic_cache",
+        "_initialized",
+    )
+    
+    # Metadata query per database type (MySQL can query INFORMATION_SCHEMA directly)
+    _METADATA_SQL: ClassVar[Dict[DatabaseType, str]] = {
+        DatabaseType.MYSQL: """SELECT TABLE_NAME, TABLE_ROWS, TABLE_COMMENT 
+FROM INFORMATION_SCHEMA.TABLES 
+WHERE TABLE_SCHEMA = DATABASE()
+ORDER BY TABLE_NAME""",
+        DatabaseType.POSTGRESQL: """SELECT tablename, schemaname 
+FROM pg_catalog.pg_tables 
+WHERE schemaname NOT IN ('pg_catalog', 'information_schema')
+ORDER BY tablename""",
+    }
+    
     def __init__(
         self,
         connection_string: str,
@@ -79,7 +164,9 @@ class AsyncNL2SQLConverter:
         enable_auto_execute: bool = False,
         default_limit: int = 100,
         enable_caching: bool = True,
-        llm_timeout: float = 30.0
+        llm_timeout: float = 30.0,
+        enable_streaming: bool = False,
+        max_schema_tokens: int = 4000
     ):
         """
         Initialize Async NL2SQL converter
@@ -93,6 +180,10 @@ class AsyncNL2SQLConverter:
             default_limit: Default LIMIT for queries
             enable_caching: Enable caching
             llm_timeout: Timeout for LLM calls in seconds
+            enable_streaming: Stream LLM output and validate the query while
+                the remaining fields are still being generated
+            max_schema_tokens: Token budget for the schema in prompts (larger schemas
+                are pruned to the tables matching the question)
         """
         self.connection_string = connection_string
         self.database_type = database_type
@@ -101,6 +192,8 @@ class AsyncNL2SQLConverter:
         self.default_limit = default_limit
         self.enable_caching = enable_caching
         self.llm_timeout = llm_timeout
+        self.enable_streaming = enable_streaming
+        self.max_schema_tokens = max_schema_tokens
         
         # Initialize LLM config
         if llm_config is None:
@@ -116,6 +209,10 @@ class AsyncNL2SQLConverter:
         self.schema_extractor = SchemaExtractor(connection_string, database_type)
         self.schema: Optional[DatabaseSchema] = None
         self.schema_text: Optional[str] = None
+        self._table_names: List[str] = []  # Set in _init_optimizers
+        self._table_name_set: FrozenSet[str] = frozenset()  # Lower-cased, for schema checks
+        self._table_names_joined = ""  # Self-correction prompt's table list
+        self._schema_summary: Optional[str] = None  # Built on first schema question
         
         # Query executor
         self.query_executor = QueryExecutor(
@@ -134,7 +231,7 @@ class AsyncNL2SQLConverter:
         self.schema_version_manager = SchemaVersionManager()
         self.cache_manager: Optional[CacheManager] = None
         self.prompt_builder: Optional[PromptBuilder] = None
-        self.semantic_cache: Optional[SemanticCache] = None
+        self.semantic_cache: Optional["SemanticCache"] = None
         
         self._initialized = False
         
@@ -147,8 +244,9 @@ class AsyncNL2SQLConverter:
         if self._initialized:
             return
         
-        # Initialize async LLM client
+        # Initialize async LLM client (built now so the first request doesn't pay for it)
         self._async_client = AsyncLLMClient(self.llm_config)
+        await self._async_client.warmup()
         
         # Load schema
         await asyncio.get_event_loop().run_in_executor(
@@ -164,6 +262,7 @@ class AsyncNL2SQLConverter:
                     schema_version_manager=self.schema_version_manager,
                     enable_caching=True
                 )
+                from src.core.semantic_cache import get_semantic_cache
                 self.semantic_cache = get_semantic_cache()
                 logger.info("Async converter: Caching enabled")
             except Exception as e:
@@ -185,7 +284,14 @@ class AsyncNL2SQLConverter:
             schema_changed = self.schema_version_manager.update_schema(self.schema)
             if schema_changed and self.cache_manager:
                 version = self.schema_version_manager.get_current_version()
-                self.cache_manager.update_schema_version(version)
+                try:
+                    loop = asyncio.get_running_loop()
+                except RuntimeError:
+                    # Worker thread (e.g. initialize's executor): blocking is fine here
+                    self.cache_manager.update_schema_version(version)
+                else:
+                    # On the event loop: invalidate through the async Redis client
+                    loop.create_task(self.cache_manager.aupdate_schema_version(version))
         
         logger.info(f"Schema loaded: {self.schema.total_tables} tables")
         return self.schema
@@ -195,7 +301,7 @@ class AsyncNL2SQLConverter:
         if self.schema is None:
             return
         
-        self.schema_optimizer = SchemaOptimizer(self.schema)
+        self.schema_optimizer = SchemaOptimizer(self.schema, model=self.model)
         
         table_names = [t.table_name for t in self.schema.tables]
         column_names = []
@@ -205,6 +311,10 @@ class AsyncNL2SQLConverter:
             cols = [c["name"] for c in table.columns]
             column_names.extend(cols)
             column_map[table.table_name] = cols
+        self._table_names = table_names
+        self._table_name_set = frozenset(t.lower() for t in table_names)
+        self._table_names_joined = ", ".join(table_names)
+        self._schema_summary = None
         
         self.query_preprocessor = QueryPreprocessor(table_names, column_names)
         self.sql_validator = SQLValidator(
@@ -216,41 +326,27 @@ class AsyncNL2SQLConverter:
     def _is_schema_query(self, question: str) -> bool:
         """Check if question is about schema/metadata"""
         question_lower = question.lower()
-        for pattern in SCHEMA_QUERY_PATTERNS:
-            if re.search(pattern, question_lower, re.IGNORECASE):
-                return True
-        return False
+        if not any(keyword in question_lower for keyword in _SCHEMA_TRIGGER_KEYWORDS):
+            return False
+        return _SCHEMA_QUERY_RE.search(question_lower) is not None
     
     def _generate_schema_response(self, question: str) -> SQLQuery:
         """Generate response for schema questions"""
         if self.schema is None:
             self.load_schema()
         
-        table_names = self.schema_extractor.get_table_names()
-        
-        schema_info = [f"Database có {len(table_names)} bảng:"]
-        for table in self.schema.tables:
-            col_count = len(table.columns)
-            pk_cols = [c["name"] for c in table.columns if c.get("primary_key", False)]
-            pk_info = f" (PK: {', '.join(pk_cols)})" if pk_cols else ""
-            schema_info.append(f"  - {table.table_name}: {col_count} cột{pk_info}")
-        
-        explanation = "\n".join(schema_info)
-        
-        if self.database_type == DatabaseType.MYSQL:
-            sql = """SELECT TABLE_NAME, TABLE_ROWS, TABLE_COMMENT 
-FROM INFORMATION_SCHEMA.TABLES 
-WHERE TABLE_SCHEMA = DATABASE()
-ORDER BY TABLE_NAME"""
-        else:
-            sql = """SELECT tablename, schemaname 
-FROM pg_catalog.pg_tables 
-WHERE schemaname NOT IN ('pg_catalog', 'information_schema')
-ORDER BY tablename"""
+        if self._schema_summary is None:
+            schema_info = [f"Database có {len(self._table_names)} bảng:"]
+            for table in self.schema.tables:
+                col_count = len(table.columns)
+                pk_names = ", ".join(c["name"] for c in table.columns if c.get("primary_key", False))
+                pk_info = f" (PK: {pk_names})" if pk_names else ""
+                schema_info.append(f"  - {table.table_name}: {col_count} cột{pk_info}")
+            self._schema_summary = "\n".join(schema_info)
         
         return SQLQuery(
-            query=sql,
-            explanation=explanation,
+            query=self._METADATA_SQL[self.database_type],
+            explanation=self._schema_summary,
             confidence=1.0,
             tables_used=["INFORMATION_SCHEMA"],
             potential_issues=["Metadata query"]
@@ -293,7 +389,7 @@ ORDER BY tablename"""
         # Try semantic cache first
         if use_cache and self.enable_caching and self.semantic_cache:
             if not conversation_history:
-                cached = self.semantic_cache.get_sql(question, schema_version)
+                cached = await self.semantic_cache.aget_sql(question, schema_version)
                 if cached:
                     entry, similarity = cached
                     logger.info(f"Cache hit (similarity: {similarity:.2f})")
@@ -325,20 +421,29 @@ ORDER BY tablename"""
         
         try:
             # Async LLM call with timeout
-            response = await run_with_timeout(
-                self._async_client.create_completion(
-                    response_model=SQLQuery,
-                    messages=messages,
-                    temperature=temperature,
-                    max_retries=max_retries
-                ),
-                timeout=self.llm_timeout,
-                error_msg=f"LLM call timed out after {self.llm_timeout}s"
-            )
+            validation_result = None
+            if self.enable_streaming:
+                response, validation_result = await run_with_timeout(
+                    self._stream_completion(messages, temperature, max_retries),
+                    timeout=self.llm_timeout,
+                    error_msg=f"LLM call timed out after {self.llm_timeout}s"
+                )
+            else:
+                response = await run_with_timeout(
+                    self._async_client.create_completion(
+                        response_model=SQLQuery,
+                        messages=messages,
+                        temperature=temperature,
+                        max_retries=max_retries
+                    ),
+                    timeout=self.llm_timeout,
+                    error_msg=f"LLM call timed out after {self.llm_timeout}s"
+                )
             
             # Validate and post-process
             response = await self._validate_and_process(
-                response, question, messages, temperature, enable_self_correction
+                response, question, messages, temperature, enable_self_correction,
+                validation_result=validation_result
             )
             
             # Cache successful result
@@ -355,6 +460,56 @@ ORDER BY tablename"""
             logger.error(f"Async SQL generation failed: {e}")
             raise
     
+    async def _stream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_retries: int
+    ) -> Tuple[SQLQuery, Optional[ValidationResult]]:
+        """
+        Stream the LLM response and start validating the query as soon as it
+        stops changing, so validation overlaps the remaining generation
+        
+        Returns:
+            Tuple of (SQLQuery, ValidationResult or None if not validated yet)
+        """
+        loop = asyncio.get_running_loop()
+        validation_future = None
+        validated_query = None
+        last_query = None
+        final = None
+        
+        async for partial in self._async_client.create_completion_stream(
+            response_model=SQLQuery,
+            messages=messages,
+            temperature=temperature,
+            max_retries=max_retries
+        ):
+            final = partial
+            query = partial.query
+            # The query field is emitted first; once it is unchanged across two
+            # chunks the model has moved on to explanation/confidence
+            if validation_future is None and self.sql_validator and query and query == last_query:
+                validated_query = query.strip()
+                validation_future = loop.run_in_executor(
+                    None, self.sql_validator.validate, validated_query
+                )
+            last_query = query
+        
+        if final is None:
+            raise ValueError("LLM stream returned no content")
+        
+        response = SQLQuery.model_validate(final.model_dump())
+        
+        validation_result = None
+        if validation_future is not None:
+            validation_result = await validation_future
+            if validated_query != response.query:
+                # Query changed after validation started - validate again later
+                validation_result = None
+        
+        return response, validation_result
+    
     def _build_messages(
         self,
         original_question: str,
@@ -367,7 +522,7 @@ ORDER BY tablename"""
         """Build messages for LLM"""
         # Get compact schema
         if self.schema_optimizer:
-            compact_schema = self.schema_optimizer.format_compact_schema(include_types=False)
+            compact_schema = self.schema_optimizer.format_budgeted_schema(original_question, self.max_schema_tokens)
             relevant_table_objs = self.schema_optimizer.get_relevant_tables(original_question) if hasattr(self.schema_optimizer, 'get_relevant_tables') else None
             relevant_tables = [t.table_name for t in relevant_table_objs] if relevant_table_objs else None
         else:
@@ -388,35 +543,35 @@ ORDER BY tablename"""
             )
             return built_prompt.messages
         
-        # Fallback to manual prompt building
-        system_prompt = get_full_system_prompt(compact_schema, self.database_type.value)
-        
-        if processed:
-            query_type_hint = get_query_type_prompt(processed.query_type.value)
-            if query_type_hint:
-                system_prompt = f"{system_prompt}\n{query_type_hint}"
-        
-        if self.enable_few_shot:
-            examples = get_relevant_examples(original_question, max_examples=3)
-            if not examples:
-                examples = get_few_shot_examples(self.database_type.value)[:3]
-            examples_text = format_examples_for_prompt(examples)
-            system_prompt = f"{system_prompt}\n\n{examples_text}"
-        
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        if conversation_history:
-            for msg in conversation_history[-6:]:
-                messages.append(msg)
+        # Fallback to manual prompt building. The system prompt stays static so
+        # the provider's prompt-prefix cache can reuse it; per-question examples
+        # and hints go ahead of the question in the user turn.
+        system_prompt = _cached_system_prompt(compact_schema, self.database_type.value)
         
         if processed and processed.normalized != original_question.lower():
             user_prompt = get_user_prompt_template(f"{original_question}\n(Interpreted: {processed.normalized})")
         else:
             user_prompt = get_user_prompt_template(original_question)
         
-        messages.append({"role": "user", "content": user_prompt})
-        
-        return messages
+        context_parts = []
+        if self.enable_few_shot:
+            examples = get_relevant_examples(original_question, max_examples=3)
+            if not examples:
+                examples = get_few_shot_examples(self.database_type.value)[:3]
+            context_parts.append(format_examples_for_prompt(examples))
+        if processed:
+            query_type_hint = get_query_type_prompt(processed.query_type.value)
+            if query_type_hint:
+                context_parts.append(query_type_hint)
+        if context_parts:
+            prompt_context = "\n".join(context_parts)
+            user_prompt = f"{prompt_context}\n\n{user_prompt}"
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            *(conversation_history[-6:] if conversation_history else ()),
+            {"role": "user", "content": user_prompt}
+        ]
     
     async def _validate_and_process(
         self,
@@ -424,11 +579,35 @@ ORDER BY tablename"""
         question: str,
         messages: List[Dict[str, str]],
         temperature: float,
-        enable_self_correction: bool
+        enable_self_correction: bool,
+        validation_result: Optional[ValidationResult] = None
     ) -> SQLQuery:
-        """Validate and post-process response"""
-        if self.sql_validator:
-            validation_result = self.sql_validator.validate(response.query)
+        """
+        Validate and post-process response
+        
+        Args:
+            validation_result: Result already computed for response.query
+                (e.g. while streaming); validated here if None
+        """
+        loop = asyncio.get_running_loop()
+        
+        quick_accept = bool(
+            response.confidence >= _QUICK_ACCEPT_CONFIDENCE
+            and _QUICK_SQL_RE.match(response.query)
+            and not _FORBIDDEN_SQL_RE.search(response.query)
+        )
+        if quick_accept and self._table_name_set:
+            # Confidence is self-reported: still reject invented tables cheaply
+            quick_accept, _ = await loop.run_in_executor(
+                None, validate_query_against_schema, response.query, self._table_name_set
+            )
+        
+        # A result computed while streaming is always honoured, even for a quick accept
+        if self.sql_validator and (validation_result is not None or not quick_accept):
+            if validation_result is None:
+                validation_result = await loop.run_in_executor(
+                    None, self.sql_validator.validate, response.query
+                )
             
             if not validation_result.is_valid:
                 error_feedback = self.sql_validator.generate_error_feedback(validation_result)
@@ -454,12 +633,15 @@ ORDER BY tablename"""
                     response.potential_issues = []
                 response.potential_issues.append(f"Warning: {warning.message}")
         
-        # Post-process SQL
-        response.query = self.sql_postprocessor.process(response.query)
-        response.query = format_sql(response.query)
+        # Post-process SQL off the event loop (sqlparse is pure-Python and slow)
+        response.query = await loop.run_in_executor(None, self._postprocess_sql, response.query)
         
         return response
     
+    def _postprocess_sql(self, query: str) -> str:
+        """Apply post-processing fixes and formatting to a generated query"""
+        return format_sql(self.sql_postprocessor.process(query))
+    
     async def _async_self_correct(
         self,
         original_question: str,
@@ -471,17 +653,19 @@ ORDER BY tablename"""
         """Async self-correction attempt"""
         logger.info("Attempting async self-correction")
         
-        table_names = self.schema_extractor.get_table_names()
         correction_prompt = get_self_correction_prompt(
             failed_response.query,
             error_message,
-            table_names
+            self._table_names_joined
         )
         
         try:
-            messages = original_messages.copy()
-            messages.append({"role": "assistant", "content": f"```sql\n{failed_response.query}\n```"})
-            messages.append({"role": "user", "content": correction_prompt})
+            # One allocation; the caller's list is left untouched
+            messages = [
+                *original_messages,
+                {"role": "assistant", "content": f"```sql\n{failed_response.query}\n```"},
+                {"role": "user", "content": correction_prompt}
+            ]
             
             corrected = await run_with_timeout(
                 self._async_client.create_completion(
@@ -495,10 +679,14 @@ ORDER BY tablename"""
             
             # Validate corrected query
             if self.sql_validator:
-                val_result = self.sql_validator.validate(corrected.query)
+                loop = asyncio.get_running_loop()
+                val_result = await loop.run_in_executor(
+                    None, self.sql_validator.validate, corrected.query
+                )
                 if val_result.is_valid:
-                    corrected.query = self.sql_postprocessor.process(corrected.query)
-                    corrected.query = format_sql(corrected.query)
+                    corrected.query = await loop.run_in_executor(
+                        None, self._postprocess_sql, corrected.query
+                    )
                     if corrected.potential_issues is None:
                         corrected.potential_issues = []
                     corrected.potential_issues.insert(0, "Auto-corrected from previous error")
@@ -520,7 +708,7 @@ ORDER BY tablename"""
     ):
         """Cache result in background"""
         try:
-            self.semantic_cache.cache_sql(
+            await self.semantic_cache.acache_sql(
                 question=question,
                 sql=response.query,
                 explanation=response.explanation or "",
@@ -571,9 +759,82 @@ ORDER BY tablename"""
         
         return list(results)
     
+    async def generate_sql_decomposed(
+        self,
+        question: str,
+        **kwargs
+    ) -> SQLQuery:
+        """
+        Generate SQL for a compound question by fanning out its sub-questions
+        
+        Independent sub-questions are generated concurrently (one wave per
+        dependency level), each seeing the SQL of the sub-questions it depends
+        on. Unless the final sub-question already combines all the others, a
+        last call merges the sub-query SQL into one answer for the original
+        question. Simple questions go straight to generate_sql.
+        
+        Args:
+            question: Natural language question
+            **kwargs: Args for generate_sql
+        
+        Returns:
+            SQLQuery answering the original question
+        """
+        if not self._initialized:
+            await self.initialize()
+        
+        decomposer = QueryDecomposer(self._table_names)
+        decomposed = decomposer.decompose(question)
+        sub_queries = decomposed.sub_queries
+        if decomposed.strategy == DecompositionStrategy.SINGLE or len(sub_queries) < 2:
+            return await self.generate_sql(question, **kwargs)
+        
+        logger.info(f"Decomposed into {len(sub_queries)} sub-questions ({decomposed.strategy.value})")
+        history = list(kwargs.pop("conversation_history", None) or [])
+        
+        def context_for(ids: List[int]) -> List[Dict[str, str]]:
+            # Earlier sub-questions and their SQL, as prior conversation turns
+            context = list(history)
+            for sq in sub_queries:
+                if sq.id in ids:
+                    context.append({"role": "user", "content": sq.question})
+                    context.append({"role": "assistant", "content": f"```sql\n{results[sq.id].query}\n```"})
+            return context
+        
+        results: Dict[int, SQLQuery] = {}
+        pending = list(sub_queries)
+        while pending:
+            ready = [sq for sq in pending if all(d in results for d in sq.dependency_ids)]
+            if not ready:
+                # Unresolvable dependencies - answer the question in one call
+                return await self.generate_sql(question, conversation_history=history or None, **kwargs)
+            wave = await asyncio.gather(*(
+                self.generate_sql(
+                    sq.question,
+                    conversation_history=context_for(sq.dependency_ids) or None,
+                    **kwargs
+                )
+                for sq in ready
+            ))
+            for sq, response in zip(ready, wave):
+                results[sq.id] = response
+            pending = [sq for sq in pending if sq.id not in results]
+        
+        final = sub_queries[-1]
+        other_ids = [sq.id for sq in sub_queries if sq is not final]
+        if final.is_final and set(final.dependency_ids) >= set(other_ids):
+            return results[final.id]
+        
+        return await self.generate_sql(
+            question,
+            conversation_history=context_for([sq.id for sq in sub_queries]),
+            **kwargs
+        )
+    
     async def execute_and_generate(
         self,
         question: str,
+        decompose: bool = False,
         **kwargs
     ) -> Tuple[SQLQuery, Optional[QueryResult]]:
         """
@@ -581,12 +842,16 @@ ORDER BY tablename"""
         
         Args:
             question: Natural language question
+            decompose: Split compound questions into concurrently generated sub-queries
             **kwargs: Args for generate_sql
             
         Returns:
             Tuple of (SQLQuery, QueryResult or None)
         """
-        sql_query = await self.generate_sql(question, **kwargs)
+        if decompose:
+            sql_query = await self.generate_sql_decomposed(question, **kwargs)
+        else:
+            sql_query = await self.generate_sql(question, **kwargs)
         
         if sql_query.confidence < 0.5:
             return sql_query, None
@@ -1,36 +1,223 @@
 """Async LLM Provider Adapters - Support async calls for better performance"""
 
 import os
+import time
 import logging
+import random
 import asyncio
-from typing import Optional, Dict, Any, List, TypeVar, Type
+import threading
+import importlib.util
+import functools
+import itertools
+from collections import deque
+from typing import Optional, Dict, Any, List, TypeVar, Type, Tuple, AsyncIterator, Iterator, Callable
 from enum import Enum
 import instructor
 from pydantic import BaseModel
 
-from src.core.llm_provider import LLMConfig, LLMProvider, get_default_model
+from src.core.llm_provider import (
+    LLMConfig,
+    LLMProvider,
+    get_default_model,
+    create_llm_config_from_env,
+)
 
 logger = logging.getLogger(__name__)
 
 T = TypeVar('T', bound=BaseModel)
 
 
+class AdmissionController:
+    """
+    Concurrency limiter whose limit can be changed while requests are in flight
+    
+    Unlike asyncio.Semaphore, the limit can shrink (e.g. on provider 429s) or
+    grow mid-batch; waiters are re-checked against the new limit.
+    """
+    
+    def __init__(self, max_concurrent: int):
+        self._max = max(1, max_concurrent)
+        self._active = 0
+        self._cv = asyncio.Condition()
+    
+    @property
+    def max_concurrent(self) -> int:
+        return self._max
+    
+    @property
+    def active(self) -> int:
+        return self._active
+    
+    async def acquire(self):
+        """Wait until a slot is free, then take it"""
+        async with self._cv:
+            await self._cv.wait_for(lambda: self._active < self._max)
+            self._active += 1
+    
+    async def release(self):
+        """Give a slot back and wake one waiter"""
+        async with self._cv:
+            self._active -= 1
+            self._cv.notify(1)
+    
+    async def resize(self, max_concurrent: int):
+        """Change the concurrency limit; in-flight requests are not cancelled"""
+        async with self._cv:
+            self._max = max(1, max_concurrent)
+            self._cv.notify_all()
+    
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.release()
+
+
+class RateLimiter:
+    """
+    Preemptive requests/tokens-per-minute limiter (sliding 60s window)
+    
+    Callers wait for budget before sending, instead of hitting provider
+    429s and backing off. Holds no loop-bound state, so one instance can
+    be reused across asyncio.run() calls, including loops running on other
+    threads at the same time.
+    """
+    
+    def __init__(self, requests_per_minute: int = 200, tokens_per_minute: int = 40000, period: float = 60.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.period = period
+        self._window: deque = deque()  # (timestamp, tokens) of recent requests
+        self._tokens_in_window = 0
+        # Guards the window against loops on other threads
+        self._lock = threading.Lock()
+    
+    def _prune(self, now: float):
+        while self._window and now - self._window[0][0] >= self.period:
+            _, tokens = self._window.popleft()
+            self._tokens_in_window -= tokens
+    
+    def _try_acquire(self, tokens: int) -> Optional[float]:
+        """Record the request if it fits in the window; otherwise seconds to wait"""
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            # An oversized request is let through once the window is empty
+            if not self._window or (
+                len(self._window) < self.requests_per_minute
+                and self._tokens_in_window + tokens <= self.tokens_per_minute
+            ):
+                self._window.append((now, tokens))
+                self._tokens_in_window += tokens
+                return None
+            return max(self._window[0][0] + self.period - now, 0.01)
+    
+    async def acquire(self, tokens: int = 0):
+        """Wait until a request of ~tokens input tokens fits in the window"""
+        while (delay := self._try_acquire(tokens)) is not None:
+            await asyncio.sleep(delay)
+
+
+def estimate_tokens(messages: List[Dict[str, str]]) -> int:
+    """Rough input token count (~4 characters per token)"""
+    return sum(len(m.get("content") or "") for m in messages) // 4
+
+
 class AsyncLLMClient:
     """Async wrapper for LLM clients with instructor support"""
     
+    # HTTP connection pools shared by all instances of a provider (one set of TCP/TLS handshakes)
+    _shared_http_clients: Dict[Tuple[LLMProvider, asyncio.AbstractEventLoop], Any] = {}
+    
     def __init__(self, config: LLMConfig):
         self.config = config
         self.provider = config.provider
         self.model = config.model
         self._client = None
         self._async_client = None
+        self._async_client_loop: Optional[asyncio.AbstractEventLoop] = None  # Loop whose pool it uses
         
     async def _get_async_client(self):
-        """Lazy initialization of async client"""
-        if self._async_client is None:
+        """
+        Lazy initialization of async client
+        
+        Rebuilt when called from another event loop (e.g. a second
+        asyncio.run()), since the shared pool it was built on belongs to the
+        previous loop and is closed with it.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
             self._async_client = await self._create_async_client()
+            self._async_client_loop = loop
         return self._async_client
     
+    async def warmup(self, ping: bool = False):
+        """
+        Build the provider client now instead of on the first request
+        
+        Args:
+            ping: Also send a 1-token completion so connection setup (TLS
+                handshake, HTTP/2 settings) happens now; spends a few tokens
+        """
+        client = await self._get_async_client()
+        if ping:
+            try:
+                await client.chat.completions.create(
+                    model=self.model,
+                    response_model=None,
+                    messages=[{"role": "user", "content": "ping"}],
+                    max_tokens=1,
+                    max_retries=0
+                )
+            except Exception as e:
+                logger.warning(f"Warm-up request failed: {e}")
+    
+    @classmethod
+    async def get_shared_http_client(cls, provider: LLMProvider):
+        """
+        Get or create the httpx connection pool shared by all clients of a provider
+        
+        Uses HTTP/2 (many concurrent requests multiplexed on one connection)
+        when the optional h2 package is installed. Pools are bound to the event
+        loop that created them, so each loop (e.g. a later asyncio.run) gets its
+        own; a short-lived loop should call close_shared_http_clients() before
+        it ends. No lock needed: creation has no await point, so the
+        check-and-set cannot interleave with other coroutines.
+        """
+        loop = asyncio.get_running_loop()
+        client = cls._shared_http_clients.get((provider, loop))
+        if client is not None:
+            return client
+        
+        # Pools of loops that ended without closing them can't be awaited
+        # any more; drop them so closed loops aren't kept alive
+        for key in [key for key in cls._shared_http_clients if key[1].is_closed()]:
+            cls._shared_http_clients.pop(key, None)
+        
+        import httpx
+        
+        client = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(max_connections=128, max_keepalive_connections=64)
+        )
+        cls._shared_http_clients[(provider, loop)] = client
+        return client
+    
+    @classmethod
+    async def close_shared_http_clients(cls):
+        """
+        Close the shared connection pools of the running event loop
+        
+        Call on application shutdown, or at the end of a short-lived loop such
+        as an asyncio.run() batch. Pools of other loops are left alone.
+        """
+        loop = asyncio.get_running_loop()
+        for key in [key for key in cls._shared_http_clients if key[1] is loop]:
+            client = cls._shared_http_clients.pop(key, None)
+            if client is not None:
+                await client.aclose()
+    
     async def _create_async_client(self):
         """Create async client based on provider"""
         if self.provider == LLMProvider.OPENAI:
@@ -52,7 +239,8 @@ class AsyncLLMClient:
         
         client = AsyncOpenAI(
             api_key=self.config.api_key,
-            timeout=self.config.timeout
+            timeout=self.config.timeout,
+            http_client=await self.get_shared_http_client(self.provider)
         )
         return instructor.from_openai(client)
     
@@ -63,7 +251,8 @@ class AsyncLLMClient:
         client = AsyncOpenAI(
             api_key=self.config.api_key,
             base_url=self.config.base_url or "https://generativelanguage.googleapis.com/v1beta/openai/",
-            timeout=self.config.timeout
+            timeout=self.config.timeout,
+            http_client=await self.get_shared_http_client(self.provider)
         )
         return instructor.from_openai(client)
     
@@ -75,6 +264,7 @@ class AsyncLLMClient:
             api_key=self.config.api_key,
             base_url=self.config.base_url or "https://openrouter.ai/api/v1",
             timeout=self.config.timeout,
+            http_client=await self.get_shared_http_client(self.provider),
             default_headers={
                 "HTTP-Referer": "https://github.com/nl2sql",
                 "X-Title": "NL2SQL"
@@ -100,7 +290,8 @@ class AsyncLLMClient:
             api_key=self.config.api_key,
             azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
             api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01"),
-            timeout=self.config.timeout
+            timeout=self.config.timeout,
+            http_client=await self.get_shared_http_client(self.provider)
         )
         return instructor.from_openai(client)
     
@@ -135,77 +326,147 @@ class AsyncLLMClient:
         
         return response
     
+    async def create_completion_stream(
+        self,
+        response_model: Type[T],
+        messages: List[Dict[str, str]],
+        temperature: float = 0.1,
+        max_retries: int = 2
+    ) -> AsyncIterator[T]:
+        """
+        Stream structured output while the model is still generating
+        
+        Args:
+            response_model: Pydantic model for response
+            messages: Chat messages
+            temperature: Model temperature
+            max_retries: Maximum retry attempts
+        
+        Yields:
+            Partially populated response_model instances (the last one is complete)
+        """
+        client = await self._get_async_client()
+        
+        async for partial in client.chat.completions.create_partial(
+            model=self.model,
+            response_model=response_model,
+            messages=messages,
+            temperature=temperature,
+            max_retries=max_retries
+        ):
+            yield partial
+    
     async def create_batch_completions(
         self,
         requests: List[Dict[str, Any]],
         response_model: Type[T],
-        max_concurrent: int = 5
-    ) -> List[T]:
+        max_concurrent: int = 5,
+        admission: Optional[AdmissionController] = None
+    ) -> AsyncIterator[Tuple[int, T]]:
         """
-        Create multiple completions in parallel
+        Create multiple completions in parallel, yielding each as it finishes
         
         Args:
             requests: List of request dicts with 'messages', 'temperature'
             response_model: Pydantic model for response
             max_concurrent: Maximum concurrent requests
+            admission: Shared limiter (overrides max_concurrent); call its
+                resize() to shrink or grow concurrency mid-batch
             
-        Returns:
-            List of structured responses
+        Yields:
+            (request index, structured response) in completion order;
+            failed requests are logged and skipped
         """
-        semaphore = asyncio.Semaphore(max_concurrent)
+        if admission is None:
+            admission = AdmissionController(max_concurrent)
         
-        async def limited_completion(req: Dict[str, Any]) -> T:
-            async with semaphore:
-                return await self.create_completion(
-                    response_model=response_model,
-                    messages=req.get('messages', []),
-                    temperature=req.get('temperature', 0.1),
-                    max_retries=req.get('max_retries', 2)
-                )
+        async def limited_completion(i: int, req: Dict[str, Any]) -> Tuple[int, T]:
+            async with admission:
+                try:
+                    return i, await self.create_completion(
+                        response_model=response_model,
+                        messages=req.get('messages', []),
+                        temperature=req.get('temperature', 0.1),
+                        max_retries=req.get('max_retries', 2)
+                    )
+                except Exception as e:
+                    logger.error("Batch request %d failed: %s", i, e)
+                    return i, None
         
-        tasks = [limited_completion(req) for req in requests]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        tasks = [asyncio.ensure_future(limited_completion(i, req)) for i, req in enumerate(requests)]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                i, result = await fut
+                if result is not None:
+                    yield i, result
+        finally:
+            # Consumer stopped early: don't leave requests running
+            for task in tasks:
+                task.cancel()
+    
+    async def collect_batch_completions(
+        self,
+        requests: List[Dict[str, Any]],
+        response_model: Type[T],
+        max_concurrent: int = 5,
+        admission: Optional[AdmissionController] = None
+    ) -> List[T]:
+        """
+        Create multiple completions in parallel and return them as a list
         
-        # Filter out exceptions and log them
-        valid_results = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                logger.error(f"Batch request {i} failed: {result}")
-            else:
-                valid_results.append(result)
+        Args:
+            requests: List of request dicts with 'messages', 'temperature'
+            response_model: Pydantic model for response
+            max_concurrent: Maximum concurrent requests
+            admission: Shared limiter (overrides max_concurrent)
         
-        return valid_results
+        Returns:
+            List of structured responses in request order (failures omitted)
+        """
+        results = [
+            item async for item in self.create_batch_completions(
+                requests, response_model, max_concurrent, admission
+            )
+        ]
+        results.sort(key=lambda item: item[0])
+        return [result for _, result in results]
     
     async def close(self):
         """Close async client connections"""
         if self._async_client:
             # Most clients don't need explicit closing, but good practice
             self._async_client = None
+            self._async_client_loop = None
 
 
 class AsyncLLMPool:
     """Pool of async LLM clients for high-throughput scenarios"""
     
-    def __init__(self, config: LLMConfig, pool_size: int = 3):
+    def __init__(self, config: LLMConfig, pool_size: int = 3, warmup_ping: bool = False):
         self.config = config
         self.pool_size = pool_size
+        self.warmup_ping = warmup_ping  # send a 1-token request per client on initialize
         self._clients: List[AsyncLLMClient] = []
-        self._current_index = 0
-        self._lock = asyncio.Lock()
+        self._cycle: Optional[Iterator[AsyncLLMClient]] = None
     
     async def initialize(self):
         """Initialize the client pool"""
+        # Build the shared connection pool once before warming clients in parallel
+        await AsyncLLMClient.get_shared_http_client(self.config.provider)
         self._clients = [AsyncLLMClient(self.config) for _ in range(self.pool_size)]
+        self._cycle = itertools.cycle(self._clients)
         # Pre-warm all clients
-        await asyncio.gather(*[c._get_async_client() for c in self._clients])
+        await asyncio.gather(*[c.warmup(ping=self.warmup_ping) for c in self._clients])
         logger.info(f"Initialized async LLM pool with {self.pool_size} clients")
     
-    async def get_client(self) -> AsyncLLMClient:
-        """Get next client from pool (round-robin)"""
-        async with self._lock:
-            client = self._clients[self._current_index]
-            self._current_index = (self._current_index + 1) % self.pool_size
-            return client
+    def get_client(self) -> AsyncLLMClient:
+        """
+        Get next client from pool (round-robin)
+        
+        No lock needed: next() has no await point, so it cannot interleave
+        with other coroutines on the event loop.
+        """
+        return next(self._cycle)
     
     async def create_completion(
         self,
@@ -215,7 +476,7 @@ class AsyncLLMPool:
         max_retries: int = 2
     ) -> T:
         """Create completion using next available client"""
-        client = await self.get_client()
+        client = self.get_client()
         return await client.create_completion(
             response_model=response_model,
             messages=messages,
@@ -228,37 +489,54 @@ class AsyncLLMPool:
         for client in self._clients:
             await client.close()
         self._clients = []
+        self._cycle = None
+
 
+# Memoized async clients, one per distinct configuration
+@functools.lru_cache(maxsize=None)
+def _build_client(config_key: tuple) -> AsyncLLMClient:
+    """Build the async client for a hashable (field, value) config key"""
+    return AsyncLLMClient(LLMConfig(**dict(config_key)))
 
-# Singleton instance for async client
-_async_client: Optional[AsyncLLMClient] = None
 
+@functools.lru_cache(maxsize=None)
+def _build_default_client() -> AsyncLLMClient:
+    """Build the async client configured from environment variables"""
+    return _build_client(tuple(create_llm_config_from_env().model_dump().items()))
 
-async def get_async_llm_client(config: Optional[LLMConfig] = None) -> AsyncLLMClient:
+
+async def get_async_llm_client(
+    config: Optional[LLMConfig] = None,
+    warmup: bool = False
+) -> AsyncLLMClient:
     """
     Get or create async LLM client
     
     Args:
         config: LLM configuration (uses env vars if not provided)
+        warmup: Build the provider client before returning (use at app startup)
         
     Returns:
-        AsyncLLMClient instance
+        AsyncLLMClient instance (shared by all callers with the same config)
     """
-    global _async_client
-    
-    if _async_client is None:
-        if config is None:
-            from src.core.llm_provider import create_llm_config_from_env
-            config = create_llm_config_from_env()
-        _async_client = AsyncLLMClient(config)
-    
-    return _async_client
+    if config is None:
+        client = _build_default_client()
+    else:
+        client = _build_client(tuple(config.model_dump().items()))
+    if warmup:
+        await client.warmup()
+    return client
 
 
 def reset_async_client():
-    """Reset the singleton async client (useful for testing)"""
-    global _async_client
-    _async_client = None
+    """Reset the cached async clients (useful for testing)"""
+    _build_client.cache_clear()
+    _build_default_client.cache_clear()
+
+
+async def close_loop_http_clients():
+    """Close the shared provider connection pools opened on the running event loop"""
+    await AsyncLLMClient.close_shared_http_clients()
 
 
 # Utility functions for common async patterns
@@ -294,10 +572,16 @@ async def retry_async(
     max_retries: int = 3,
     delay: float = 1.0,
     backoff: float = 2.0,
-    exceptions: tuple = (Exception,)
+    exceptions: tuple = (Exception,),
+    max_delay: float = 30.0,
+    should_retry: Optional[Callable[[Exception], bool]] = None
 ):
     """
-    Retry async function with exponential backoff
+    Retry async function with jittered, capped exponential backoff
+    
+    Each wait is drawn uniformly from [delay, previous wait * backoff] and capped
+    at max_delay (decorrelated jitter), so concurrent callers that fail together
+    don't all retry at the same instant.
     
     Args:
         coro_func: Async function to retry (callable that returns coroutine)
@@ -305,6 +589,9 @@ async def retry_async(
         delay: Initial delay between retries
         backoff: Backoff multiplier
         exceptions: Exceptions to catch and retry
+        max_delay: Upper bound for a single wait
+        should_retry: Predicate deciding if a caught exception is retriable
+            (e.g. retry 429s but not other 4xx); non-retriable ones are raised
         
     Returns:
         Function result
@@ -316,11 +603,14 @@ async def retry_async(
         try:
             return await coro_func()
         except exceptions as e:
+            if should_retry is not None and not should_retry(e):
+                raise
             last_exception = e
             if attempt < max_retries:
-                logger.warning(f"Attempt {attempt + 1} failed: {e}. Retrying in {current_delay}s...")
-                await asyncio.sleep(current_delay)
-                current_delay *= backoff
+                sleep_for = min(max_delay, random.uniform(delay, current_delay * backoff))
+                current_delay = sleep_for
+                logger.warning(f"Attempt {attempt + 1} failed: {e}. Retrying in {sleep_for:.2f}s...")
+                await asyncio.sleep(sleep_for)
             else:
                 logger.error(f"All {max_retries + 1} attempts failed")
     
@@ -6,17 +6,40 @@ Supports schema caching, prompt caching, and SQL result caching.
 """
 
 import os
+import sys
 import json
 import hashlib
 import logging
 from enum import Enum
 from dataclasses import dataclass, field
-from typing import Optional, Dict, Any, List, Union
-from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Tuple, Union
+from datetime import datetime
 import time
+from collections import Counter, OrderedDict
+
+try:
+    import orjson
+    
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:  # stdlib fallback (slower)
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+    
+    _loads = json.loads
 
 logger = logging.getLogger(__name__)
 
+# Slotted dataclasses (no per-instance __dict__) need Python 3.10+
+_DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+def _to_timestamp(value: Union[float, str]) -> float:
+    """Read a stored timestamp (entries written before the switch to floats hold ISO strings)"""
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return value
+
 
 class CacheLevel(Enum):
     """Cache levels with different TTLs and purposes"""
@@ -28,22 +51,20 @@ class CacheLevel(Enum):
     SEMANTIC = "semantic"   # Semantic query cache
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class CacheEntry:
     """Cache entry with metadata"""
     key: str
     value: Any
     level: CacheLevel
-    created_at: datetime = field(default_factory=datetime.now)
-    expires_at: Optional[datetime] = None
+    created_at: float = field(default_factory=time.time)  # unix timestamp
+    expires_at: Optional[float] = None
     hit_count: int = 0
     schema_version: Optional[str] = None
     
     def is_expired(self) -> bool:
         """Check if entry has expired"""
-        if self.expires_at is None:
-            return False
-        return datetime.now() > self.expires_at
+        return self.expires_at is not None and time.time() > self.expires_at
     
     def to_dict(self) -> Dict[str, Any]:
         """Serialize to dictionary"""
@@ -51,8 +72,8 @@ class CacheEntry:
             "key": self.key,
             "value": self.value,
             "level": self.level.value,
-            "created_at": self.created_at.isoformat(),
-            "expires_at": self.expires_at.isoformat() if self.expires_at else None,
+            "created_at": self.created_at,
+            "expires_at": self.expires_at,
             "hit_count": self.hit_count,
             "schema_version": self.schema_version
         }
@@ -64,14 +85,14 @@ class CacheEntry:
             key=data["key"],
             value=data["value"],
             level=CacheLevel(data["level"]),
-            created_at=datetime.fromisoformat(data["created_at"]),
-            expires_at=datetime.fromisoformat(data["expires_at"]) if data.get("expires_at") else None,
+            created_at=_to_timestamp(data["created_at"]),
+            expires_at=_to_timestamp(data["expires_at"]) if data.get("expires_at") else None,
             hit_count=data.get("hit_count", 0),
             schema_version=data.get("schema_version")
         )
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class CacheMetrics:
     """Cache performance metrics"""
     hits: int = 0
@@ -80,7 +101,7 @@ class CacheMetrics:
     total_entries: int = 0
     memory_usage_bytes: int = 0
     last_reset: datetime = field(default_factory=datetime.now)
-    hits_by_level: Dict[str, int] = field(default_factory=dict)
+    hits_by_level: Counter = field(default_factory=Counter)
     
     @property
     def hit_rate(self) -> float:
@@ -91,8 +112,7 @@ class CacheMetrics:
     def record_hit(self, level: CacheLevel):
         """Record a cache hit"""
         self.hits += 1
-        level_key = level.value
-        self.hits_by_level[level_key] = self.hits_by_level.get(level_key, 0) + 1
+        self.hits_by_level[level.value] += 1
     
     def record_miss(self):
         """Record a cache miss"""
@@ -108,7 +128,7 @@ class CacheMetrics:
             "total_entries": self.total_entries,
             "memory_usage_bytes": self.memory_usage_bytes,
             "last_reset": self.last_reset.isoformat(),
-            "hits_by_level": self.hits_by_level
+            "hits_by_level": dict(self.hits_by_level)
         }
     
     def reset(self):
@@ -116,7 +136,7 @@ class CacheMetrics:
         self.hits = 0
         self.misses = 0
         self.evictions = 0
-        self.hits_by_level = {}
+        self.hits_by_level.clear()
         self.last_reset = datetime.now()
 
 
@@ -140,6 +160,9 @@ class CacheConfig:
         
         # Key prefix for namespacing
         self.key_prefix = os.getenv("CACHE_KEY_PREFIX", "nl2sql")
+        
+        # Persist per-key hit counts in Redis (one counter per entry, expiring with it)
+        self.persist_hit_counts = os.getenv("CACHE_PERSIST_HIT_COUNTS", "false").lower() == "true"
     
     def get_ttl(self, level: CacheLevel) -> int:
         """Get TTL for cache level"""
@@ -154,6 +177,17 @@ class CacheConfig:
         return ttl_map.get(level, self.ttl_prompt)
 
 
+# Levels whose entries are invalidated when the schema version changes
+_SCHEMA_DEPENDENT_LEVELS = frozenset({CacheLevel.SCHEMA, CacheLevel.EXAMPLES, CacheLevel.PROMPT})
+
+# Low-cardinality levels mirrored in an in-process LRU (L1) in front of Redis
+_L1_LEVELS = (CacheLevel.SYSTEM, CacheLevel.SCHEMA, CacheLevel.EXAMPLES)
+_L1_MAX_ENTRIES = 256  # per level
+
+# In-process hit counts kept for the most recently hit keys only
+_HIT_COUNTS_MAX_KEYS = 4096
+
+
 class CacheManager:
     """
     Multi-level cache manager with Redis backend
@@ -175,8 +209,18 @@ class CacheManager:
         """
         self.config = config or CacheConfig()
         self.metrics = CacheMetrics()
+        # Namespaced "<prefix>:<level>:" strings, built once for _make_key
+        self._key_prefixes: Dict[CacheLevel, str] = {
+            level: f"{self.config.key_prefix}:{level.value}:" for level in CacheLevel
+        }
         self._redis_client = None
-        self._local_cache: Dict[str, CacheEntry] = {}  # Fallback cache
+        self._async_redis_client = None  # redis.asyncio client, created on first async call
+        # Fallback cache, sharded by level so a level can be dropped in O(1)
+        self._local_caches: Dict[CacheLevel, Dict[str, CacheEntry]] = {level: {} for level in CacheLevel}
+        # full_key -> hits (in-process), least recently hit first
+        self._hit_counts: "OrderedDict[str, int]" = OrderedDict()
+        # L1 in front of Redis: level -> {key: entry}, least recently used first
+        self._l1: Dict[CacheLevel, OrderedDict] = {level: OrderedDict() for level in _L1_LEVELS}
         self._current_schema_version: Optional[str] = None
         
         if self.config.enabled:
@@ -188,7 +232,7 @@ class CacheManager:
             import redis
             self._redis_client = redis.from_url(
                 self.config.redis_url,
-                decode_responses=True,
+                decode_responses=False,  # raw bytes go straight to orjson
                 socket_timeout=5,
                 socket_connect_timeout=5,
                 retry_on_timeout=True
@@ -203,13 +247,141 @@ class CacheManager:
             logger.warning(f"Redis connection failed: {e}. Using local cache.")
             self._redis_client = None
     
+    def _get_async_redis(self):
+        """Get redis.asyncio client (None when Redis is unavailable)"""
+        if self._redis_client is None:
+            return None
+        if self._async_redis_client is None:
+            import redis.asyncio as aioredis
+            self._async_redis_client = aioredis.from_url(
+                self.config.redis_url,
+                decode_responses=False,
+                socket_timeout=5,
+                socket_connect_timeout=5,
+                retry_on_timeout=True
+            )
+        return self._async_redis_client
+    
     def _make_key(self, key: str, level: CacheLevel) -> str:
         """Create namespaced cache key"""
-        return f"{self.config.key_prefix}:{level.value}:{key}"
+        return self._key_prefixes[level] + key
     
     def _hash_key(self, data: str) -> str:
         """Create hash key from string"""
-        return hashlib.sha256(data.encode()).hexdigest()[:16]
+        return self._hash_key_bytes(data.encode())
+    
+    def _hash_key_bytes(self, data: bytes) -> str:
+        """Create hash key from bytes (16 hex chars; BLAKE2b is cheaper than SHA-256 here)"""
+        return hashlib.blake2b(data, digest_size=8).hexdigest()
+    
+    def _build_entry(
+        self,
+        key: str,
+        value: Any,
+        level: CacheLevel,
+        ttl: Optional[int],
+        schema_version: Optional[str]
+    ) -> Tuple[str, int, CacheEntry]:
+        """Create (full_key, ttl, entry) for a cache write"""
+        ttl = ttl or self.config.get_ttl(level)
+        entry = CacheEntry(
+            key=key,
+            value=value,
+            level=level,
+            expires_at=time.time() + ttl,
+            schema_version=schema_version or self._current_schema_version
+        )
+        return self._make_key(key, level), ttl, entry
+    
+    def _is_valid_hit(
+        self,
+        key: str,
+        level: CacheLevel,
+        full_key: str,
+        entry: Optional[CacheEntry],
+        check_schema_version: bool
+    ) -> bool:
+        """Check a fetched entry for expiry/schema mismatch and record a miss if unusable"""
+        if entry is None:
+            self.metrics.record_miss()
+            return False
+        
+        # Check expiration for local cache
+        if not self._redis_client and entry.is_expired():
+            self._local_caches[level].pop(key, None)
+            self._hit_counts.pop(full_key, None)
+            self.metrics.record_miss()
+            return False
+        
+        # Check schema version for schema-dependent caches
+        if check_schema_version and level in _SCHEMA_DEPENDENT_LEVELS:
+            if entry.schema_version and entry.schema_version != self._current_schema_version:
+                self.invalidate(key, level)
+                self.metrics.record_miss()
+                logger.debug(f"Cache MISS (schema mismatch): {full_key}")
+                return False
+        
+        return True
+    
+    def _l1_get(self, key: str, level: CacheLevel) -> Optional[CacheEntry]:
+        """Get an unexpired entry from the in-process L1 (Redis mode only)"""
+        shard = self._l1.get(level)
+        if shard is None:
+            return None
+        entry = shard.get(key)
+        if entry is None:
+            return None
+        if entry.is_expired():
+            del shard[key]
+            return None
+        shard.move_to_end(key)
+        return entry
+    
+    def _l1_put(self, key: str, level: CacheLevel, entry: CacheEntry):
+        """Store an entry in the L1, evicting the least recently used one"""
+        shard = self._l1.get(level)
+        if shard is None:
+            return
+        shard[key] = entry
+        shard.move_to_end(key)
+        if len(shard) > _L1_MAX_ENTRIES:
+            shard.popitem(last=False)
+    
+    def _hits_key(self, full_key: str) -> str:
+        """Redis counter holding the persisted hit count of an entry"""
+        return f"{self.config.key_prefix}:hits:{full_key}"
+    
+    def _hits_pattern(self, level: CacheLevel) -> str:
+        """Pattern matching the persisted hit counters of a level"""
+        return self._hits_key(self._key_prefixes[level]) + "*"
+    
+    def _count_hit(self, full_key: str, entry: CacheEntry):
+        """Track a hit in memory (stored entries are not rewritten on reads)"""
+        entry.hit_count += 1
+        counts = self._hit_counts
+        counts[full_key] = counts.get(full_key, 0) + 1
+        counts.move_to_end(full_key)
+        if len(counts) > _HIT_COUNTS_MAX_KEYS:
+            counts.popitem(last=False)
+    
+    def _queue_hit_persist(self, pipe, full_key: str, entry: CacheEntry, level: CacheLevel):
+        """Queue the INCR of an entry's hit counter, expiring together with the entry"""
+        hits_key = self._hits_key(full_key)
+        pipe.incr(hits_key)
+        if entry.expires_at is not None:
+            pipe.expireat(hits_key, int(entry.expires_at) + 1)
+        else:
+            pipe.expire(hits_key, self.config.get_ttl(level))
+    
+    def _forget_hits(self, prefix: str):
+        """Drop in-process hit counts of keys starting with prefix"""
+        counts = self._hit_counts
+        for full_key in [k for k in counts if k.startswith(prefix)]:
+            del counts[full_key]
+    
+    def get_hit_count(self, key: str, level: CacheLevel) -> int:
+        """Get the number of hits for a key seen by this process"""
+        return self._hit_counts.get(self._make_key(key, level), 0)
     
     def set(
         self,
@@ -235,17 +407,7 @@ class CacheManager:
         if not self.config.enabled:
             return False
         
-        full_key = self._make_key(key, level)
-        ttl = ttl or self.config.get_ttl(level)
-        expires_at = datetime.now() + timedelta(seconds=ttl)
-        
-        entry = CacheEntry(
-            key=key,
-            value=value,
-            level=level,
-            expires_at=expires_at,
-            schema_version=schema_version or self._current_schema_version
-        )
+        full_key, ttl, entry = self._build_entry(key, value, level, ttl, schema_version)
         
         try:
             if self._redis_client:
@@ -253,11 +415,12 @@ class CacheManager:
                 self._redis_client.setex(
                     full_key,
                     ttl,
-                    json.dumps(entry.to_dict())
+                    _dumps(entry.to_dict())
                 )
+                self._l1_put(key, level, entry)
             else:
                 # Store in local cache
-                self._local_cache[full_key] = entry
+                self._local_caches[level][key] = entry
             
             self.metrics.total_entries += 1
             logger.debug(f"Cache SET: {full_key} (TTL: {ttl}s)")
@@ -293,40 +456,23 @@ class CacheManager:
             entry = None
             
             if self._redis_client:
-                data = self._redis_client.get(full_key)
-                if data:
-                    entry = CacheEntry.from_dict(json.loads(data))
+                entry = self._l1_get(key, level)
+                if entry is None:
+                    data = self._redis_client.get(full_key)
+                    if data:
+                        entry = CacheEntry.from_dict(_loads(data))
+                        self._l1_put(key, level, entry)
             else:
-                entry = self._local_cache.get(full_key)
+                entry = self._local_caches[level].get(key)
             
-            if entry is None:
-                self.metrics.record_miss()
-                return None
-            
-            # Check expiration for local cache
-            if not self._redis_client and entry.is_expired():
-                self._local_cache.pop(full_key, None)
-                self.metrics.record_miss()
+            if not self._is_valid_hit(key, level, full_key, entry, check_schema_version):
                 return None
             
-            # Check schema version for schema-dependent caches
-            if check_schema_version and level in (CacheLevel.SCHEMA, CacheLevel.EXAMPLES, CacheLevel.PROMPT):
-                if entry.schema_version and entry.schema_version != self._current_schema_version:
-                    self.invalidate(key, level)
-                    self.metrics.record_miss()
-                    logger.debug(f"Cache MISS (schema mismatch): {full_key}")
-                    return None
-            
-            # Update hit count in Redis
-            if self._redis_client:
-                entry.hit_count += 1
-                self._redis_client.setex(
-                    full_key,
-                    self._redis_client.ttl(full_key),
-                    json.dumps(entry.to_dict())
-                )
-            else:
-                entry.hit_count += 1
+            self._count_hit(full_key, entry)
+            if self._redis_client and self.config.persist_hit_counts:
+                pipe = self._redis_client.pipeline(transaction=False)
+                self._queue_hit_persist(pipe, full_key, entry, level)
+                pipe.execute()
             
             self.metrics.record_hit(level)
             logger.debug(f"Cache HIT: {full_key}")
@@ -337,6 +483,95 @@ class CacheManager:
             self.metrics.record_miss()
             return None
     
+    def batch_set(
+        self,
+        items: List[Tuple[str, Any, CacheLevel]],
+        schema_version: Optional[str] = None
+    ) -> int:
+        """
+        Set several cache entries in one Redis round trip
+        
+        Args:
+            items: List of (key, value, level); TTL is the level default
+            schema_version: Schema version for invalidation
+        
+        Returns:
+            Number of entries stored
+        """
+        if not self.config.enabled or not items:
+            return 0
+        
+        try:
+            if self._redis_client:
+                pipe = self._redis_client.pipeline(transaction=False)
+                for key, value, level in items:
+                    full_key, ttl, entry = self._build_entry(key, value, level, None, schema_version)
+                    pipe.setex(full_key, ttl, _dumps(entry.to_dict()))
+                    self._l1_put(key, level, entry)
+                pipe.execute()
+            else:
+                for key, value, level in items:
+                    full_key, _, entry = self._build_entry(key, value, level, None, schema_version)
+                    self._local_caches[level][key] = entry
+            
+            self.metrics.total_entries += len(items)
+            logger.debug(f"Cache BATCH SET: {len(items)} entries")
+            return len(items)
+        
+        except Exception as e:
+            logger.error(f"Cache BATCH SET failed: {e}")
+            return 0
+    
+    def batch_get(
+        self,
+        keys: List[Tuple[str, CacheLevel]],
+        check_schema_version: bool = True
+    ) -> List[Optional[Any]]:
+        """
+        Get several cache entries in one Redis round trip
+        
+        Hit counts are tracked in memory only for batch reads.
+        
+        Args:
+            keys: List of (key, level)
+            check_schema_version: Validate against current schema version
+        
+        Returns:
+            Cached values (None where not found/expired), in input order
+        """
+        if not self.config.enabled or not keys:
+            return [None] * len(keys)
+        
+        full_keys = [self._make_key(key, level) for key, level in keys]
+        
+        try:
+            if self._redis_client:
+                pipe = self._redis_client.pipeline(transaction=False)
+                for full_key in full_keys:
+                    pipe.get(full_key)
+                entries = [
+                    CacheEntry.from_dict(_loads(data)) if data else None
+                    for data in pipe.execute()
+                ]
+            else:
+                entries = [self._local_caches[level].get(key) for key, level in keys]
+            
+            values: List[Optional[Any]] = []
+            for (key, level), full_key, entry in zip(keys, full_keys, entries):
+                if self._is_valid_hit(key, level, full_key, entry, check_schema_version):
+                    self._count_hit(full_key, entry)
+                    self.metrics.record_hit(level)
+                    values.append(entry.value)
+                else:
+                    values.append(None)
+            return values
+        
+        except Exception as e:
+            logger.error(f"Cache BATCH GET failed: {e}")
+            for _ in keys:
+                self.metrics.record_miss()
+            return [None] * len(keys)
+    
     def invalidate(self, key: str, level: CacheLevel) -> bool:
         """Invalidate specific cache entry"""
         if not self.config.enabled:
@@ -346,9 +581,11 @@ class CacheManager:
         
         try:
             if self._redis_client:
-                self._redis_client.delete(full_key)
+                self._redis_client.delete(full_key, self._hits_key(full_key))
+                self._l1.get(level, {}).pop(key, None)
             else:
-                self._local_cache.pop(full_key, None)
+                self._local_caches[level].pop(key, None)
+            self._hit_counts.pop(full_key, None)
             
             self.metrics.evictions += 1
             logger.debug(f"Cache INVALIDATE: {full_key}")
@@ -362,7 +599,7 @@ class CacheManager:
         if not self.config.enabled:
             return 0
         
-        pattern = f"{self.config.key_prefix}:{level.value}:*"
+        pattern = self._key_prefixes[level] + "*"
         count = 0
         
         try:
@@ -370,11 +607,15 @@ class CacheManager:
                 keys = self._redis_client.keys(pattern)
                 if keys:
                     count = self._redis_client.delete(*keys)
+                hit_keys = self._redis_client.keys(self._hits_pattern(level))
+                if hit_keys:
+                    self._redis_client.delete(*hit_keys)
+                self._l1.get(level, {}).clear()
             else:
-                keys_to_delete = [k for k in self._local_cache if k.startswith(f"{self.config.key_prefix}:{level.value}:")]
-                for k in keys_to_delete:
-                    self._local_cache.pop(k, None)
-                    count += 1
+                shard = self._local_caches[level]
+                count = len(shard)
+                shard.clear()
+            self._forget_hits(self._key_prefixes[level])
             
             self.metrics.evictions += count
             logger.info(f"Cache level invalidated: {level.value} ({count} entries)")
@@ -383,10 +624,170 @@ class CacheManager:
             logger.error(f"Level invalidation failed: {e}")
             return 0
     
+    # Async variants: yield to the event loop during Redis round trips.
+    # Without Redis they fall back to the (non-blocking) local cache methods.
+    
+    async def aset(
+        self,
+        key: str,
+        value: Any,
+        level: CacheLevel,
+        ttl: Optional[int] = None,
+        schema_version: Optional[str] = None
+    ) -> bool:
+        """Async version of set()"""
+        redis_client = self._get_async_redis() if self.config.enabled else None
+        if redis_client is None:
+            return self.set(key, value, level, ttl, schema_version)
+        
+        full_key, ttl, entry = self._build_entry(key, value, level, ttl, schema_version)
+        
+        try:
+            await redis_client.setex(full_key, ttl, _dumps(entry.to_dict()))
+            self._l1_put(key, level, entry)
+            self.metrics.total_entries += 1
+            logger.debug(f"Cache SET: {full_key} (TTL: {ttl}s)")
+            return True
+        except Exception as e:
+            logger.error(f"Cache SET failed: {e}")
+            return False
+    
+    async def aget(
+        self,
+        key: str,
+        level: CacheLevel,
+        check_schema_version: bool = True
+    ) -> Optional[Any]:
+        """Async version of get()"""
+        redis_client = self._get_async_redis() if self.config.enabled else None
+        if redis_client is None:
+            return self.get(key, level, check_schema_version)
+        
+        full_key = self._make_key(key, level)
+        
+        try:
+            entry = self._l1_get(key, level)
+            if entry is None:
+                data = await redis_client.get(full_key)
+                if data:
+                    entry = CacheEntry.from_dict(_loads(data))
+                    self._l1_put(key, level, entry)
+            
+            if not self._is_valid_hit(key, level, full_key, entry, check_schema_version):
+                return None
+            
+            self._count_hit(full_key, entry)
+            if self.config.persist_hit_counts:
+                pipe = redis_client.pipeline(transaction=False)
+                self._queue_hit_persist(pipe, full_key, entry, level)
+                await pipe.execute()
+            
+            self.metrics.record_hit(level)
+            logger.debug(f"Cache HIT: {full_key}")
+            return entry.value
+        
+        except Exception as e:
+            logger.error(f"Cache GET failed: {e}")
+            self.metrics.record_miss()
+            return None
+    
+    async def abatch_set(
+        self,
+        items: List[Tuple[str, Any, CacheLevel]],
+        schema_version: Optional[str] = None
+    ) -> int:
+        """Async version of batch_set()"""
+        redis_client = self._get_async_redis() if self.config.enabled else None
+        if redis_client is None or not items:
+            return self.batch_set(items, schema_version)
+        
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for key, value, level in items:
+                    full_key, ttl, entry = self._build_entry(key, value, level, None, schema_version)
+                    pipe.setex(full_key, ttl, _dumps(entry.to_dict()))
+                    self._l1_put(key, level, entry)
+                await pipe.execute()
+            
+            self.metrics.total_entries += len(items)
+            logger.debug(f"Cache BATCH SET: {len(items)} entries")
+            return len(items)
+        
+        except Exception as e:
+            logger.error(f"Cache BATCH SET failed: {e}")
+            return 0
+    
+    async def abatch_get(
+        self,
+        keys: List[Tuple[str, CacheLevel]],
+        check_schema_version: bool = True
+    ) -> List[Optional[Any]]:
+        """Async version of batch_get()"""
+        redis_client = self._get_async_redis() if self.config.enabled else None
+        if redis_client is None or not keys:
+            return self.batch_get(keys, check_schema_version)
+        
+        full_keys = [self._make_key(key, level) for key, level in keys]
+        
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for full_key in full_keys:
+                    pipe.get(full_key)
+                results = await pipe.execute()
+            
+            values: List[Optional[Any]] = []
+            for (key, level), full_key, data in zip(keys, full_keys, results):
+                entry = CacheEntry.from_dict(_loads(data)) if data else None
+                if self._is_valid_hit(key, level, full_key, entry, check_schema_version):
+                    self._count_hit(full_key, entry)
+                    self.metrics.record_hit(level)
+                    values.append(entry.value)
+                else:
+                    values.append(None)
+            return values
+        
+        except Exception as e:
+            logger.error(f"Cache BATCH GET failed: {e}")
+            for _ in keys:
+                self.metrics.record_miss()
+            return [None] * len(keys)
+    
+    async def ainvalidate_level(self, level: CacheLevel) -> int:
+        """Async version of invalidate_level()"""
+        redis_client = self._get_async_redis() if self.config.enabled else None
+        if redis_client is None:
+            return self.invalidate_level(level)
+        
+        pattern = self._key_prefixes[level] + "*"
+        count = 0
+        
+        try:
+            keys = await redis_client.keys(pattern)
+            if keys:
+                count = await redis_client.delete(*keys)
+            hit_keys = await redis_client.keys(self._hits_pattern(level))
+            if hit_keys:
+                await redis_client.delete(*hit_keys)
+            self._l1.get(level, {}).clear()
+            self._forget_hits(self._key_prefixes[level])
+            
+            self.metrics.evictions += count
+            logger.info(f"Cache level invalidated: {level.value} ({count} entries)")
+            return count
+        except Exception as e:
+            logger.error(f"Level invalidation failed: {e}")
+            return 0
+    
+    async def aclose(self):
+        """Close the async Redis connection pool"""
+        if self._async_redis_client is not None:
+            await self._async_redis_client.aclose()
+            self._async_redis_client = None
+    
     def invalidate_schema_dependent(self) -> int:
         """Invalidate all schema-dependent caches"""
         count = 0
-        for level in [CacheLevel.SCHEMA, CacheLevel.EXAMPLES, CacheLevel.PROMPT]:
+        for level in _SCHEMA_DEPENDENT_LEVELS:
             count += self.invalidate_level(level)
         return count
     
@@ -413,6 +814,27 @@ class CacheManager:
         
         return True
     
+    async def ainvalidate_schema_dependent(self) -> int:
+        """Async version of invalidate_schema_dependent()"""
+        count = 0
+        for level in _SCHEMA_DEPENDENT_LEVELS:
+            count += await self.ainvalidate_level(level)
+        return count
+    
+    async def aupdate_schema_version(self, version: str) -> bool:
+        """Async version of update_schema_version()"""
+        if version == self._current_schema_version:
+            return False
+        
+        old_version = self._current_schema_version
+        self._current_schema_version = version
+        
+        if old_version is not None:
+            count = await self.ainvalidate_schema_dependent()
+            logger.info(f"Schema version updated: {old_version} -> {version} (invalidated {count} entries)")
+        
+        return True
+    
     def clear_all(self) -> int:
         """Clear all cache entries"""
         if not self.config.enabled:
@@ -427,8 +849,12 @@ class CacheManager:
                 if keys:
                     count = self._redis_client.delete(*keys)
             else:
-                count = len(self._local_cache)
-                self._local_cache.clear()
+                for shard in self._local_caches.values():
+                    count += len(shard)
+                    shard.clear()
+            self._hit_counts.clear()
+            for shard in self._l1.values():
+                shard.clear()
             
             self.metrics.evictions += count
             self.metrics.total_entries = 0
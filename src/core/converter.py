@@ -2,10 +2,22 @@
 
 import os
 import re
+import json
+import asyncio
+import time
+import hashlib
 import logging
-from typing import Optional, List, Dict, Any, Tuple
+import functools
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar, copy_context
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional, List, Dict, Any, Tuple, ClassVar, Union, Iterator, AsyncIterator, FrozenSet, Literal, TYPE_CHECKING
+import pydantic_core
 from src.models.sql_query import (
     SQLQuery, 
+    SQLQueryBatch,
     DatabaseConfig, 
     QueryResult, 
     DatabaseType,
@@ -19,27 +31,94 @@ from src.core.llm_provider import (
     LLMConfig,
     LLMProvider
 )
-from src.core.schema_optimizer import SchemaOptimizer
+from src.core.async_llm_provider import (
+    AsyncLLMClient,
+    AdmissionController,
+    RateLimiter,
+    close_loop_http_clients,
+    estimate_tokens
+)
+from src.core.schema_optimizer import SchemaOptimizer, get_token_counter
 from src.core.query_preprocessor import QueryPreprocessor, QueryType, preprocess_question
 from src.core.sql_validator import SQLValidator, SQLPostProcessor, ValidationResult
 from src.core.schema_version_manager import SchemaVersionManager
 from src.core.cache_manager import CacheManager, get_cache_manager, CacheLevel
 from src.core.prompt_builder import PromptBuilder, build_nl2sql_prompt
-from src.core.semantic_cache import SemanticCache, get_semantic_cache
-from src.core.embedding_provider import get_default_embedder, EmbeddingProvider
 from src.prompts.system_prompt import (
     get_full_system_prompt, 
     get_user_prompt_template,
     get_query_type_prompt,
     get_self_correction_prompt
 )
-from src.prompts.few_shot_examples import get_few_shot_examples, format_examples_for_prompt, get_relevant_examples
+from src.prompts.few_shot_examples import (
+    get_few_shot_examples,
+    format_examples_for_prompt,
+    get_relevant_examples,
+    fit_examples_to_budget
+)
 from src.utils.validation import validate_query_against_schema
 from src.utils.formatting import format_sql
 from src.core.query_plan_cache import QueryPlanCache, get_query_plan_cache, QueryPattern
 
+if TYPE_CHECKING:
+    # Imported on first use: embedders pull in numpy and, for local models, torch
+    from src.core.semantic_cache import SemanticCache
+    from src.core.example_retriever import ExampleRetriever
+
 logger = logging.getLogger(__name__)
 
+# Background schema refreshes, shared by all converters (one at a time)
+_schema_refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nl2sql-schema")
+
+
+@dataclass
+class _SchemaState:
+    """
+    Everything derived from one schema load
+    
+    Built off to the side and published with a single attribute assignment,
+    so a background refresh never exposes a half-updated mix of old and new
+    (e.g. the new validator next to the old prompt schema).
+    """
+    schema: Optional[DatabaseSchema] = None
+    schema_text: Optional[str] = None
+    loaded_at: Optional[float] = None
+    schema_optimizer: Optional[SchemaOptimizer] = None
+    query_preprocessor: Optional[QueryPreprocessor] = None
+    sql_validator: Optional[SQLValidator] = None
+    # Kept for hot paths (validation, self-correction, schema answers)
+    table_names: List[str] = field(default_factory=list)
+    table_name_set: FrozenSet[str] = frozenset()
+    table_names_joined: str = ""
+    column_map: Dict[str, List[str]] = field(default_factory=dict)
+    # Answer text for schema questions, built on first use
+    summary: Optional[str] = None
+
+
+# (converter, state) a request in this context reads its schema from, so a
+# refresh published mid-request can't mix schemas between its steps
+_pinned_schema: ContextVar[Optional[Tuple[Any, _SchemaState]]] = ContextVar("nl2sql_pinned_schema", default=None)
+
+
+def _pins_schema_state(method):
+    """Serve every schema read made during a converter method from one _SchemaState"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        pinned = _pinned_schema.get()
+        if pinned is not None and pinned[0] is self:
+            return method(self, *args, **kwargs)
+        token = _pinned_schema.set((self, self._schema_state))
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            _pinned_schema.reset(token)
+    return wrapper
+
+
+def _schema_state_property(name: str, doc: str) -> property:
+    """Read-only converter attribute backed by the current _SchemaState"""
+    return property(lambda self: getattr(self._state, name), doc=doc)
+
 
 # Keywords indicating schema/metadata questions (not data queries)
 SCHEMA_QUERY_PATTERNS = [
@@ -53,10 +132,96 @@ SCHEMA_QUERY_PATTERNS = [
     r'\bdesc(ribe)?\s+\w+\b',
 ]
 
+# One alternation compiled at import, so a question is scanned once rather than
+# once per pattern; questions are lowercased before matching so no IGNORECASE
+_SCHEMA_QUERY_RE = re.compile("|".join(f"(?:{p})" for p in SCHEMA_QUERY_PATTERNS))
+
+# Every pattern above contains at least one of these substrings, so a question
+# with none of them can skip the regex pass entirely (the common analytical case).
+# Plain substring checks; false positives ("db" in "feedback") just fall through
+# to the regex.
+_SCHEMA_TRIGGER_KEYWORDS = (
+    "schema", "cấu trúc", "structure",
+    "table", "bảng",
+    "desc", "mô tả", "giải thích",
+    "database", "db", "show",
+)
+
+# SQL in raw LLM text: a fenced block, else the first line-initial statement
+# shaped like SQL (SELECT ... FROM, or WITH name AS (), so prose such as
+# "I can't help with that" is never taken for a query
+_SQL_FENCE_RE = re.compile(r'```(?:sql)?\s*\n(.*?)```', re.S | re.I)
+_SQL_STATEMENT_RE = re.compile(
+    r'^[ \t]*(?:SELECT\b[^;]*?\bFROM\b|WITH\s+(?:RECURSIVE\s+)?\w+(?:\s*\([^)]*\))?\s+AS\s*\()[^;]*',
+    re.S | re.I | re.M
+)
+
 
 class NL2SQLConverter:
     """Main class for converting natural language to SQL queries"""
     
+    # Empty until load_schema publishes a state of the instance's own
+    _schema_state: _SchemaState = _SchemaState()
+    
+    schema = _schema_state_property("schema", "Loaded DatabaseSchema (None before load_schema)")
+    schema_text = _schema_state_property("schema_text", "Schema formatted for the LLM")
+    schema_optimizer = _schema_state_property("schema_optimizer", "SchemaOptimizer for the loaded schema")
+    query_preprocessor = _schema_state_property("query_preprocessor", "QueryPreprocessor for the loaded schema")
+    sql_validator = _schema_state_property("sql_validator", "SQLValidator for the loaded schema")
+    _schema_loaded_at = _schema_state_property("loaded_at", "time.monotonic() of the last load or re-check")
+    _table_names = _schema_state_property("table_names", "Table names of the loaded schema")
+    _table_name_set = _schema_state_property("table_name_set", "Lower-cased table names")
+    _table_names_joined = _schema_state_property("table_names_joined", "Table names joined with ', '")
+    _column_map = _schema_state_property("column_map", "Column names by table")
+    
+    # Digest of the system prompt the last warm-up sent (None = never warmed)
+    _warmed_prompt_digest: Optional[str] = None
+    
+    # Metadata query per database type (MySQL can query INFORMATION_SCHEMA directly)
+    _METADATA_SQL: ClassVar[Dict[DatabaseType, str]] = {
+        DatabaseType.MYSQL: """SELECT TABLE_NAME, TABLE_ROWS, TABLE_COMMENT 
+FROM INFORMATION_SCHEMA.TABLES 
+WHERE TABLE_SCHEMA = DATABASE()
+ORDER BY TABLE_NAME""",
+        DatabaseType.POSTGRESQL: """SELECT tablename, schemaname 
+FROM pg_catalog.pg_tables 
+WHERE schemaname NOT IN ('pg_catalog', 'information_schema')
+ORDER BY tablename""",
+    }
+    
+    # Exact-match response cache only serves (near-)deterministic requests
+    RESPONSE_CACHE_MAX_TEMPERATURE: ClassVar[float] = 0.1
+    RESPONSE_CACHE_MAX_ENTRIES: ClassVar[int] = 1024
+    
+    # Batch API request URL per provider; Azure routes by the deployment
+    # named in each request's "model" and has no /v1 prefix
+    BATCH_API_ENDPOINTS: ClassVar[Dict[LLMProvider, str]] = {
+        LLMProvider.OPENAI: "/v1/chat/completions",
+        LLMProvider.AZURE_OPENAI: "/chat/completions",
+    }
+    
+    # Question-part tokens packed into one batch-prompted call
+    BATCH_PROMPT_MAX_TOKENS: ClassVar[int] = 6000
+    
+    # OpenAI only caches prompt prefixes of at least this many tokens
+    PROMPT_CACHE_MIN_TOKENS: ClassVar[int] = 1024
+    
+    # Context window by model name prefix (longest match wins), for sizing few-shot examples
+    MODEL_CONTEXT_TOKENS: ClassVar[Dict[str, int]] = {
+        "gpt-4o": 128000,
+        "gpt-4.1": 1000000,
+        "gpt-4-turbo": 128000,
+        "gpt-4": 8192,
+        "gpt-3.5-turbo": 16385,
+        "o1": 200000,
+        "o3": 200000,
+        "claude": 200000,
+        "gemini": 1000000,
+    }
+    DEFAULT_CONTEXT_TOKENS: ClassVar[int] = 8192
+    # Tokens left free for the model's response
+    RESPONSE_TOKEN_RESERVE: ClassVar[int] = 1024
+    
     def __init__(
         self,
         connection_string: str,
@@ -67,7 +232,14 @@ class NL2SQLConverter:
         enable_few_shot: bool = True,
         enable_auto_execute: bool = False,
         default_limit: int = 100,
-        enable_caching: bool = True  # New: Enable prompt/SQL caching
+        enable_caching: bool = True,  # New: Enable prompt/SQL caching
+        enable_semantic_cache: bool = True,
+        max_concurrent_requests: int = 5,
+        requests_per_minute: int = 200,
+        tokens_per_minute: int = 40000,
+        max_schema_tokens: int = 4000,
+        warm_prompt_cache: bool = False,
+        schema_refresh_interval: Optional[float] = None
     ):
         """
         Initialize NL2SQL converter with multi-LLM provider support
@@ -82,6 +254,20 @@ class NL2SQLConverter:
             enable_auto_execute: Automatically execute generated queries
             default_limit: Default LIMIT for queries
             enable_caching: Enable prompt and SQL caching (default: True)
+            enable_semantic_cache: Reuse SQL for similar past questions (embeds and
+                stores questions; disable when they may contain PII)
+            max_concurrent_requests: Maximum in-flight LLM calls in batch_generate
+            requests_per_minute: Provider RPM budget for batch_generate
+            tokens_per_minute: Provider input TPM budget for batch_generate
+            max_schema_tokens: Token budget for the schema in prompts (larger schemas
+                are pruned to the tables matching the question)
+            warm_prompt_cache: Send a 1-token request with the system prompt after
+                each schema load so the first real question hits the provider's
+                prompt cache (OpenAI/Azure only). Off by default since every
+                warm-up is a billed request; skipped when the system prompt is
+                unchanged since the previous warm-up
+            schema_refresh_interval: Seconds after which the loaded schema is re-checked
+                in the background, off the request path (None = never)
         """
         self.connection_string = connection_string
         self.database_type = database_type
@@ -89,6 +275,9 @@ class NL2SQLConverter:
         self.enable_auto_execute = enable_auto_execute
         self.default_limit = default_limit
         self.enable_caching = enable_caching
+        self.max_schema_tokens = max_schema_tokens
+        self.warm_prompt_cache = warm_prompt_cache
+        self.schema_refresh_interval = schema_refresh_interval
         
         # Initialize LLM client with multi-provider support
         if llm_config is None:
@@ -122,11 +311,27 @@ class NL2SQLConverter:
         self.llm_config = llm_config
         self.model = llm_config.model
         self.client = get_llm_client(llm_config)
+        self._count_tokens = get_token_counter(self.model)
+        
+        # Batch dispatch limits (stay under provider rate limits instead of retrying 429s)
+        self.max_concurrent_requests = max_concurrent_requests
+        self._rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
         
         # Initialize schema extractor
         self.schema_extractor = SchemaExtractor(connection_string, database_type)
-        self.schema: Optional[DatabaseSchema] = None
-        self.schema_text: Optional[str] = None
+        # Schema and everything derived from it (see _SchemaState)
+        self._schema_state = _SchemaState()
+        self._schema_refresh: Optional[Future] = None
+        
+        # Assembled fallback prompt parts (cleared on schema load)
+        self._system_prompt_cache: Dict[tuple, str] = {}
+        self._system_prompt_tokens: Dict[str, int] = {}
+        # Formatted token count of each few-shot example, by question
+        self._example_tokens: Dict[str, int] = {}
+        
+        # Exact-match responses for deterministic requests (cleared on schema load)
+        # Entries keep the dumped dict too, so ask() can skip model_dump on hits
+        self._response_cache: "OrderedDict[str, Tuple[SQLQuery, Dict[str, Any]]]" = OrderedDict()
         
         # Initialize query executor
         self.query_executor = QueryExecutor(
@@ -137,19 +342,21 @@ class NL2SQLConverter:
         
         logger.info(f"NL2SQL Converter initialized with {database_type} database")
         
-        # Optimizers (initialized after schema load)
-        self.schema_optimizer: Optional[SchemaOptimizer] = None
-        self.query_preprocessor: Optional[QueryPreprocessor] = None
-        self.sql_validator: Optional[SQLValidator] = None
+        # Schema-independent post-processing (optimizers come with the schema state)
         self.sql_postprocessor = SQLPostProcessor(default_limit=default_limit)
         
         # Caching components
         self.schema_version_manager = SchemaVersionManager()
         self.cache_manager: Optional[CacheManager] = None
         self.prompt_builder: Optional[PromptBuilder] = None
-        self.semantic_cache: Optional[SemanticCache] = None
         self.query_plan_cache: Optional[QueryPlanCache] = None
         
+        # Semantic cache and example retriever are created on first use, so
+        # converters that never generate SQL don't load an embedding model
+        self._semantic_cache: Optional["SemanticCache"] = None
+        self._example_retriever: Optional["ExampleRetriever"] = None
+        self._semantic_cache_pending = enable_caching and enable_semantic_cache
+        
         if self.enable_caching:
             try:
                 self.cache_manager = get_cache_manager()
@@ -158,13 +365,53 @@ class NL2SQLConverter:
                     schema_version_manager=self.schema_version_manager,
                     enable_caching=True
                 )
-                self.semantic_cache = get_semantic_cache()
                 self.query_plan_cache = get_query_plan_cache()
                 logger.info("Prompt, SQL, and Query Plan caching enabled")
             except Exception as e:
                 logger.warning(f"Failed to initialize caching: {e}. Continuing without cache.")
                 self.enable_caching = False
     
+    def _init_semantic_cache(self):
+        """Create the semantic cache and example retriever (deferred until first use)"""
+        self._semantic_cache_pending = False
+        if not self.enable_caching:
+            return
+        try:
+            from src.core.semantic_cache import get_semantic_cache
+            self._semantic_cache = get_semantic_cache()
+            if self.enable_few_shot:
+                from src.core.example_retriever import ExampleRetriever
+                # Questions are embedded for the cache anyway - reuse them for examples
+                self._example_retriever = ExampleRetriever(
+                    self._semantic_cache.embedder,
+                    database_type=self.database_type.value
+                )
+        except Exception as e:
+            logger.warning(f"Failed to initialize semantic cache: {e}. Continuing without it.")
+    
+    @property
+    def semantic_cache(self) -> Optional["SemanticCache"]:
+        """Semantic SQL cache (created, with its embedder, on first access)"""
+        if self._semantic_cache_pending:
+            self._init_semantic_cache()
+        return self._semantic_cache
+    
+    @semantic_cache.setter
+    def semantic_cache(self, cache: Optional["SemanticCache"]):
+        self._semantic_cache = cache
+        self._semantic_cache_pending = False
+    
+    @property
+    def example_retriever(self) -> Optional["ExampleRetriever"]:
+        """Embedding-based few-shot retriever (created with the semantic cache)"""
+        if self._semantic_cache_pending:
+            self._init_semantic_cache()
+        return self._example_retriever
+    
+    @example_retriever.setter
+    def example_retriever(self, retriever: Optional["ExampleRetriever"]):
+        self._example_retriever = retriever
+    
     def load_schema(self, include_sample_data: bool = False) -> DatabaseSchema:
         """
         Load and cache database schema
@@ -176,51 +423,174 @@ class NL2SQLConverter:
             DatabaseSchema object
         """
         logger.info("Loading database schema...")
-        self.schema = self.schema_extractor.extract_schema(include_sample_data)
-        self.schema_text = self.schema_extractor.format_schema_for_llm(self.schema)
+        state = self._build_schema_state(self.schema_extractor.extract_schema(include_sample_data))
+        
+        # Publish in one assignment; a request pinned to this converter moves to it too
+        self._schema_state = state
+        pinned = _pinned_schema.get()
+        if pinned is not None and pinned[0] is self:
+            _pinned_schema.set((self, state))
         
-        # Initialize optimizers with schema info
-        self._init_optimizers()
+        self._system_prompt_cache.clear()
+        self._system_prompt_tokens.clear()
+        self._response_cache.clear()
         
         # Update schema version for cache invalidation
         if self.enable_caching:
+            previous_version = self.schema_version_manager.get_current_version()
             schema_changed = self.schema_version_manager.update_schema(self.schema)
             if schema_changed and self.cache_manager:
                 version = self.schema_version_manager.get_current_version()
                 self.cache_manager.update_schema_version(version)
                 logger.info(f"Schema version updated: {version}")
+                if previous_version and self._semantic_cache:
+                    self._carry_over_sql_cache(previous_version, version)
         
         logger.info(f"Schema loaded: {self.schema.total_tables} tables")
+        
+        if self.warm_prompt_cache:
+            threading.Thread(
+                target=self._warm_prompt_cache, name="nl2sql-prompt-warmup", daemon=True
+            ).start()
         return self.schema
     
-    def _init_optimizers(self):
-        """Initialize schema optimizer, preprocessor, and validator"""
-        if self.schema is None:
+    def _warm_prompt_cache(self):
+        """
+        Prime the provider's prompt-prefix cache with the static system prompt
+        
+        Best effort: runs in the background after load_schema and never raises.
+        Skipped for providers without automatic prefix caching, for prompts
+        too short to be cached and for a prompt identical to the last one warmed.
+        """
+        if self.llm_config.provider not in (LLMProvider.OPENAI, LLMProvider.AZURE_OPENAI):
             return
         
+        try:
+            # Same system message a standalone question gets (schema at full size)
+            if self.schema_optimizer:
+                schema_text = self.schema_optimizer.format_budgeted_schema("", self.max_schema_tokens)
+            else:
+                schema_text = self.schema_text
+            if self.prompt_builder and self.enable_caching:
+                system_message = self.prompt_builder.build_prompt(
+                    question="OK",
+                    schema_text=schema_text,
+                    database_type=self.database_type.value,
+                    schema_version=self.schema_version_manager.get_current_version(),
+                    enable_few_shot=self.enable_few_shot
+                ).messages[0]
+            else:
+                system_message = {"role": "system", "content": self._get_system_prompt(schema_text)}
+            
+            if get_token_counter(self.model)(system_message["content"]) < self.PROMPT_CACHE_MIN_TOKENS:
+                return
+            
+            # A reload that yields the same prompt finds the prefix already cached
+            digest = hashlib.blake2b(system_message["content"].encode(), digest_size=8).hexdigest()
+            if digest == self._warmed_prompt_digest:
+                logger.debug("Prompt cache warm-up skipped: system prompt unchanged")
+                return
+            self._warmed_prompt_digest = digest
+            
+            messages = [system_message, {"role": "user", "content": "OK"}]
+            self.client.chat.completions.create(
+                model=self.model,
+                response_model=None,
+                messages=messages,
+                max_tokens=1,
+                max_retries=0,
+                **self._prompt_cache_kwargs(messages)
+            )
+            logger.debug("Prompt cache warmed")
+        except Exception as e:
+            self._warmed_prompt_digest = None
+            logger.debug(f"Prompt cache warm-up failed: {e}")
+    
+    def _carry_over_sql_cache(self, previous_version: str, version: str):
+        """
+        Keep cached SQL for tables a schema change didn't touch
+        
+        Entries referencing removed or modified tables are invalidated; the
+        rest are re-tagged with the new version instead of all going stale.
+        Large changes (over half the tables) leave everything stale.
+        """
+        changes = self.schema_version_manager.last_changes
+        changed_tables = changes.get("tables_removed", []) + changes.get("tables_modified", [])
+        if len(changed_tables) > len(self.schema.tables) / 2:
+            logger.info(f"{len(changed_tables)} tables changed; not carrying over cached SQL")
+            return
+        
+        try:
+            if changed_tables:
+                self._semantic_cache.invalidate_tables(changed_tables)
+            kept = self._semantic_cache.restamp_schema_version(previous_version, version)
+            logger.info(f"Carried {kept} cached SQL entries over to schema {version}")
+        except Exception as e:
+            logger.warning(f"Failed to carry over SQL cache: {e}")
+    
+    def _maybe_refresh_schema(self):
+        """Start a background schema re-check once the schema is close to stale"""
+        if not self.schema_refresh_interval or self._schema_loaded_at is None:
+            return
+        if time.monotonic() - self._schema_loaded_at < self.schema_refresh_interval * 0.8:
+            return
+        if self._schema_refresh is None or self._schema_refresh.done():
+            self._schema_refresh = _schema_refresh_executor.submit(self._refresh_schema)
+    
+    def _refresh_schema(self):
+        """Re-extract the schema, reloading (and resetting caches) only if it changed"""
+        try:
+            schema = self.schema_extractor.extract_schema(refresh=True)
+            current = self.schema_version_manager.compute_schema_hash(self.schema)
+            if self.schema_version_manager.compute_schema_hash(schema) == current:
+                self._schema_state.loaded_at = time.monotonic()
+                logger.debug("Schema refresh: unchanged")
+            else:
+                self.load_schema()
+        except Exception as e:
+            logger.warning(f"Background schema refresh failed: {e}")
+    
+    @property
+    def _state(self) -> _SchemaState:
+        """Schema state for the current request (pinned) or the latest published one"""
+        pinned = _pinned_schema.get()
+        if pinned is not None and pinned[0] is self:
+            return pinned[1]
+        return self._schema_state
+    
+    def _build_schema_state(self, schema: DatabaseSchema) -> _SchemaState:
+        """Build the schema optimizer, preprocessor and validator for a schema (without publishing)"""
         # Schema optimizer for compact representation
-        self.schema_optimizer = SchemaOptimizer(self.schema)
+        schema_optimizer = SchemaOptimizer(schema, model=self.model)
         
         # Get table and column names for preprocessor/validator
-        table_names = [t.table_name for t in self.schema.tables]
+        table_names = [t.table_name for t in schema.tables]
         column_names = []
         column_map = {}
         
-        for table in self.schema.tables:
+        for table in schema.tables:
             cols = [c["name"] for c in table.columns]
             column_names.extend(cols)
             column_map[table.table_name] = cols
         
-        # Query preprocessor for Vietnamese + classification
-        self.query_preprocessor = QueryPreprocessor(table_names, column_names)
-        
-        # SQL validator
-        self.sql_validator = SQLValidator(
+        return _SchemaState(
+            schema=schema,
+            schema_text=self.schema_extractor.format_schema_for_llm(schema),
+            loaded_at=time.monotonic(),
+            schema_optimizer=schema_optimizer,
+            # Query preprocessor for Vietnamese + classification
+            query_preprocessor=QueryPreprocessor(table_names, column_names),
+            # SQL validator
+            sql_validator=SQLValidator(
+                table_names=table_names,
+                column_map=column_map,
+                relationships=schema_optimizer.relationships
+            ),
             table_names=table_names,
-            column_map=column_map,
-            relationships=self.schema_optimizer.relationships
+            table_name_set=frozenset(name.lower() for name in table_names),
+            table_names_joined=", ".join(table_names),
+            column_map=column_map
         )
-        return self.schema
     
     def _is_schema_query(self, question: str) -> bool:
         """
@@ -234,11 +604,9 @@ class NL2SQLConverter:
             True if question is about schema/metadata
         """
         question_lower = question.lower()
-        
-        for pattern in SCHEMA_QUERY_PATTERNS:
-            if re.search(pattern, question_lower, re.IGNORECASE):
-                return True
-        return False
+        if not any(keyword in question_lower for keyword in _SCHEMA_TRIGGER_KEYWORDS):
+            return False
+        return _SCHEMA_QUERY_RE.search(question_lower) is not None
     
     def _generate_schema_response(self, question: str) -> SQLQuery:
         """
@@ -253,37 +621,22 @@ class NL2SQLConverter:
         if self.schema is None:
             self.load_schema()
         
-        # Get table names
-        table_names = self.schema_extractor.get_table_names()
-        
-        # Build schema summary
-        schema_info = []
-        schema_info.append(f"Database có {len(table_names)} bảng:")
-        for table in self.schema.tables:
-            col_count = len(table.columns)
-            # Columns are dicts with "name", "type", "primary_key" keys
-            pk_cols = [c["name"] for c in table.columns if c.get("primary_key", False)]
-            pk_info = f" (PK: {', '.join(pk_cols)})" if pk_cols else ""
-            schema_info.append(f"  - {table.table_name}: {col_count} cột{pk_info}")
-        
-        explanation = "\n".join(schema_info)
-        
-        # For MySQL, we can actually query INFORMATION_SCHEMA
-        if self.database_type == DatabaseType.MYSQL:
-            sql = """SELECT TABLE_NAME, TABLE_ROWS, TABLE_COMMENT 
-FROM INFORMATION_SCHEMA.TABLES 
-WHERE TABLE_SCHEMA = DATABASE()
-ORDER BY TABLE_NAME"""
-        else:
-            # PostgreSQL
-            sql = """SELECT tablename, schemaname 
-FROM pg_catalog.pg_tables 
-WHERE schemaname NOT IN ('pg_catalog', 'information_schema')
-ORDER BY tablename"""
+        # The summary only depends on the loaded schema, so it lives on its state
+        state = self._state
+        if state.summary is None:
+            schema_info = []
+            schema_info.append(f"Database có {len(state.table_names)} bảng:")
+            for table in state.schema.tables:
+                col_count = len(table.columns)
+                # Columns are dicts with "name", "type", "primary_key" keys
+                pk_names = ", ".join(c["name"] for c in table.columns if c.get("primary_key", False))
+                pk_info = f" (PK: {pk_names})" if pk_names else ""
+                schema_info.append(f"  - {table.table_name}: {col_count} cột{pk_info}")
+            state.summary = "\n".join(schema_info)
         
         return SQLQuery(
-            query=sql,
-            explanation=explanation,
+            query=self._METADATA_SQL[self.database_type],
+            explanation=state.summary,
             confidence=1.0,
             tables_used=["INFORMATION_SCHEMA"],
             potential_issues=["Đây là metadata query, không phải data query"]
@@ -404,7 +757,8 @@ Try asking a data question! 💡"""
         max_retries: int = 2,
         conversation_history: Optional[List[Dict[str, str]]] = None,
         enable_self_correction: bool = True,
-        use_cache: bool = True  # New: Use cached SQL if available
+        use_cache: bool = True,  # New: Use cached SQL if available
+        format_output: bool = True
     ) -> SQLQuery:
         """
         Generate SQL query from natural language question
@@ -416,13 +770,323 @@ Try asking a data question! 💡"""
             conversation_history: Previous conversation messages for context
             enable_self_correction: Enable automatic retry with error feedback
             use_cache: Try to use cached SQL before calling LLM
+            format_output: Pretty-print the SQL; pass False when the query is only
+                executed, never shown (unformatted results are not cached)
             
         Returns:
             SQLQuery object
         """
-        # Load schema if not already loaded
+        return self._generate_sql(
+            question, temperature, max_retries, conversation_history,
+            enable_self_correction, use_cache, format_output
+        )[0]
+    
+    @_pins_schema_state
+    def _generate_sql(
+        self,
+        question: str,
+        temperature: float = 0.1,
+        max_retries: int = 2,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        enable_self_correction: bool = True,
+        use_cache: bool = True,
+        format_output: bool = True
+    ) -> Tuple[SQLQuery, Optional[Dict[str, Any]]]:
+        """
+        generate_sql, also returning the response's model_dump() on response cache hits
+        
+        Returns:
+            (SQLQuery, its dumped dict if served from the response cache else None)
+        """
+        prepared = self._prepare_generation(question, conversation_history, use_cache)
+        if isinstance(prepared, SQLQuery):
+            return prepared, None
+        messages, schema_version, query_type = prepared
+        
+        response_key, cached = self._lookup_response(messages, temperature)
+        if cached is not None:
+            response, dumped = cached
+            return response.model_copy(deep=True), self._copy_dump(dumped)
+        
+        logger.info(f"Generating SQL for question: {question}")
+        
+        try:
+            # Call LLM with Instructor for structured output
+            try:
+                response, completion = self.client.chat.completions.create_with_completion(
+                    model=self.model,
+                    response_model=SQLQuery,
+                    messages=self._provider_messages(messages),
+                    temperature=temperature,
+                    max_retries=max_retries,
+                    **self._prompt_cache_kwargs(messages)
+                )
+                self._log_prompt_cache_usage(completion)
+            except Exception as e:
+                response = self._recover_unstructured_sql(e, messages, temperature)
+                if response is None:
+                    raise
+            
+            result = self._finalize_response(
+                question, response, messages, schema_version, query_type,
+                temperature, enable_self_correction, format_output
+            )
+            if response_key is not None and format_output:
+                self._store_response(response_key, result)
+            return result, None
+        
+        except Exception as e:
+            logger.error(f"Failed to generate SQL: {e}")
+            raise
+    
+    def generate_sql_stream(
+        self,
+        question: str,
+        temperature: float = 0.1,
+        max_retries: int = 2,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        enable_self_correction: bool = True,
+        use_cache: bool = True
+    ) -> Iterator[Any]:
+        """
+        Generate SQL, yielding partial results while the model is still decoding
+        
+        The query field is emitted first, so callers can show ``partial.query``
+        as soon as it is non-empty while the explanation is still streaming.
+        Partial objects may have any field set to None; the last item yielded
+        is always the validated, post-processed SQLQuery.
+        
+        Args:
+            Same as generate_sql
+        
+        Yields:
+            Partial SQLQuery objects, then the final SQLQuery
+        """
+        prepared = self._prepare_generation(question, conversation_history, use_cache)
+        if isinstance(prepared, SQLQuery):
+            yield prepared
+            return
+        messages, schema_version, query_type = prepared
+        
+        response_key, cached = self._lookup_response(messages, temperature)
+        if cached is not None:
+            yield cached[0].model_copy(deep=True)
+            return
+        
+        logger.info(f"Streaming SQL for question: {question}")
+        
+        try:
+            final = None
+            for partial in self.client.chat.completions.create_partial(
+                model=self.model,
+                response_model=SQLQuery,
+                messages=self._provider_messages(messages),
+                temperature=temperature,
+                max_retries=max_retries,
+                **self._prompt_cache_kwargs(messages)
+            ):
+                final = partial
+                yield partial
+            
+            if final is None:
+                raise ValueError("LLM stream returned no content")
+            
+            response = SQLQuery.model_validate(final.model_dump())
+            result = self._finalize_response(
+                question, response, messages, schema_version, query_type,
+                temperature, enable_self_correction
+            )
+            if response_key is not None:
+                self._store_response(response_key, result)
+            yield result
+        
+        except Exception as e:
+            logger.error(f"Failed to stream SQL: {e}")
+            raise
+    
+    def _lookup_response(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float
+    ) -> Tuple[Optional[str], Optional[Tuple[SQLQuery, Dict[str, Any]]]]:
+        """
+        Check the exact-match response cache
+        
+        Returns:
+            (cache key or None if the request is not cacheable,
+             cached (response, dumped response) or None - callers must copy before handing out)
+        """
+        if temperature > self.RESPONSE_CACHE_MAX_TEMPERATURE:
+            return None, None
+        key = self._response_cache_key(messages)
+        cached = self._response_cache.get(key)
+        if cached is None:
+            return key, None
+        self._response_cache.move_to_end(key)
+        logger.debug("Response cache HIT")
+        return key, cached
+    
+    @staticmethod
+    def _response_cache_key(messages: List[Dict[str, str]]) -> str:
+        """Hash the full prompt (system prompt, history and question)"""
+        prompt = "\x00".join(f"{m['role']}\x00{m['content']}" for m in messages)
+        return hashlib.sha256(prompt.encode()).hexdigest()
+    
+    def _store_response(self, key: str, response: SQLQuery):
+        """Keep a private copy of a generated query, evicting the least recently used"""
+        self._response_cache[key] = (response.model_copy(deep=True), response.model_dump())
+        self._response_cache.move_to_end(key)
+        if len(self._response_cache) > self.RESPONSE_CACHE_MAX_ENTRIES:
+            self._response_cache.popitem(last=False)
+    
+    @staticmethod
+    def _copy_dump(dumped: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy a cached SQLQuery dump (its only mutable values are lists of strings)"""
+        return {k: list(v) if isinstance(v, list) else v for k, v in dumped.items()}
+    
+    def _recover_unstructured_sql(
+        self,
+        error: Exception,
+        messages: List[Dict[str, str]],
+        temperature: float
+    ) -> Optional[SQLQuery]:
+        """
+        Salvage SQL after Instructor exhausted its structured-output retries
+        
+        The last raw completion usually contains usable SQL, so it is parsed
+        first; only if that fails is one plain (unstructured) call made.
+        
+        Args:
+            error: Exception raised by the structured call
+            messages: Prompt messages
+            temperature: Model temperature
+        
+        Returns:
+            Low-confidence SQLQuery, or None if the error was not an output
+            validation failure or no SQL could be found
+        """
+        # Only Instructor retry exhaustion carries attempt info; re-raise anything else
+        if not hasattr(error, "n_attempts"):
+            return None
+        
+        logger.warning(f"Structured output failed ({error}); falling back to SQL extraction")
+        sql = self._extract_sql(self._completion_text(getattr(error, "last_completion", None)))
+        
+        if not sql:
+            try:
+                completion = self.client.chat.completions.create(
+                    model=self.model,
+                    response_model=None,
+                    messages=self._provider_messages(messages + [{
+                        "role": "user",
+                        "content": "Reply with only the SQL query in a ```sql code block."
+                    }]),
+                    temperature=temperature,
+                    max_retries=0,
+                    **self._prompt_cache_kwargs(messages)
+                )
+            except Exception as e:
+                logger.warning(f"Unstructured fallback call failed: {e}")
+                return None
+            sql = self._extract_sql(self._completion_text(completion))
+        
+        if not sql:
+            return None
+        
+        return SQLQuery(
+            query=sql,
+            explanation="",
+            confidence=0.6,
+            potential_issues=["Recovered from unstructured LLM output"]
+        )
+    
+    @staticmethod
+    def _completion_text(completion: Any) -> str:
+        """Raw text of a chat completion (message content or tool-call arguments)"""
+        try:
+            message = completion.choices[0].message
+        except (AttributeError, IndexError, TypeError):
+            return ""
+        if message.content:
+            return message.content
+        for tool_call in getattr(message, "tool_calls", None) or []:
+            try:
+                query = json.loads(tool_call.function.arguments).get("query")
+            except (ValueError, AttributeError):
+                continue
+            if query:
+                return f"```sql\n{query}\n```"
+        return ""
+    
+    @staticmethod
+    def _extract_sql(text: str) -> Optional[str]:
+        """Pull a SQL query out of free-form LLM text"""
+        match = _SQL_FENCE_RE.search(text) or _SQL_STATEMENT_RE.search(text)
+        if not match:
+            return None
+        sql = (match.group(1) if match.re is _SQL_FENCE_RE else match.group(0)).strip()
+        return sql or None
+    
+    def _prompt_cache_kwargs(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """
+        Extra request args that pin requests sharing a system prompt to the
+        same OpenAI prompt-cache shard (other providers don't accept them)
+        """
+        if self.llm_config.provider not in (LLMProvider.OPENAI, LLMProvider.AZURE_OPENAI):
+            return {}
+        prefix_hash = hashlib.blake2b(messages[0]["content"].encode(), digest_size=8).hexdigest()
+        return {"user": f"nl2sql-{prefix_hash}"}
+    
+    def _provider_messages(self, messages: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Messages as sent to the provider
+        
+        OpenAI caches prompt prefixes automatically; Anthropic only caches up to
+        an explicit breakpoint, so the system prompt is marked as one.
+        """
+        if self.llm_config.provider != LLMProvider.ANTHROPIC or messages[0]["role"] != "system":
+            return messages
+        system = {
+            "role": "system",
+            "content": [{
+                "type": "text",
+                "text": messages[0]["content"],
+                "cache_control": {"type": "ephemeral"}
+            }]
+        }
+        return [system, *messages[1:]]
+    
+    def _log_prompt_cache_usage(self, completion: Any):
+        """Log how many prompt tokens the provider served from its prefix cache"""
+        usage = getattr(completion, "usage", None)
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None)
+        if cached_tokens is not None:
+            logger.debug(f"Prompt cache: {cached_tokens}/{usage.prompt_tokens} prompt tokens cached")
+        
+        # Anthropic reports cache reads separately from uncached input tokens
+        cache_read = getattr(usage, "cache_read_input_tokens", None)
+        if cache_read is not None:
+            logger.debug(f"Prompt cache: {cache_read} input tokens read from cache")
+    
+    def _prepare_generation(
+        self,
+        question: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        use_cache: bool = True
+    ) -> Union[SQLQuery, Tuple[List[Dict[str, str]], Optional[str], Optional[QueryType]]]:
+        """
+        Everything generate_sql does before calling the LLM
+        
+        Returns:
+            A finished SQLQuery when no LLM call is needed (schema question,
+            cache hit, greeting), otherwise (messages, schema_version, query_type)
+        """
+        # Load schema if not already loaded (refreshed in the background once stale)
         if self.schema is None:
             self.load_schema()
+        else:
+            self._maybe_refresh_schema()
         
         # Check if this is a schema/metadata question
         if self._is_schema_query(question):
@@ -432,6 +1096,22 @@ Try asking a data question! 💡"""
         # Get current schema version
         schema_version = self.schema_version_manager.get_current_version()
         
+        # Same question shape with different literals: re-bind them into the cached SQL
+        if use_cache and self.enable_caching and self.query_plan_cache and not conversation_history:
+            shaped = self.query_plan_cache.get_by_shape(question, schema_version)
+            if shaped:
+                plan, sql = shaped
+                # Re-bound SQL is new SQL: same checks as a fresh generation, else ask the LLM
+                if self._is_valid_sql(sql):
+                    return SQLQuery(
+                        query=format_sql(self.sql_postprocessor.process(sql)),
+                        explanation="Generated from cached SQL for a question differing only in values",
+                        confidence=plan.confidence,
+                        tables_used=plan.tables_used,
+                        potential_issues=[f"Literal-substituted template, hit_count: {plan.hit_count}"]
+                    )
+                logger.info("Re-bound shape cache SQL failed validation, generating instead")
+        
         # Try semantic cache first (if enabled and not in conversation context)
         if use_cache and self.enable_caching and self.semantic_cache:
             if not conversation_history:  # Only use cache for standalone queries
@@ -492,7 +1172,7 @@ Try asking a data question! 💡"""
         
         # Use compact schema representation
         if self.schema_optimizer:
-            compact_schema = self.schema_optimizer.format_compact_schema(include_types=False)
+            compact_schema = self.schema_optimizer.format_budgeted_schema(question, self.max_schema_tokens)
             # Get relevant tables for targeted examples (convert TableSchema to table names)
             relevant_table_objs = self.schema_optimizer.get_relevant_tables(question) if hasattr(self.schema_optimizer, 'get_relevant_tables') else None
             relevant_tables = [t.table_name for t in relevant_table_objs] if relevant_table_objs else None
@@ -517,132 +1197,250 @@ Try asking a data question! 💡"""
             if built_prompt.cache_info.get("components_cached"):
                 logger.debug(f"Using cached prompt components (tokens saved: {built_prompt.cache_info.get('tokens_saved', 0)})")
         else:
-            # Fallback to original prompt building
-            system_prompt = get_full_system_prompt(compact_schema, self.database_type.value)
-            
-            # Add query type specific hints
-            if processed:
-                query_type_hint = get_query_type_prompt(processed.query_type.value)
-                if query_type_hint:
-                    system_prompt = f"{system_prompt}\n{query_type_hint}"
-            
-            # Add few-shot examples if enabled
-            if self.enable_few_shot:
-                examples = get_relevant_examples(question, max_examples=3)
-                if not examples:
-                    examples = get_few_shot_examples(self.database_type.value)[:3]
-                examples_text = format_examples_for_prompt(examples)
-                system_prompt = f"{system_prompt}\n\n{examples_text}"
-            
-            messages = [{"role": "system", "content": system_prompt}]
-            
-            if conversation_history:
-                for msg in conversation_history[-6:]:
-                    messages.append(msg)
+            # Fallback to original prompt building. The system prompt is static so
+            # the provider's prompt-prefix cache can reuse it; per-question hints
+            # and examples go into the user turn.
+            system_prompt = self._get_system_prompt(compact_schema)
             
             if processed and processed.normalized != question.lower():
                 user_prompt = get_user_prompt_template(f"{question}\n(Interpreted: {processed.normalized})")
             else:
                 user_prompt = get_user_prompt_template(question)
-            messages.append({"role": "user", "content": user_prompt})
+            
+            history = conversation_history[-6:] if conversation_history else ()
+            
+            # Few-shot examples get whatever the context window has left
+            example_budget = (
+                self._context_window()
+                - self._get_system_prompt_tokens(system_prompt)
+                - self._count_tokens(user_prompt)
+                - sum(self._count_tokens(msg.get("content", "")) for msg in history)
+                - self.RESPONSE_TOKEN_RESERVE
+            )
+            prompt_context = self._get_prompt_context(
+                question, processed.query_type.value if processed else None, example_budget
+            )
+            if prompt_context:
+                user_prompt = f"{prompt_context}\n\n{user_prompt}"
+            
+            messages = [
+                {"role": "system", "content": system_prompt},
+                *history,
+                {"role": "user", "content": user_prompt}
+            ]
         
-        logger.info(f"Generating SQL for question: {question}")
+        return messages, schema_version, query_type
+    
+    def _get_system_prompt(self, compact_schema: str) -> str:
+        """
+        Get the fallback system prompt, assembled once per schema text
         
-        try:
-            # Call LLM with Instructor for structured output
-            response = self.client.chat.completions.create(
-                model=self.model,
-                response_model=SQLQuery,
-                messages=messages,
-                temperature=temperature,
-                max_retries=max_retries
-            )
+        Args:
+            compact_schema: Schema text for the prompt
+        
+        Returns:
+            System prompt (byte-identical across calls for prefix caching)
+        """
+        cache_key = ("system", compact_schema, self.database_type.value)
+        system_prompt = self._system_prompt_cache.get(cache_key)
+        if system_prompt is None:
+            system_prompt = get_full_system_prompt(compact_schema, self.database_type.value)
+            self._system_prompt_cache[cache_key] = system_prompt
+        return system_prompt
+    
+    def _context_window(self) -> int:
+        """Context window of the configured model, in tokens"""
+        model = (self.model or "").lower()
+        matches = [prefix for prefix in self.MODEL_CONTEXT_TOKENS if model.startswith(prefix)]
+        if not matches:
+            return self.DEFAULT_CONTEXT_TOKENS
+        return self.MODEL_CONTEXT_TOKENS[max(matches, key=len)]
+    
+    def _get_system_prompt_tokens(self, system_prompt: str) -> int:
+        """Token count of a fallback system prompt (counted once per prompt)"""
+        tokens = self._system_prompt_tokens.get(system_prompt)
+        if tokens is None:
+            tokens = self._count_tokens(system_prompt)
+            self._system_prompt_tokens[system_prompt] = tokens
+        return tokens
+    
+    def _example_token_len(self, example: Dict[str, Any]) -> int:
+        """Token count of one formatted few-shot example (counted once per example)"""
+        tokens = self._example_tokens.get(example["question"])
+        if tokens is None:
+            tokens = self._count_tokens(format_examples_for_prompt([example]))
+            self._example_tokens[example["question"]] = tokens
+        return tokens
+    
+    def _get_prompt_context(
+        self,
+        question: str,
+        query_type: Optional[str] = None,
+        max_example_tokens: Optional[int] = None
+    ) -> str:
+        """
+        Get per-question few-shot examples and query type hints
+        
+        Args:
+            question: Question used to pick few-shot examples
+            query_type: Query type value for type-specific hints
+            max_example_tokens: Token budget for the examples (None = unbounded);
+                examples are packed greedily in relevance order
+        
+        Returns:
+            Text to put ahead of the question in the user message ("" if none)
+        """
+        examples = None
+        if self.enable_few_shot:
+            if self.example_retriever:
+                try:
+                    examples = self.example_retriever.retrieve(question, k=3)
+                except Exception as e:
+                    logger.warning(f"Example retrieval failed: {e}. Using keyword matching.")
+            if not examples:
+                examples = get_relevant_examples(question, max_examples=3)
+            if not examples:
+                examples = get_few_shot_examples(self.database_type.value)[:3]
+            if max_example_tokens is not None:
+                examples = fit_examples_to_budget(examples, max_example_tokens, self._example_token_len)
+        
+        cache_key = (
+            "context",
+            query_type,
+            tuple(ex["question"] for ex in examples) if examples else None
+        )
+        context = self._system_prompt_cache.get(cache_key)
+        if context is not None:
+            return context
+        
+        parts = []
+        # Examples first: they repeat across questions more often than hints
+        if examples:
+            parts.append(format_examples_for_prompt(examples))
+        if query_type:
+            query_type_hint = get_query_type_prompt(query_type)
+            if query_type_hint:
+                parts.append(query_type_hint)
+        
+        context = "\n".join(parts)
+        self._system_prompt_cache[cache_key] = context
+        return context
+    
+    def _finalize_response(
+        self,
+        question: str,
+        response: SQLQuery,
+        messages: List[Dict[str, str]],
+        schema_version: Optional[str],
+        query_type: Optional[QueryType],
+        temperature: float,
+        enable_self_correction: bool = True,
+        format_output: bool = True
+    ) -> SQLQuery:
+        """
+        Validate, self-correct, post-process and cache an LLM response
+        
+        With format_output=False the query is left unformatted and not written
+        to the semantic cache (cached SQL is always the formatted form).
+        """
+        # Advanced validation with SQLValidator
+        validation_result = None
+        if self.sql_validator:
+            validation_result = self.sql_validator.validate(response.query)
             
-            # Advanced validation with SQLValidator
-            validation_result = None
-            if self.sql_validator:
-                validation_result = self.sql_validator.validate(response.query)
+            if not validation_result.is_valid:
+                error_feedback = self.sql_validator.generate_error_feedback(validation_result)
+                logger.warning(f"Query validation failed: {len(validation_result.errors)} errors")
                 
-                if not validation_result.is_valid:
-                    error_feedback = self.sql_validator.generate_error_feedback(validation_result)
-                    logger.warning(f"Query validation failed: {len(validation_result.errors)} errors")
-                    
-                    if response.potential_issues is None:
-                        response.potential_issues = []
-                    
-                    for err in validation_result.errors:
-                        response.potential_issues.append(f"{err.error_type.value}: {err.message}")
-                    
-                    response.confidence *= 0.3
-                    
-                    # Try self-correction if enabled
-                    if enable_self_correction:
-                        corrected = self._self_correct_query(
-                            question, response, error_feedback, messages, temperature
-                        )
-                        if corrected:
-                            return corrected
+                if response.potential_issues is None:
+                    response.potential_issues = []
                 
-                # Add warnings to potential_issues
-                for warning in validation_result.warnings[:3]:
-                    if response.potential_issues is None:
-                        response.potential_issues = []
-                    response.potential_issues.append(f"Warning: {warning.message}")
+                for err in validation_result.errors:
+                    response.potential_issues.append(f"{err.error_type.value}: {err.message}")
+                
+                response.confidence *= 0.3
+                
+                # Try self-correction if enabled
+                if enable_self_correction:
+                    corrected = self._self_correct_query(
+                        question, response, error_feedback, messages, temperature
+                    )
+                    if corrected:
+                        return corrected
             
-            else:
-                # Fallback to basic validation
-                is_valid, error_msg = validate_query_against_schema(
-                    response.query,
-                    self.schema_extractor.get_table_names()
-                )
+            # Add warnings to potential_issues
+            for warning in validation_result.warnings[:3]:
+                if response.potential_issues is None:
+                    response.potential_issues = []
+                response.potential_issues.append(f"Warning: {warning.message}")
+        
+        else:
+            # Fallback to basic validation
+            is_valid, error_msg = validate_query_against_schema(
+                response.query,
+                self._table_name_set
+            )
+            
+            if not is_valid:
+                logger.warning(f"Generated query references invalid tables: {error_msg}")
+                if response.potential_issues is None:
+                    response.potential_issues = []
+                response.potential_issues.append(error_msg)
+                response.confidence *= 0.5
                 
-                if not is_valid:
-                    logger.warning(f"Generated query references invalid tables: {error_msg}")
-                    if response.potential_issues is None:
-                        response.potential_issues = []
-                    response.potential_issues.append(error_msg)
-                    response.confidence *= 0.5
-                    
-                    if enable_self_correction:
-                        corrected = self._self_correct_query(
-                            question, response, error_msg, messages, temperature
-                        )
-                        if corrected:
-                            return corrected
-            
-            # Post-process SQL (add LIMIT, format, etc.)
-            response.query = self.sql_postprocessor.process(response.query)
-            
-            # Format SQL
-            response.query = format_sql(response.query)
-            
-            # Cache successful SQL result
-            if self.enable_caching and self.semantic_cache and response.confidence >= 0.7:
-                self.semantic_cache.cache_sql(
+                if enable_self_correction:
+                    corrected = self._self_correct_query(
+                        question, response, error_msg, messages, temperature
+                    )
+                    if corrected:
+                        return corrected
+        
+        # Post-process SQL (add LIMIT, format, etc.)
+        response.query = self.sql_postprocessor.process(response.query)
+        
+        if not format_output:
+            return response
+        
+        # Format SQL
+        response.query = format_sql(response.query)
+        
+        # Cache successful SQL result
+        if self.enable_caching and self.semantic_cache and response.confidence >= 0.7:
+            self.semantic_cache.cache_sql(
+                question=question,
+                sql=response.query,
+                explanation=response.explanation or "",
+                query_type=query_type.value if query_type else "unknown",
+                tables_used=response.tables_used or [],
+                schema_version=schema_version
+            )
+            
+            # Also cache as query plan for pattern-based reuse
+            if self.query_plan_cache:
+                self.query_plan_cache.put(
+                    question=question,
+                    sql=response.query,
+                    tables_used=response.tables_used or [],
+                    columns_used=[],  # Could extract from SQL if needed
+                    confidence=response.confidence
+                )
+                self.query_plan_cache.put_shape(
                     question=question,
                     sql=response.query,
-                    explanation=response.explanation or "",
-                    query_type=query_type.value if query_type else "unknown",
                     tables_used=response.tables_used or [],
+                    confidence=response.confidence,
                     schema_version=schema_version
                 )
-                
-                # Also cache as query plan for pattern-based reuse
-                if self.query_plan_cache:
-                    self.query_plan_cache.put(
-                        question=question,
-                        sql=response.query,
-                        tables_used=response.tables_used or [],
-                        columns_used=[],  # Could extract from SQL if needed
-                        confidence=response.confidence
-                    )
-            
-            logger.info(f"SQL generated successfully (confidence: {response.confidence})")
-            return response
         
-        except Exception as e:
-            logger.error(f"Failed to generate SQL: {e}")
-            raise
+        logger.info(f"SQL generated successfully (confidence: {response.confidence})")
+        return response
+    
+    def _is_valid_sql(self, sql: str) -> bool:
+        """Validate SQL that didn't come from the LLM (same checks as _finalize_response)"""
+        if self.sql_validator:
+            return self.sql_validator.validate(sql).is_valid
+        is_valid, _ = validate_query_against_schema(sql, self._table_name_set)
+        return is_valid
     
     def _self_correct_query(
         self,
@@ -668,24 +1466,27 @@ Try asking a data question! 💡"""
         logger.info(f"Attempting self-correction for query error")
         
         # Use improved self-correction prompt
-        table_names = self.schema_extractor.get_table_names()
         correction_prompt = get_self_correction_prompt(
             failed_response.query,
             error_message,
-            table_names
+            self._table_names_joined
         )
         
         try:
-            messages = original_messages.copy()
-            messages.append({"role": "assistant", "content": f"```sql\n{failed_response.query}\n```"})
-            messages.append({"role": "user", "content": correction_prompt})
+            # Original prompt first and unchanged, so its cached prefix is reused
+            messages = [
+                *original_messages,
+                {"role": "assistant", "content": f"```sql\n{failed_response.query}\n```"},
+                {"role": "user", "content": correction_prompt}
+            ]
             
             corrected_response = self.client.chat.completions.create(
                 model=self.model,
                 response_model=SQLQuery,
-                messages=messages,
+                messages=self._provider_messages(messages),
                 temperature=temperature,
-                max_retries=1
+                max_retries=1,
+                **self._prompt_cache_kwargs(messages)
             )
             
             # Validate corrected query with SQLValidator if available
@@ -696,7 +1497,7 @@ Try asking a data question! 💡"""
             else:
                 is_valid, _ = validate_query_against_schema(
                     corrected_response.query,
-                    self.schema_extractor.get_table_names()
+                    self._table_name_set
                 )
             
             if is_valid:
@@ -719,7 +1520,8 @@ Try asking a data question! 💡"""
     def generate_and_execute(
         self,
         question: str,
-        temperature: float = 0.1
+        temperature: float = 0.1,
+        format_output: bool = True
     ) -> tuple[SQLQuery, QueryResult]:
         """
         Generate SQL and execute it
@@ -727,18 +1529,21 @@ Try asking a data question! 💡"""
         Args:
             question: Natural language question
             temperature: Model temperature
+            format_output: Pretty-print the SQL (False skips formatting when only
+                the results are used, e.g. evaluation runs)
             
         Returns:
             Tuple of (SQLQuery, QueryResult)
         """
         # Generate SQL
-        sql_query = self.generate_sql(question, temperature)
+        sql_query = self.generate_sql(question, temperature, format_output=format_output)
         
         # Execute query
         result = self.query_executor.execute(sql_query.query)
         
         return sql_query, result
     
+    @_pins_schema_state
     def generate_and_execute_with_feedback(
         self,
         question: str,
@@ -765,15 +1570,12 @@ Try asking a data question! 💡"""
         from src.core.execution_feedback import SQLExecutionFeedbackHandler, CorrectedQuery
         
         # Get schema info for feedback handler
-        table_names = self.schema_extractor.get_table_names()
-        column_map = {}
-        if self.schema:
-            for table in self.schema.tables:
-                column_map[table.table_name] = [c["name"] for c in table.columns]
+        if self.schema is None:
+            self.load_schema()
         
         feedback_handler = SQLExecutionFeedbackHandler(
-            schema_tables=table_names,
-            schema_columns=column_map,
+            schema_tables=self._table_names,
+            schema_columns=self._column_map,
             max_retries=max_retries
         )
         
@@ -854,8 +1656,9 @@ Try asking a data question! 💡"""
         self,
         question: str,
         execute: Optional[bool] = None,
-        temperature: float = 0.1
-    ) -> dict:
+        temperature: float = 0.1,
+        output_format: Literal["python", "json"] = "python"
+    ) -> Union[dict, bytes]:
         """
         High-level interface: ask a question and get results
         
@@ -863,59 +1666,511 @@ Try asking a data question! 💡"""
             question: Natural language question
             execute: Whether to execute query (if None, uses default)
             temperature: Model temperature
+            output_format: "python" for a dict, "json" for UTF-8 JSON bytes
+                serialized straight from the models (no intermediate dict)
             
         Returns:
-            Dictionary with query and optionally results
+            Dictionary (or its JSON encoding) with query and optionally results
         """
         should_execute = execute if execute is not None else self.enable_auto_execute
         
         if should_execute:
             sql_query, result = self.generate_and_execute(question, temperature)
+            if output_format == "json":
+                return pydantic_core.to_json({"question": question, "sql_query": sql_query, "result": result})
             return {
                 "question": question,
                 "sql_query": sql_query.model_dump(),
                 "result": result.model_dump()
             }
         else:
-            sql_query = self.generate_sql(question, temperature)
+            sql_query, dumped = self._generate_sql(question, temperature)
+            if output_format == "json":
+                return pydantic_core.to_json({"question": question, "sql_query": sql_query})
             return {
                 "question": question,
-                "sql_query": sql_query.model_dump()
+                "sql_query": dumped if dumped is not None else sql_query.model_dump()
             }
     
+    @_pins_schema_state
     def batch_generate(
         self,
         questions: List[str],
-        temperature: float = 0.1
+        temperature: float = 0.1,
+        timeout: Optional[float] = 30.0,
+        questions_per_call: int = 1,
+        use_batch_api: bool = False
     ) -> List[SQLQuery]:
         """
         Generate SQL for multiple questions
         
+        Prompts are prepared (and cache hits answered) up front, then all LLM
+        calls are dispatched concurrently through the async client, so the
+        batch takes roughly as long as its slowest question. Repeated
+        questions are generated once and the result copied.
+        
+        With questions_per_call > 1, questions sharing a system prompt are
+        packed into one numbered prompt, so the schema is sent once per group
+        instead of once per question. Groups whose answer can't be parsed are
+        retried one question per call.
+        
         Args:
             questions: List of natural language questions
             temperature: Model temperature
+            timeout: Per-call LLM timeout in seconds (None = no limit)
+            questions_per_call: Maximum questions packed into one LLM call
+            use_batch_api: Submit through the provider's Batch API instead (about
+                half the cost, results within hours; see batch_generate_offline)
             
         Returns:
             List of SQLQuery objects
         """
-        results = []
-        for question in questions:
+        if use_batch_api:
+            return self.batch_generate_offline(questions, temperature)
+        
+        unique, order = self._dedupe_questions(questions)
+        if len(unique) < len(questions):
+            return self._scatter_results(
+                self.batch_generate(unique, temperature, timeout, questions_per_call), order
+            )
+        
+        results, pending = self._prepare_batch(questions)
+        
+        if pending:
+            all_messages = [messages for _, messages, _, _ in pending]
+            batch = self._complete_batch_async(all_messages, temperature, timeout, questions_per_call)
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                responses = asyncio.run(batch)
+            else:
+                # Already inside an event loop (can't nest asyncio.run): give the
+                # batch its own loop on a helper thread, same request path
+                with ThreadPoolExecutor(max_workers=1, thread_name_prefix="nl2sql-batch") as executor:
+                    responses = executor.submit(
+                        copy_context().run, asyncio.run, batch
+                    ).result()
+            
+            for (i, messages, schema_version, query_type), response in zip(pending, responses):
+                results[i] = self._finalize_batch_item(
+                    questions[i], response, messages, schema_version, query_type, temperature
+                )
+        
+        return results
+    
+    async def batch_generate_iter(
+        self,
+        questions: List[str],
+        temperature: float = 0.1,
+        timeout: Optional[float] = 30.0
+    ) -> AsyncIterator[Tuple[int, SQLQuery]]:
+        """
+        Generate SQL for multiple questions, yielding each result as soon as it is ready
+        
+        Unlike batch_generate, one slow LLM call does not hold back the rest:
+        cache hits come first, then results in completion order. Calls that
+        exceed the timeout yield an error SQLQuery. Remaining calls are
+        cancelled if the caller stops iterating early. Repeated questions are
+        generated once and yielded (as copies) for each index.
+        
+        Args:
+            questions: List of natural language questions
+            temperature: Model temperature
+            timeout: Per-call LLM timeout in seconds (None = no limit)
+        
+        Yields:
+            (index into questions, SQLQuery) tuples
+        """
+        unique, order = self._dedupe_questions(questions)
+        indices: Dict[int, List[int]] = {}
+        for i, j in enumerate(order):
+            indices.setdefault(j, []).append(i)
+        
+        def fan_out(j: int, result: SQLQuery) -> Iterator[Tuple[int, SQLQuery]]:
+            first, *repeats = indices[j]
+            yield first, result
+            for i in repeats:
+                yield i, result.model_copy(deep=True)
+        
+        results, pending = self._prepare_batch(unique)
+        for j, result in enumerate(results):
+            if result is not None:
+                for item in fan_out(j, result):
+                    yield item
+        if not pending:
+            return
+        
+        async_client = AsyncLLMClient(self.llm_config)
+        admission = AdmissionController(self.max_concurrent_requests)
+        
+        async def run(item: tuple) -> Tuple[tuple, Union[SQLQuery, BaseException]]:
             try:
-                sql_query = self.generate_sql(question, temperature)
-                results.append(sql_query)
+                return item, await self._bounded_completion(
+                    async_client, admission, item[1], temperature, timeout
+                )
             except Exception as e:
-                logger.error(f"Failed to generate SQL for '{question}': {e}")
-                # Create error response
-                error_query = SQLQuery(
-                    query="-- Error generating query",
-                    explanation=f"Error: {str(e)}",
-                    confidence=0.0,
-                    potential_issues=[str(e)]
+                return item, e
+        
+        tasks = [asyncio.ensure_future(run(item)) for item in pending]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                (j, messages, schema_version, query_type), response = await next_done
+                result = self._finalize_batch_item(
+                    unique[j], response, messages, schema_version, query_type, temperature
                 )
-                results.append(error_query)
+                for item in fan_out(j, result):
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    @_pins_schema_state
+    def batch_generate_offline(
+        self,
+        questions: List[str],
+        temperature: float = 0.1,
+        poll_interval: float = 30.0,
+        max_wait: Optional[float] = None
+    ) -> List[SQLQuery]:
+        """
+        Generate SQL for multiple questions through the OpenAI/Azure Batch API
+        
+        For large, latency-insensitive workloads: requests are uploaded as one
+        JSONL batch job (about half the price of regular calls, completed
+        within 24h) and the results mapped back by question index. Providers
+        without a Batch API fall back to batch_generate.
+        
+        Args:
+            questions: List of natural language questions
+            temperature: Model temperature
+            poll_interval: Seconds between job status checks
+            max_wait: Give up (and cancel the job) after this many seconds (None = wait)
         
+        Returns:
+            List of SQLQuery objects, in question order
+        """
+        endpoint = self.BATCH_API_ENDPOINTS.get(self.llm_config.provider)
+        if endpoint is None:
+            logger.warning(f"Batch API not supported for {self.llm_config.provider.value}; using batch_generate")
+            return self.batch_generate(questions, temperature)
+        
+        unique, order = self._dedupe_questions(questions)
+        if len(unique) < len(questions):
+            return self._scatter_results(
+                self.batch_generate_offline(unique, temperature, poll_interval, max_wait), order
+            )
+        
+        results, pending = self._prepare_batch(questions)
+        if not pending:
+            return results
+        
+        # Same function-calling request Instructor makes for response_model=SQLQuery
+        tool_name = SQLQuery.__name__
+        tools = [{
+            "type": "function",
+            "function": {
+                "name": tool_name,
+                "description": (SQLQuery.__doc__ or "").strip(),
+                "parameters": SQLQuery.model_json_schema()
+            }
+        }]
+        lines = [
+            json.dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": endpoint,
+                "body": {
+                    # Deployment name on Azure (AZURE_OPENAI_DEPLOYMENT)
+                    "model": self.model,
+                    "messages": messages,
+                    "temperature": temperature,
+                    "tools": tools,
+                    "tool_choice": {"type": "function", "function": {"name": tool_name}}
+                }
+            }, ensure_ascii=False)
+            for i, messages, _, _ in pending
+        ]
+        
+        raw_client = self.client.client
+        responses: Dict[int, Union[SQLQuery, BaseException]] = {}
+        try:
+            batch_file = raw_client.files.create(
+                file=("nl2sql_batch.jsonl", "\n".join(lines).encode("utf-8")),
+                purpose="batch"
+            )
+            batch = raw_client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint=endpoint,
+                completion_window="24h"
+            )
+            logger.info(f"Submitted batch {batch.id} with {len(lines)} requests")
+            
+            started = time.monotonic()
+            while batch.status not in ("completed", "failed", "expired", "cancelled"):
+                if max_wait is not None and time.monotonic() - started > max_wait:
+                    raw_client.batches.cancel(batch.id)
+                    raise TimeoutError(f"Batch {batch.id} not finished after {max_wait}s")
+                time.sleep(poll_interval)
+                batch = raw_client.batches.retrieve(batch.id)
+            
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if file_id:
+                    for line in raw_client.files.content(file_id).text.splitlines():
+                        if line.strip():
+                            index, response = self._parse_batch_line(line)
+                            responses[index] = response
+        except Exception as e:
+            for i, *_ in pending:
+                results[i] = self._batch_error_query(questions[i], e)
+            return results
+        
+        missing = RuntimeError(f"No result in batch {batch.id} (status: {batch.status})")
+        for i, messages, schema_version, query_type in pending:
+            results[i] = self._finalize_batch_item(
+                questions[i], responses.get(i, missing), messages, schema_version, query_type, temperature
+            )
+        
+        return results
+    
+    @staticmethod
+    def _parse_batch_line(line: str) -> Tuple[int, Union[SQLQuery, BaseException]]:
+        """Parse one Batch API output line into (question index, SQLQuery or error)"""
+        item = json.loads(line)
+        index = int(item["custom_id"])
+        response = item.get("response") or {}
+        if item.get("error") or response.get("status_code") != 200:
+            return index, RuntimeError(f"Batch request failed: {item.get('error') or response.get('body')}")
+        try:
+            message = response["body"]["choices"][0]["message"]
+            return index, SQLQuery.model_validate_json(message["tool_calls"][0]["function"]["arguments"])
+        except Exception as e:
+            return index, e
+    
+    @staticmethod
+    def _dedupe_questions(questions: List[str]) -> Tuple[List[str], List[int]]:
+        """
+        Collapse repeated questions in a batch
+        
+        Questions differing only in whitespace count as repeats (case and
+        literals are kept, since they can change the SQL).
+        
+        Returns:
+            (unique questions in first-seen order, index into them for each question)
+        """
+        first_index: Dict[str, int] = {}
+        unique = []
+        order = []
+        for question in questions:
+            key = " ".join(question.split())
+            j = first_index.get(key)
+            if j is None:
+                j = first_index[key] = len(unique)
+                unique.append(question)
+            order.append(j)
+        return unique, order
+    
+    @staticmethod
+    def _scatter_results(unique_results: List[SQLQuery], order: List[int]) -> List[SQLQuery]:
+        """Map results for unique questions back to every position (repeats get copies)"""
+        seen = set()
+        results = []
+        for j in order:
+            result = unique_results[j]
+            results.append(result.model_copy(deep=True) if j in seen else result)
+            seen.add(j)
         return results
     
+    def _prepare_batch(self, questions: List[str]) -> Tuple[List[Optional[SQLQuery]], List[tuple]]:
+        """
+        Prepare prompts for a batch, answering cache hits and failures immediately
+        
+        Returns:
+            (results with None for questions needing an LLM call,
+             (index, messages, schema_version, query_type) for those questions)
+        """
+        results: List[Optional[SQLQuery]] = [None] * len(questions)
+        pending = []
+        
+        for i, question in enumerate(questions):
+            try:
+                prepared = self._prepare_generation(question)
+            except Exception as e:
+                results[i] = self._batch_error_query(question, e)
+                continue
+            if isinstance(prepared, SQLQuery):
+                results[i] = prepared
+            else:
+                pending.append((i, *prepared))
+        
+        return results, pending
+    
+    async def _bounded_completion(
+        self,
+        async_client: AsyncLLMClient,
+        admission: AdmissionController,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        timeout: Optional[float] = None,
+        response_model: type = SQLQuery
+    ) -> Any:
+        """One batch LLM call, within the concurrency cap and rate limits"""
+        async with admission:
+            await self._rate_limiter.acquire(estimate_tokens(messages))
+            return await asyncio.wait_for(
+                async_client.create_completion(
+                    response_model=response_model,
+                    messages=messages,
+                    temperature=temperature
+                ),
+                timeout
+            )
+    
+    async def _complete_batch_async(
+        self,
+        all_messages: List[List[Dict[str, str]]],
+        temperature: float,
+        timeout: Optional[float] = None,
+        questions_per_call: int = 1
+    ) -> List[Union[SQLQuery, BaseException]]:
+        """Run the LLM calls of a batch concurrently (exceptions are returned, not raised)"""
+        try:
+            return await self._run_batch_calls(all_messages, temperature, timeout, questions_per_call)
+        finally:
+            # The asyncio.run() loop ends with this call: close the pools it opened
+            await close_loop_http_clients()
+    
+    async def _run_batch_calls(
+        self,
+        all_messages: List[List[Dict[str, str]]],
+        temperature: float,
+        timeout: Optional[float],
+        questions_per_call: int
+    ) -> List[Union[SQLQuery, BaseException]]:
+        """Body of _complete_batch_async"""
+        # Fresh client per run: each asyncio.run() has its own event loop
+        async_client = AsyncLLMClient(self.llm_config)
+        admission = AdmissionController(self.max_concurrent_requests)
+        
+        def complete(messages: List[Dict[str, str]], response_model: type = SQLQuery):
+            return self._bounded_completion(
+                async_client, admission, messages, temperature, timeout, response_model
+            )
+        
+        if questions_per_call <= 1:
+            return await asyncio.gather(
+                *[complete(messages) for messages in all_messages],
+                return_exceptions=True
+            )
+        
+        groups = self._group_batch_messages(all_messages, questions_per_call)
+        grouped = await asyncio.gather(
+            *[
+                complete(all_messages[group[0]]) if len(group) == 1
+                else complete(self._pack_batch_messages([all_messages[i] for i in group]), SQLQueryBatch)
+                for group in groups
+            ],
+            return_exceptions=True
+        )
+        
+        responses: List[Union[SQLQuery, BaseException, None]] = [None] * len(all_messages)
+        retry: List[int] = []
+        for group, result in zip(groups, grouped):
+            if len(group) == 1:
+                responses[group[0]] = result
+            elif isinstance(result, SQLQueryBatch) and len(result.queries) == len(group):
+                for i, query in zip(group, result.queries):
+                    responses[i] = query
+            else:
+                logger.warning(f"Batch-prompted call for {len(group)} questions failed ({result}); retrying one per call")
+                retry.extend(group)
+        
+        if retry:
+            singles = await asyncio.gather(
+                *[complete(all_messages[i]) for i in retry],
+                return_exceptions=True
+            )
+            for i, result in zip(retry, singles):
+                responses[i] = result
+        
+        return responses
+    
+    def _group_batch_messages(
+        self,
+        all_messages: List[List[Dict[str, str]]],
+        questions_per_call: int
+    ) -> List[List[int]]:
+        """
+        Group batch prompts that can share one call
+        
+        Only single-turn prompts with an identical system message are grouped,
+        up to questions_per_call per group and BATCH_PROMPT_MAX_TOKENS of
+        question text.
+        
+        Returns:
+            Groups of indexes into all_messages
+        """
+        count_tokens = get_token_counter(self.model)
+        groups: List[List[int]] = []
+        open_groups: Dict[str, Tuple[List[int], int]] = {}
+        
+        for i, messages in enumerate(all_messages):
+            if len(messages) != 2:
+                groups.append([i])
+                continue
+            system = messages[0]["content"]
+            tokens = count_tokens(messages[1]["content"])
+            group, used = open_groups.get(system, (None, 0))
+            if group is None or len(group) >= questions_per_call or used + tokens > self.BATCH_PROMPT_MAX_TOKENS:
+                group, used = [], 0
+                groups.append(group)
+            group.append(i)
+            open_groups[system] = (group, used + tokens)
+        
+        return groups
+    
+    @staticmethod
+    def _pack_batch_messages(group_messages: List[List[Dict[str, str]]]) -> List[Dict[str, str]]:
+        """Pack single-turn prompts sharing a system message into one numbered prompt"""
+        parts = [
+            f"Answer each of the {len(group_messages)} numbered questions below independently. "
+            f"Return exactly {len(group_messages)} queries, in question order."
+        ]
+        for n, messages in enumerate(group_messages, 1):
+            parts.append(f"### Q{n}\n{messages[-1]['content']}")
+        return [group_messages[0][0], {"role": "user", "content": "\n\n".join(parts)}]
+    
+    def _finalize_batch_item(
+        self,
+        question: str,
+        response: Union[SQLQuery, BaseException],
+        messages: List[Dict[str, str]],
+        schema_version: Optional[str],
+        query_type: Optional[QueryType],
+        temperature: float
+    ) -> SQLQuery:
+        """Finalize one batch LLM result, mapping returned exceptions to error queries"""
+        if isinstance(response, BaseException):
+            if not isinstance(response, Exception):
+                # KeyboardInterrupt, cancellation etc. abort the whole batch
+                raise response
+            return self._batch_error_query(question, response)
+        try:
+            return self._finalize_response(
+                question, response, messages, schema_version, query_type, temperature
+            )
+        except Exception as e:
+            return self._batch_error_query(question, e)
+    
+    def _batch_error_query(self, question: str, error: Exception) -> SQLQuery:
+        """Error response used in place of a failed batch item"""
+        logger.error(f"Failed to generate SQL for '{question}': {error}")
+        return SQLQuery(
+            query="-- Error generating query",
+            explanation=f"Error: {str(error)}",
+            confidence=0.0,
+            potential_issues=[str(error)]
+        )
+    
     def get_schema_info(self) -> str:
         """
         Get formatted schema information
@@ -937,7 +2192,12 @@ Try asking a data question! 💡"""
         return self.query_executor.test_connection()
     
     def close(self):
-        """Close all connections"""
+        """
+        Close all connections
+        
+        The LLM HTTP pool is shared by every converter in the process and is
+        closed separately with llm_provider.close_http_client() on shutdown.
+        """
         self.schema_extractor.disconnect()
         self.query_executor.disconnect()
         logger.info("NL2SQL Converter closed")
@@ -962,25 +2222,34 @@ Try asking a data question! 💡"""
         if self.prompt_builder:
             stats["prompt_cache"] = self.prompt_builder.get_cache_stats()
         
-        if self.semantic_cache:
-            stats["semantic_cache"] = self.semantic_cache.get_stats()
+        if self._semantic_cache:
+            stats["semantic_cache"] = self._semantic_cache.get_stats()
         
         return stats
     
-    def invalidate_cache(self, invalidate_sql: bool = True, invalidate_prompts: bool = True):
+    def invalidate_cache(
+        self,
+        invalidate_sql: bool = True,
+        invalidate_prompts: bool = True,
+        tables: Optional[List[str]] = None
+    ):
         """
         Invalidate caches
         
         Args:
             invalidate_sql: Invalidate SQL result cache
             invalidate_prompts: Invalidate prompt cache
+            tables: Only invalidate cached SQL referencing these tables
         """
         if not self.enable_caching:
             return
         
         if invalidate_sql and self.semantic_cache:
-            self.semantic_cache.invalidate_all()
-            logger.info("SQL cache invalidated")
+            if tables:
+                self.semantic_cache.invalidate_tables(tables)
+            else:
+                self.semantic_cache.invalidate_all()
+                logger.info("SQL cache invalidated")
         
         if invalidate_prompts and self.prompt_builder:
             self.prompt_builder.invalidate_cache()
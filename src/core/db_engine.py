@@ -0,0 +1,58 @@
+"""Shared, process-wide SQLAlchemy engines
+
+Schema extraction and query execution against the same database borrow
+connections from one pooled engine, so converters created per request
+reuse warm connections instead of building and disposing their own pools.
+"""
+
+import logging
+import threading
+from typing import Dict
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Pool limits per database, shared by every converter in the process
+POOL_SIZE = 10
+MAX_OVERFLOW = 15
+
+_engines: Dict[str, Engine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(connection_string: str) -> Engine:
+    """
+    Get or create the pooled engine for a connection string
+    
+    Args:
+        connection_string: SQLAlchemy connection string
+        
+    Returns:
+        Engine shared by every caller using the same connection string
+    """
+    engine = _engines.get(connection_string)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(connection_string)
+            if engine is None:
+                engine = create_engine(
+                    connection_string,
+                    echo=False,
+                    pool_size=POOL_SIZE,
+                    max_overflow=MAX_OVERFLOW,
+                    pool_timeout=30,
+                    pool_recycle=1800,
+                    pool_pre_ping=True
+                )
+                _engines[connection_string] = engine
+                logger.info(f"Created shared {engine.dialect.name} engine")
+    return engine
+
+
+def dispose_engines():
+    """Close every shared engine's pooled connections (e.g. on shutdown or after fork)"""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
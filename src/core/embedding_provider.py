@@ -10,16 +10,26 @@ Embeddings are used for semantic cache to find similar questions.
 """
 
 import os
+import re
+import time
+import random
 import logging
-import hashlib
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, Any, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Literal, Optional, Dict, Any, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
+_WORD_RE = re.compile(r'\b\w+\b')
+
+# Retries per API sub-batch on HTTP 429, with exponential backoff
+RATE_LIMIT_RETRIES = 3
+RATE_LIMIT_BACKOFF = 0.5
+
 
 class EmbeddingProvider(str, Enum):
     """Supported embedding providers"""
@@ -38,7 +48,11 @@ class EmbeddingConfig:
     batch_size: int = 32
     normalize: bool = True
     cache_embeddings: bool = True
+    cache_size: int = 4096  # LRU bound on cached embeddings
+    max_concurrency: int = 5  # API sub-batches in flight at once
     dimensions: Optional[int] = None  # For dimensionality reduction
+    # Storage form of vectors in the semantic cache store (see quantize_embeddings)
+    quantization: Literal["fp32", "int8", "binary"] = "fp32"
 
 
 class BaseEmbedder(ABC):
@@ -46,7 +60,8 @@ class BaseEmbedder(ABC):
     
     def __init__(self, config: EmbeddingConfig):
         self.config = config
-        self._cache: Dict[str, np.ndarray] = {}
+        # Keyed by the text itself, so repeated questions are one dict lookup
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
     
     @abstractmethod
     def embed(self, texts: List[str]) -> np.ndarray:
@@ -80,91 +95,142 @@ class BaseEmbedder(ABC):
         """Return embedding dimension"""
         pass
     
-    def _get_cache_key(self, text: str) -> str:
-        """Generate cache key for text"""
-        return hashlib.sha256(text.encode()).hexdigest()[:16]
+    def _check_width(self, embeddings: np.ndarray):
+        """Raise if the backend returned vectors of a width other than self.dimension"""
+        width = embeddings.shape[1] if embeddings.ndim == 2 else None
+        if width != self.dimension:
+            raise ValueError(
+                f"{type(self).__name__} model returned {width}-dim embeddings, "
+                f"expected {self.dimension}; set EMBEDDING_DIMENSIONS to the model's width"
+            )
     
     def _get_from_cache(self, text: str) -> Optional[np.ndarray]:
         """Get embedding from cache"""
         if not self.config.cache_embeddings:
             return None
-        key = self._get_cache_key(text)
-        return self._cache.get(key)
+        embedding = self._cache.get(text)
+        if embedding is not None:
+            self._cache.move_to_end(text)
+        return embedding
     
     def _set_cache(self, text: str, embedding: np.ndarray):
-        """Store embedding in cache"""
+        """Store embedding in cache, evicting the least recently used"""
         if self.config.cache_embeddings:
-            key = self._get_cache_key(text)
-            self._cache[key] = embedding
+            self._cache[text] = embedding
+            self._cache.move_to_end(text)
+            while len(self._cache) > self.config.cache_size:
+                self._cache.popitem(last=False)
+    
+    def _fill_from_cache(self, texts: List[str], out: np.ndarray) -> Tuple[List[str], List[int]]:
+        """
+        Copy cached embeddings into their rows of out
+        
+        Returns:
+            (uncached_texts, uncached_indices) still to be embedded
+        """
+        if not self.config.cache_embeddings:
+            return list(texts), list(range(len(texts)))
+        
+        cache = self._cache
+        uncached_texts = []
+        uncached_indices = []
+        for i, text in enumerate(texts):
+            embedding = cache.get(text)
+            if embedding is None:
+                uncached_texts.append(text)
+                uncached_indices.append(i)
+            else:
+                cache.move_to_end(text)
+                out[i] = embedding
+        return uncached_texts, uncached_indices
+    
+    def _set_cache_many(self, texts: List[str], embeddings: np.ndarray):
+        """Store one embedding row per text, then evict down to cache_size once"""
+        if not self.config.cache_embeddings:
+            return
+        cache = self._cache
+        for text, embedding in zip(texts, embeddings):
+            cache[text] = embedding
+            cache.move_to_end(text)
+        while len(cache) > self.config.cache_size:
+            cache.popitem(last=False)
     
     def clear_cache(self):
         """Clear embedding cache"""
         self._cache.clear()
 
 
-class OpenAIEmbedder(BaseEmbedder):
-    """OpenAI embedding provider"""
+class APIEmbedder(BaseEmbedder):
+    """
+    Base for embedders behind an OpenAI-compatible embeddings endpoint
     
-    # Embedding dimensions for OpenAI models
-    MODEL_DIMENSIONS = {
-        "text-embedding-3-small": 1536,
-        "text-embedding-3-large": 3072,
-        "text-embedding-ada-002": 1536,
-    }
+    Uncached texts are split into sub-batches of config.batch_size, sent
+    concurrently (up to config.max_concurrency in flight), and written back
+    by their original position.
+    """
+    
+    provider_name = "API"
     
     def __init__(self, config: EmbeddingConfig):
         super().__init__(config)
-        from openai import OpenAI
-        
-        self.client = OpenAI(api_key=config.api_key)
-        self.model = config.model or "text-embedding-3-small"
-        self._dimension = config.dimensions or self.MODEL_DIMENSIONS.get(self.model, 1536)
-        logger.info(f"OpenAI Embedder initialized with model: {self.model}")
+        self._max_concurrent_batches = max(1, config.max_concurrency)
     
-    @property
-    def dimension(self) -> int:
-        return self._dimension
+    def _request_kwargs(self, texts: List[str]) -> Dict[str, Any]:
+        """Arguments for one embeddings.create call"""
+        return {"model": self.model, "input": texts}
+    
+    def _embed_one_batch(self, texts: List[str], jitter: bool = False) -> np.ndarray:
+        """Embed one sub-batch, retrying with backoff when rate limited"""
+        if jitter:
+            # Spread concurrent requests so they don't hit the rate limiter as one burst
+            time.sleep(random.uniform(0, 0.05))
+        
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            try:
+                response = self.client.embeddings.create(**self._request_kwargs(texts))
+                break
+            except Exception as e:
+                if getattr(e, "status_code", None) != 429 or attempt == RATE_LIMIT_RETRIES:
+                    raise
+                delay = RATE_LIMIT_BACKOFF * 2 ** attempt
+                logger.warning(f"{self.provider_name} embedding rate limited, retrying in {delay:.1f}s")
+                time.sleep(delay + random.uniform(0, delay / 2))
+        
+        embeddings = np.array([emb_data.embedding for emb_data in response.data], dtype=np.float32)
+        if self.config.normalize:
+            np.divide(
+                embeddings, np.linalg.norm(embeddings, axis=1, keepdims=True).clip(min=1e-12),
+                out=embeddings
+            )
+        return embeddings
     
     def embed(self, texts: List[str]) -> np.ndarray:
         """Generate embeddings for multiple texts"""
-        # Check cache first
-        results = []
-        uncached_texts = []
-        uncached_indices = []
+        out = np.empty((len(texts), self.dimension), dtype=np.float32)
+        uncached_texts, uncached_indices = self._fill_from_cache(texts, out)
         
-        for i, text in enumerate(texts):
-            cached = self._get_from_cache(text)
-            if cached is not None:
-                results.append((i, cached))
-            else:
-                uncached_texts.append(text)
-                uncached_indices.append(i)
-        
-        # Fetch uncached embeddings
         if uncached_texts:
+            size = max(1, self.config.batch_size)
+            batches = [uncached_texts[i:i + size] for i in range(0, len(uncached_texts), size)]
             try:
-                kwargs = {"model": self.model, "input": uncached_texts}
-                if self.config.dimensions and self.model.startswith("text-embedding-3"):
-                    kwargs["dimensions"] = self.config.dimensions
-                
-                response = self.client.embeddings.create(**kwargs)
-                
-                for i, emb_data in enumerate(response.data):
-                    embedding = np.array(emb_data.embedding, dtype=np.float32)
-                    if self.config.normalize:
-                        embedding = embedding / np.linalg.norm(embedding)
-                    
-                    original_idx = uncached_indices[i]
-                    results.append((original_idx, embedding))
-                    self._set_cache(uncached_texts[i], embedding)
-                    
+                if len(batches) == 1:
+                    batch_results = [self._embed_one_batch(batches[0])]
+                else:
+                    workers = min(self._max_concurrent_batches, len(batches))
+                    with ThreadPoolExecutor(max_workers=workers) as executor:
+                        batch_results = list(executor.map(
+                            lambda batch: self._embed_one_batch(batch, jitter=True), batches
+                        ))
             except Exception as e:
-                logger.error(f"OpenAI embedding error: {e}")
+                logger.error(f"{self.provider_name} embedding error: {e}")
                 raise
+            
+            fetched = batch_results[0] if len(batch_results) == 1 else np.concatenate(batch_results)
+            self._check_width(fetched)
+            out[uncached_indices] = fetched
+            self._set_cache_many(uncached_texts, fetched)
         
-        # Sort by original index and return
-        results.sort(key=lambda x: x[0])
-        return np.array([emb for _, emb in results])
+        return out
     
     def embed_single(self, text: str) -> np.ndarray:
         """Generate embedding for single text"""
@@ -176,6 +242,46 @@ class OpenAIEmbedder(BaseEmbedder):
         return result[0]
 
 
+class OpenAIEmbedder(APIEmbedder):
+    """OpenAI embedding provider"""
+    
+    provider_name = "OpenAI"
+    
+    # Embedding dimensions for OpenAI models
+    MODEL_DIMENSIONS = {
+        "text-embedding-3-small": 1536,
+        "text-embedding-3-large": 3072,
+        "text-embedding-ada-002": 1536,
+    }
+    
+    def __init__(self, config: EmbeddingConfig):
+        super().__init__(config)
+        from openai import OpenAI
+        
+        self.client = OpenAI(api_key=config.api_key)
+        self.model = config.model or "text-embedding-3-small"
+        if config.dimensions and self._supports_dimensions():
+            self._dimension = config.dimensions
+        else:
+            # ada-002 ignores a requested size and always returns its native width
+            self._dimension = self.MODEL_DIMENSIONS.get(self.model, config.dimensions or 1536)
+        logger.info(f"OpenAI Embedder initialized with model: {self.model}")
+    
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+    
+    def _supports_dimensions(self) -> bool:
+        """Whether the model accepts the dimensions request parameter"""
+        return self.model.startswith("text-embedding-3")
+    
+    def _request_kwargs(self, texts: List[str]) -> Dict[str, Any]:
+        kwargs = super()._request_kwargs(texts)
+        if self.config.dimensions and self._supports_dimensions():
+            kwargs["dimensions"] = self.config.dimensions
+        return kwargs
+
+
 class SentenceTransformersEmbedder(BaseEmbedder):
     """Sentence Transformers embedding provider (local, no API needed)"""
     
@@ -201,35 +307,24 @@ class SentenceTransformersEmbedder(BaseEmbedder):
     def embed(self, texts: List[str]) -> np.ndarray:
         """Generate embeddings for multiple texts"""
         # Check cache
-        results = []
-        uncached_texts = []
-        uncached_indices = []
-        
-        for i, text in enumerate(texts):
-            cached = self._get_from_cache(text)
-            if cached is not None:
-                results.append((i, cached))
-            else:
-                uncached_texts.append(text)
-                uncached_indices.append(i)
+        out = np.empty((len(texts), self.dimension), dtype=np.float32)
+        uncached_texts, uncached_indices = self._fill_from_cache(texts, out)
         
         # Encode uncached
         if uncached_texts:
-            embeddings = self.model.encode(
+            embeddings = np.asarray(self.model.encode(
                 uncached_texts,
                 batch_size=self.config.batch_size,
                 normalize_embeddings=self.config.normalize,
-                show_progress_bar=False
-            )
+                show_progress_bar=False,
+                convert_to_numpy=True
+            ), dtype=np.float32)
             
-            for i, embedding in enumerate(embeddings):
-                original_idx = uncached_indices[i]
-                emb_array = np.array(embedding, dtype=np.float32)
-                results.append((original_idx, emb_array))
-                self._set_cache(uncached_texts[i], emb_array)
+            self._check_width(embeddings)
+            out[uncached_indices] = embeddings
+            self._set_cache_many(uncached_texts, embeddings)
         
-        results.sort(key=lambda x: x[0])
-        return np.array([emb for _, emb in results])
+        return out
     
     def embed_single(self, text: str) -> np.ndarray:
         """Generate embedding for single text"""
@@ -247,9 +342,11 @@ class SentenceTransformersEmbedder(BaseEmbedder):
         return emb_array
 
 
-class GeminiEmbedder(BaseEmbedder):
+class GeminiEmbedder(APIEmbedder):
     """Google Gemini embedding provider"""
     
+    provider_name = "Gemini"
+    
     def __init__(self, config: EmbeddingConfig):
         super().__init__(config)
         from openai import OpenAI
@@ -260,58 +357,12 @@ class GeminiEmbedder(BaseEmbedder):
             base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
         )
         self.model = config.model or "text-embedding-004"
-        self._dimension = 768  # Gemini embedding dimension
+        self._dimension = config.dimensions or 768  # text-embedding-004 width
         logger.info(f"Gemini Embedder initialized with model: {self.model}")
     
     @property
     def dimension(self) -> int:
         return self._dimension
-    
-    def embed(self, texts: List[str]) -> np.ndarray:
-        """Generate embeddings for multiple texts"""
-        results = []
-        uncached_texts = []
-        uncached_indices = []
-        
-        for i, text in enumerate(texts):
-            cached = self._get_from_cache(text)
-            if cached is not None:
-                results.append((i, cached))
-            else:
-                uncached_texts.append(text)
-                uncached_indices.append(i)
-        
-        if uncached_texts:
-            try:
-                response = self.client.embeddings.create(
-                    model=self.model,
-                    input=uncached_texts
-                )
-                
-                for i, emb_data in enumerate(response.data):
-                    embedding = np.array(emb_data.embedding, dtype=np.float32)
-                    if self.config.normalize:
-                        embedding = embedding / np.linalg.norm(embedding)
-                    
-                    original_idx = uncached_indices[i]
-                    results.append((original_idx, embedding))
-                    self._set_cache(uncached_texts[i], embedding)
-                    
-            except Exception as e:
-                logger.error(f"Gemini embedding error: {e}")
-                raise
-        
-        results.sort(key=lambda x: x[0])
-        return np.array([emb for _, emb in results])
-    
-    def embed_single(self, text: str) -> np.ndarray:
-        """Generate embedding for single text"""
-        cached = self._get_from_cache(text)
-        if cached is not None:
-            return cached
-        
-        result = self.embed([text])
-        return result[0]
 
 
 class KeywordEmbedder(BaseEmbedder):
@@ -333,14 +384,11 @@ class KeywordEmbedder(BaseEmbedder):
     
     def _tokenize(self, text: str) -> List[str]:
         """Simple tokenization"""
-        import re
-        text = text.lower()
-        words = re.findall(r'\b\w+\b', text)
-        return words
+        return _WORD_RE.findall(text.lower())
     
-    def _hash_word(self, word: str) -> int:
-        """Hash word to dimension index"""
-        return hash(word) % self._dimension
+    def _hash_words(self, words: List[str]) -> np.ndarray:
+        """Hash words to dimension indices (builtin hash in C, modulo vectorized)"""
+        return np.fromiter(map(hash, words), dtype=np.int64, count=len(words)) % self._dimension
     
     def embed_single(self, text: str) -> np.ndarray:
         """Generate keyword-based embedding"""
@@ -349,29 +397,46 @@ class KeywordEmbedder(BaseEmbedder):
             return cached
         
         words = self._tokenize(text)
-        embedding = np.zeros(self._dimension, dtype=np.float32)
         
-        # Count word frequencies
-        word_counts: Dict[str, int] = {}
-        for word in words:
-            word_counts[word] = word_counts.get(word, 0) + 1
-        
-        # Build embedding using hash trick
-        for word, count in word_counts.items():
-            idx = self._hash_word(word)
-            embedding[idx] += count
+        # Hash trick: word counts per bucket, histogrammed in one NumPy call
+        embedding = np.bincount(self._hash_words(words), minlength=self._dimension).astype(np.float32)
         
         # Normalize
         norm = np.linalg.norm(embedding)
         if norm > 0:
-            embedding = embedding / norm
+            embedding /= norm
         
         self._set_cache(text, embedding)
         return embedding
     
     def embed(self, texts: List[str]) -> np.ndarray:
-        """Generate embeddings for multiple texts"""
-        return np.array([self.embed_single(t) for t in texts])
+        """
+        Generate embeddings for multiple texts
+        
+        Uncached texts are counted into one (n, dimension) matrix with a
+        single bincount over flattened row/bucket indices, then row-normalized.
+        """
+        embeddings = np.empty((len(texts), self._dimension), dtype=np.float32)
+        uncached_texts, uncached_indices = self._fill_from_cache(texts, embeddings)
+        
+        if uncached_indices:
+            tokenized = [self._tokenize(text) for text in uncached_texts]
+            rows = np.repeat(
+                np.arange(len(tokenized), dtype=np.int64),
+                [len(words) for words in tokenized]
+            )
+            buckets = self._hash_words([word for words in tokenized for word in words])
+            counts = np.bincount(
+                rows * self._dimension + buckets, minlength=len(tokenized) * self._dimension
+            ).reshape(len(tokenized), self._dimension).astype(np.float32)
+            
+            norms = np.linalg.norm(counts, axis=1, keepdims=True)
+            counts /= np.where(norms == 0, 1, norms)
+            
+            embeddings[uncached_indices] = counts
+            self._set_cache_many(uncached_texts, counts)
+        
+        return embeddings
 
 
 def get_embedder(config: Optional[EmbeddingConfig] = None) -> BaseEmbedder:
@@ -409,6 +474,8 @@ def create_embedding_config_from_env() -> EmbeddingConfig:
         EMBEDDING_MODEL: Model name (provider-specific default)
         EMBEDDING_DIMENSIONS: Dimensionality (optional, for reduction)
         EMBEDDING_BATCH_SIZE: Batch size for encoding (default: 32)
+        EMBEDDING_MAX_CONCURRENCY: API batches sent concurrently (default: 5)
+        EMBEDDING_QUANTIZATION: fp32, int8 or binary semantic cache vectors (default: fp32)
         OPENAI_API_KEY / GEMINI_API_KEY: API keys (if using API-based provider)
     """
     provider_str = os.getenv("EMBEDDING_PROVIDER", "").lower()
@@ -449,12 +516,19 @@ def create_embedding_config_from_env() -> EmbeddingConfig:
     # Optional settings
     dimensions = os.getenv("EMBEDDING_DIMENSIONS")
     batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+    max_concurrency = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "5"))
+    quantization = os.getenv("EMBEDDING_QUANTIZATION", "fp32").lower()
+    if quantization not in ("fp32", "int8", "binary"):
+        logger.warning(f"Unknown embedding quantization: {quantization}, using fp32")
+        quantization = "fp32"
     
     config = EmbeddingConfig(
         provider=provider,
         model=model,
         api_key=api_key,
         batch_size=batch_size,
+        max_concurrency=max_concurrency,
+        quantization=quantization,
         dimensions=int(dimensions) if dimensions else None,
         normalize=True,
         cache_embeddings=True
@@ -485,15 +559,140 @@ def batch_cosine_similarity(query: np.ndarray, vectors: np.ndarray) -> np.ndarra
     
     Args:
         query: Query vector of shape (dim,)
-        vectors: Matrix of vectors of shape (n, dim)
+        vectors: Matrix of vectors of shape (n, dim); store it as a
+            C-contiguous float32 array so this stays one SGEMV call
         
     Returns:
         Array of similarities of shape (n,)
     """
+    # A dtype mismatch would upcast the whole matrix before the product
+    if query.dtype != vectors.dtype:
+        query = query.astype(vectors.dtype)
+    
     # Efficient batch similarity using matrix multiplication
     return np.dot(vectors, query)
 
 
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first
+    
+    Partial selection (argpartition) then a sort of only those k, instead of
+    sorting every score.
+    
+    Args:
+        scores: Scores of shape (n,)
+        k: Number of indices to return
+    
+    Returns:
+        Up to k indices, ordered by descending score
+    """
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < len(scores):
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def top_k_similar(query: np.ndarray, vectors: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the k vectors most similar to a query
+    
+    Args:
+        query: Query vector of shape (dim,)
+        vectors: Matrix of vectors of shape (n, dim)
+        k: Number of matches to return
+    
+    Returns:
+        (indices, similarities) of the matches, best first
+    """
+    similarities = batch_cosine_similarity(query, vectors)
+    top = top_k_indices(similarities, k)
+    return top, similarities[top]
+
+
+# Set bits per byte value, for popcount on NumPy < 2.0
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def quantize_embeddings(vectors: np.ndarray, quantization: str = "fp32") -> np.ndarray:
+    """
+    Convert embeddings to a compact storage form
+    
+    - fp32: unchanged float32 (4 bytes/dim)
+    - int8: each row scaled so its largest component maps to ±127 (1 byte/dim)
+    - binary: sign bits packed 8 per byte (1 bit/dim)
+    
+    Args:
+        vectors: Vector of shape (dim,) or matrix of shape (n, dim)
+        quantization: fp32, int8 or binary
+    
+    Returns:
+        Quantized array, same leading shape
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if quantization == "int8":
+        scale = np.abs(vectors).max(axis=-1, keepdims=True)
+        return np.round(vectors * (127 / np.where(scale == 0, 1, scale))).astype(np.int8)
+    if quantization == "binary":
+        return np.packbits(vectors > 0, axis=-1)
+    return vectors
+
+
+def batch_cosine_similarity_int8(
+    query: np.ndarray,
+    vectors: np.ndarray,
+    vector_norms: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Cosine similarity between int8-quantized vectors
+    
+    Dividing by the quantized norms makes the per-row scale cancel out, so no
+    scale factors need storing. Products accumulate in int32.
+    
+    Args:
+        query: int8 query vector of shape (dim,)
+        vectors: int8 matrix of shape (n, dim)
+        vector_norms: Precomputed L2 norms of the rows of vectors (optional)
+    
+    Returns:
+        float32 array of similarities of shape (n,)
+    """
+    query = query.astype(np.int32)
+    products = (vectors @ query).astype(np.float32)
+    if vector_norms is None:
+        vector_norms = np.linalg.norm(vectors.astype(np.float32), axis=1)
+    norms = vector_norms * np.linalg.norm(query.astype(np.float32))
+    return products / np.where(norms == 0, 1, norms)
+
+
+def batch_hamming_similarity(query: np.ndarray, vectors: np.ndarray, dimension: int) -> np.ndarray:
+    """
+    Similarity between sign-bit (binary) vectors
+    
+    Returns 1 - 2 * hamming / dimension, which estimates 1 - 2θ/π for the
+    angle θ between the original vectors. It is lower than the cosine for
+    the same pair, so thresholds tuned on cosine need lowering.
+    
+    Args:
+        query: Packed uint8 query bits of shape (ceil(dim/8),)
+        vectors: Packed uint8 matrix of shape (n, ceil(dim/8))
+        dimension: Number of bits (original embedding dimension)
+    
+    Returns:
+        float32 array of similarities of shape (n,)
+    """
+    diff = np.bitwise_xor(vectors, query)
+    if hasattr(np, "bitwise_count"):
+        bits = np.bitwise_count(diff)
+    else:
+        bits = _POPCOUNT_TABLE[diff]
+    distances = bits.sum(axis=1, dtype=np.int32)
+    return (1 - 2 * distances / dimension).astype(np.float32)
+
+
 # Singleton embedder instance
 _embedder: Optional[BaseEmbedder] = None
 
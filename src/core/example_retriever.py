@@ -0,0 +1,77 @@
+"""
+Embedding-based Few-shot Example Retrieval
+
+Picks the few-shot examples closest to a question by embedding similarity,
+instead of keyword overlap, so the prompt only carries examples that help.
+"""
+
+import logging
+from typing import Optional, Dict, List, Any
+import numpy as np
+
+from src.core.embedding_provider import BaseEmbedder, top_k_similar
+from src.prompts.few_shot_examples import get_few_shot_examples
+
+logger = logging.getLogger(__name__)
+
+
+class ExampleRetriever:
+    """
+    k-NN retrieval over pre-embedded few-shot example questions
+    
+    Example questions are embedded once, lazily, on first use. Results keep
+    the examples' original order (not similarity order), so similar questions
+    that retrieve the same set produce an identical, cacheable prompt prefix.
+    """
+    
+    def __init__(
+        self,
+        embedder: BaseEmbedder,
+        examples: Optional[List[Dict[str, Any]]] = None,
+        database_type: str = "postgresql"
+    ):
+        """
+        Initialize example retriever
+        
+        Args:
+            embedder: Embedding provider used for examples and questions
+            examples: Few-shot examples (defaults for database_type if None)
+            database_type: Database dialect of the default examples
+        """
+        self.embedder = embedder
+        self.examples = examples if examples is not None else get_few_shot_examples(database_type)
+        self._matrix: Optional[np.ndarray] = None
+    
+    def _get_matrix(self) -> np.ndarray:
+        """Embed and L2-normalize example questions (once)"""
+        if self._matrix is None:
+            vectors = np.asarray(
+                self.embedder.embed([ex["question"] for ex in self.examples]),
+                dtype=np.float32
+            )
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            self._matrix = vectors / np.where(norms == 0, 1, norms)
+        return self._matrix
+    
+    def retrieve(self, question: str, k: int = 3) -> List[Dict[str, Any]]:
+        """
+        Get the k examples most similar to a question
+        
+        Args:
+            question: Natural language question
+            k: Number of examples to return
+        
+        Returns:
+            Up to k examples, in their original order
+        """
+        if not self.examples or k <= 0:
+            return []
+        
+        matrix = self._get_matrix()
+        query = np.asarray(self.embedder.embed_single(question), dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        
+        top, _ = top_k_similar(query, matrix, k)
+        return [self.examples[i] for i in sorted(top)]
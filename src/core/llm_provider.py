@@ -2,6 +2,7 @@
 
 import os
 import logging
+from functools import lru_cache
 from typing import Optional, Dict, Any
 from enum import Enum
 import instructor
@@ -9,6 +10,9 @@ from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
 
+# Keep-alive pool shared by every sync LLM client; sized for threaded batch calls
+HTTP_MAX_CONNECTIONS = 32
+
 
 class LLMProvider(str, Enum):
     """Supported LLM providers"""
@@ -34,12 +38,22 @@ def get_llm_client(config: LLMConfig):
     """
     Get instructor-wrapped LLM client based on provider
     
+    Clients are shared per configuration, so converters created per request
+    reuse one connection pool (and its warm TCP/TLS connections).
+    
     Args:
         config: LLM configuration
         
     Returns:
         Instructor-wrapped client
     """
+    return _build_llm_client(tuple(config.model_dump().items()))
+
+
+@lru_cache(maxsize=8)
+def _build_llm_client(config_key: tuple):
+    """Build (once per configuration) the instructor-wrapped client"""
+    config = LLMConfig(**dict(config_key))
     provider = config.provider
     
     if provider == LLMProvider.OPENAI:
@@ -56,13 +70,36 @@ def get_llm_client(config: LLMConfig):
         raise ValueError(f"Unsupported provider: {provider}")
 
 
+@lru_cache(maxsize=1)
+def _get_http_client():
+    """Build (once) the httpx connection pool shared by all sync LLM clients"""
+    import httpx
+    
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_CONNECTIONS
+        ),
+        follow_redirects=True
+    )
+
+
+def close_http_client():
+    """Close the shared sync connection pool (call on application shutdown)"""
+    if _get_http_client.cache_info().currsize:
+        _get_http_client().close()
+        _get_http_client.cache_clear()
+        _build_llm_client.cache_clear()
+
+
 def _get_openai_client(config: LLMConfig):
     """Get OpenAI client"""
     from openai import OpenAI
     
     client = OpenAI(
         api_key=config.api_key,
-        timeout=config.timeout
+        timeout=config.timeout,
+        http_client=_get_http_client()
     )
     return instructor.from_openai(client)
 
@@ -75,7 +112,8 @@ def _get_gemini_client(config: LLMConfig):
     client = OpenAI(
         api_key=config.api_key,
         base_url=config.base_url or "https://generativelanguage.googleapis.com/v1beta/openai/",
-        timeout=config.timeout
+        timeout=config.timeout,
+        http_client=_get_http_client()
     )
     return instructor.from_openai(client)
 
@@ -91,7 +129,8 @@ def _get_openrouter_client(config: LLMConfig):
         default_headers={
             "HTTP-Referer": "https://github.com/nl2sql",
             "X-Title": "NL2SQL"
-        }
+        },
+        http_client=_get_http_client()
     )
     return instructor.from_openai(client)
 
@@ -102,7 +141,8 @@ def _get_anthropic_client(config: LLMConfig):
     
     client = Anthropic(
         api_key=config.api_key,
-        timeout=float(config.timeout)
+        timeout=float(config.timeout),
+        http_client=_get_http_client()
     )
     return instructor.from_anthropic(client)
 
@@ -116,11 +156,17 @@ def _get_azure_openai_client(config: LLMConfig):
         api_key=config.api_key,
         azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
         api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01"),
-        timeout=config.timeout
+        timeout=config.timeout,
+        http_client=_get_http_client()
     )
     return instructor.from_openai(client)
 
 
+def reset_llm_client():
+    """Forget shared sync clients (e.g. after rotating API keys)"""
+    _build_llm_client.cache_clear()
+
+
 def get_default_model(provider: LLMProvider) -> str:
     """Get default model for each provider"""
     defaults = {
@@ -294,17 +294,17 @@ class PromptBuilder:
             cache_info["components_cached"] = True
             cache_info["tokens_saved"] = components.total_static_tokens
         
-        # Build system message with cached parts
+        # Build system message from static parts only, so it is byte-identical
+        # across calls and the provider's prompt-prefix cache can reuse it
         system_parts = [components.system_prompt]
         
         # Add schema
         system_parts.append(f"\n## Database Schema\n{schema_text}")
         
-        # Add query-type specific hints
-        if query_type:
-            hints = get_query_type_prompt(query_type.value if isinstance(query_type, QueryType) else str(query_type))
-            if hints:
-                system_parts.append(f"\n## Query Hints\n{hints}")
+        system_content = "\n".join(system_parts)
+        
+        # Per-question parts go ahead of the question in the user turn
+        context_parts = []
         
         # Add few-shot examples (may use query-type specific)
         if enable_few_shot:
@@ -314,28 +314,35 @@ class PromptBuilder:
                     query_type, relevant_tables
                 )
                 if specific_examples:
-                    system_parts.append(f"\n## Examples\n{specific_examples}")
+                    context_parts.append(f"## Examples\n{specific_examples}")
                     cache_info["examples_cached"] = True
                 else:
-                    system_parts.append(f"\n## Examples\n{components.few_shot_examples}")
+                    context_parts.append(f"## Examples\n{components.few_shot_examples}")
             else:
-                system_parts.append(f"\n## Examples\n{components.few_shot_examples}")
-        
-        system_content = "\n".join(system_parts)
+                context_parts.append(f"## Examples\n{components.few_shot_examples}")
         
-        # Build messages
-        messages = [{"role": "system", "content": system_content}]
-        
-        # Add conversation history
-        if conversation_history:
-            for msg in conversation_history[-6:]:  # Last 6 messages max
-                messages.append({
-                    "role": msg.get("role", "user"),
-                    "content": msg.get("content", "")
-                })
+        # Add query-type specific hints
+        if query_type:
+            hints = get_query_type_prompt(query_type.value if isinstance(query_type, QueryType) else str(query_type))
+            if hints:
+                context_parts.append(f"## Query Hints\n{hints}")
         
         # Add current question
-        messages.append({"role": "user", "content": question})
+        if context_parts:
+            context_parts.append(f"## Question\n{question}")
+            user_content = "\n\n".join(context_parts)
+        else:
+            user_content = question
+        
+        # Build messages: system, last 6 history messages, question
+        messages = [
+            {"role": "system", "content": system_content},
+            *(
+                {"role": msg.get("role", "user"), "content": msg.get("content", "")}
+                for msg in (conversation_history[-6:] if conversation_history else ())
+            ),
+            {"role": "user", "content": user_content}
+        ]
         
         return BuiltPrompt(messages=messages, cache_info=cache_info)
     
@@ -3,8 +3,9 @@
 import time
 import logging
 from typing import List, Dict, Any, Optional
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.engine import Engine
+from src.core.db_engine import get_engine
 from src.models.sql_query import QueryResult, DatabaseType
 from src.utils.validation import (
     validate_sql, 
@@ -25,7 +26,8 @@ class QueryExecutor:
         database_type: DatabaseType,
         default_limit: int = 100,
         max_limit: int = 1000,
-        enable_auto_limit: bool = True
+        enable_auto_limit: bool = True,
+        engine: Optional[Engine] = None
     ):
         """
         Initialize QueryExecutor
@@ -36,27 +38,20 @@ class QueryExecutor:
             default_limit: Default LIMIT to add if not specified
             max_limit: Maximum allowed LIMIT
             enable_auto_limit: Automatically add LIMIT if not present
+            engine: Engine to borrow connections from (default: shared engine)
         """
         self.connection_string = connection_string
         self.database_type = database_type
         self.default_limit = default_limit
         self.max_limit = max_limit
         self.enable_auto_limit = enable_auto_limit
-        self.engine: Optional[Engine] = None
+        self.engine: Optional[Engine] = engine
     
     def connect(self) -> Engine:
-        """Create and return database engine with connection pooling"""
+        """Return the shared pooled engine for this database"""
         if self.engine is None:
             try:
-                self.engine = create_engine(
-                    self.connection_string, 
-                    echo=False,
-                    pool_size=5,
-                    max_overflow=10,
-                    pool_timeout=30,
-                    pool_recycle=1800,
-                    pool_pre_ping=True
-                )
+                self.engine = get_engine(self.connection_string)
                 logger.info(f"Query executor connected to {self.database_type} database")
             except Exception as e:
                 logger.error(f"Failed to connect to database: {e}")
@@ -64,9 +59,8 @@ class QueryExecutor:
         return self.engine
     
     def disconnect(self):
-        """Close database connection"""
+        """Release the engine (its pool is shared, so it is not disposed)"""
         if self.engine:
-            self.engine.dispose()
             self.engine = None
             logger.info("Query executor disconnected")
     
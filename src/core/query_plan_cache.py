@@ -15,6 +15,58 @@ from collections import OrderedDict
 
 logger = logging.getLogger(__name__)
 
+# Literals a question can vary by without changing its SQL shape: quoted
+# strings, ISO dates, then bare numbers
+_QUESTION_LITERAL_RE = re.compile(
+    r"'([^']*)'|\"([^\"]*)\"|\b(\d{4}-\d{2}-\d{2})\b|(?<![\w.])(\d+(?:\.\d+)?)(?![\w.])"
+)
+_WHITESPACE_RE = re.compile(r"\s+")
+# Template placeholders like {p0} or {limit}
+_PLACEHOLDER_RE = re.compile(r"\{(\w+)\}")
+# SQL just before a number that makes it a position, not a value:
+# ORDER BY 1, GROUP BY a, 2, COUNT(1)
+_ORDINAL_PREFIX_RE = re.compile(
+    r"(?:\b(?:ORDER|GROUP)\s+BY\s+(?:[\w.]+(?:\s+(?:ASC|DESC))?\s*,\s*)*|\bCOUNT\s*\(\s*)$",
+    re.IGNORECASE
+)
+
+
+def question_shape(question: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """
+    Split a question into its literal-free shape and its literals
+    
+    "Orders after '2024-01-01' over 50" and "orders after '2024-02-01' over 75"
+    share the shape "orders after @d over @n".
+    
+    Args:
+        question: Natural language question
+    
+    Returns:
+        (shape, [(kind, value), ...]) with kind "str", "date" or "num"
+    """
+    literals: List[Tuple[str, str]] = []
+    
+    def replace(match: re.Match) -> str:
+        single, double, date, number = match.groups()
+        if date is not None:
+            literals.append(("date", date))
+            return "@d"
+        if number is not None:
+            literals.append(("num", number))
+            return "@n"
+        literals.append(("str", single if single is not None else double))
+        return "@s"
+    
+    shape = _QUESTION_LITERAL_RE.sub(replace, question.strip())
+    return _WHITESPACE_RE.sub(" ", shape).lower(), literals
+
+
+def _sql_literal_re(kind: str, value: str) -> "re.Pattern[str]":
+    """Regex for a question literal as it appears in SQL"""
+    if kind == "num":
+        return re.compile(r"(?<![\w.'])" + re.escape(value) + r"(?![\w.'])")
+    return re.compile("'" + re.escape(value.replace("'", "''")) + "'")
+
 
 class QueryPattern(Enum):
     """Common query patterns"""
@@ -47,6 +99,7 @@ class QueryPlan:
     
     # Metadata for template filling
     placeholders: List[str] = field(default_factory=list)
+    schema_version: Optional[str] = None
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
@@ -59,7 +112,8 @@ class QueryPlan:
             "confidence": self.confidence,
             "created_at": self.created_at.isoformat(),
             "hit_count": self.hit_count,
-            "placeholders": self.placeholders
+            "placeholders": self.placeholders,
+            "schema_version": self.schema_version
         }
     
     @classmethod
@@ -74,7 +128,8 @@ class QueryPlan:
             confidence=data.get("confidence", 0.8),
             created_at=datetime.fromisoformat(data["created_at"]) if "created_at" in data else datetime.now(),
             hit_count=data.get("hit_count", 0),
-            placeholders=data.get("placeholders", [])
+            placeholders=data.get("placeholders", []),
+            schema_version=data.get("schema_version")
         )
 
 
@@ -255,6 +310,7 @@ class QueryPlanCache:
     
     Features:
     - Pattern-based caching (similar patterns share plans)
+    - Shape-based caching (same wording, different literals)
     - LRU eviction for memory management
     - Template parameterization
     - Statistics tracking
@@ -273,12 +329,16 @@ class QueryPlanCache:
         # LRU cache using OrderedDict
         self._cache: OrderedDict[str, QueryPlan] = OrderedDict()
         
+        # Question shape -> SQL template with one placeholder per question literal
+        self._shape_cache: OrderedDict[str, QueryPlan] = OrderedDict()
+        
         # Pattern detector
         self.detector = QueryPatternDetector()
         
         # Statistics
         self._hits = 0
         self._misses = 0
+        self._shape_hits = 0
         self._pattern_stats: Dict[str, int] = {}
     
     def _generate_cache_key(
@@ -475,6 +535,103 @@ class QueryPlanCache:
         
         return cache_key
     
+    def get_by_shape(
+        self,
+        question: str,
+        schema_version: Optional[str] = None
+    ) -> Optional[Tuple[QueryPlan, str]]:
+        """
+        Get cached SQL for a question that differs from a cached one only in literals
+        
+        Args:
+            question: Natural language question
+            schema_version: Current schema version (plans from others miss)
+        
+        Returns:
+            Tuple of (QueryPlan, SQL with this question's literals) if found
+        """
+        shape, literals = question_shape(question)
+        if not literals:
+            return None
+        
+        plan = self._shape_cache.get(shape)
+        if plan is None:
+            return None
+        if datetime.now() - plan.created_at > self.ttl or plan.schema_version != schema_version:
+            del self._shape_cache[shape]
+            return None
+        
+        self._shape_cache.move_to_end(shape)
+        plan.hit_count += 1
+        plan.last_used = datetime.now()
+        self._shape_hits += 1
+        
+        params = {
+            f"p{i}": value if kind == "num" else "'" + value.replace("'", "''") + "'"
+            for i, (kind, value) in enumerate(literals)
+        }
+        logger.info(f"Query plan cache SHAPE HIT: {shape[:50]}")
+        return plan, self.fill_template(plan, params)
+    
+    def put_shape(
+        self,
+        question: str,
+        sql: str,
+        tables_used: List[str],
+        confidence: float = 0.8,
+        schema_version: Optional[str] = None
+    ) -> bool:
+        """
+        Cache SQL as a template keyed by the question's shape
+        
+        Only stored when every literal in the question appears in the SQL and
+        no two literals share a value, so re-binding is unambiguous.
+        
+        Args:
+            question: Original question
+            sql: Generated SQL
+            tables_used: Tables in the query
+            confidence: Confidence score
+            schema_version: Schema version the SQL was generated for
+        
+        Returns:
+            True if stored
+        """
+        shape, literals = question_shape(question)
+        if not literals or len(set(literals)) != len(literals):
+            return False
+        
+        # Quoted literals first, so numbers inside them are never sliced out
+        template = sql
+        order = sorted(range(len(literals)), key=lambda i: literals[i][0] == "num")
+        for i in order:
+            kind, value = literals[i]
+            pattern = _sql_literal_re(kind, value)
+            matches = list(pattern.finditer(template))
+            # A value used twice (or as ORDER BY/GROUP BY position or COUNT(1))
+            # can't be told apart from a constant; don't guess
+            if len(matches) != 1:
+                return False
+            match = matches[0]
+            if kind == "num" and _ORDINAL_PREFIX_RE.search(template, 0, match.start()):
+                return False
+            template = template[:match.start()] + f"{{p{i}}}" + template[match.end():]
+        
+        while len(self._shape_cache) >= self.max_size:
+            self._shape_cache.popitem(last=False)
+        
+        self._shape_cache[shape] = QueryPlan(
+            pattern=self.detector.detect_pattern(question).pattern,
+            sql_template=template,
+            parameters={},
+            tables_used=tables_used,
+            columns_used=[],
+            confidence=confidence,
+            placeholders=[f"p{i}" for i in range(len(literals))],
+            schema_version=schema_version
+        )
+        return True
+    
     def _extract_runtime_params(
         self,
         question: str,
@@ -531,14 +688,11 @@ class QueryPlanCache:
         Returns:
             Filled SQL query
         """
-        sql = plan.sql_template
-        
-        for key, value in params.items():
-            placeholder = "{" + key + "}"
-            if placeholder in sql:
-                sql = sql.replace(placeholder, str(value))
-        
-        return sql
+        # One pass, so a value containing "{p1}" is never substituted again
+        return _PLACEHOLDER_RE.sub(
+            lambda m: str(params[m.group(1)]) if m.group(1) in params else m.group(0),
+            plan.sql_template
+        )
     
     def invalidate(self, pattern: Optional[QueryPattern] = None):
         """
@@ -549,6 +703,7 @@ class QueryPlanCache:
         """
         if pattern is None:
             self._cache.clear()
+            self._shape_cache.clear()
             logger.info("Query plan cache cleared")
         else:
             keys_to_remove = [
@@ -566,8 +721,10 @@ class QueryPlanCache:
         
         return {
             "size": len(self._cache),
+            "shape_size": len(self._shape_cache),
             "max_size": self.max_size,
             "hits": self._hits,
+            "shape_hits": self._shape_hits,
             "misses": self._misses,
             "hit_rate": hit_rate,
             "pattern_stats": self._pattern_stats,
@@ -582,6 +739,7 @@ class QueryPlanCache:
         """Reset statistics"""
         self._hits = 0
         self._misses = 0
+        self._shape_hits = 0
         self._pattern_stats.clear()
 
 
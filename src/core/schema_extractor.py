@@ -1,43 +1,111 @@
 """Database schema extraction module"""
 
-from typing import List, Dict, Any, Optional
-from sqlalchemy import create_engine, inspect, text
+import os
+import time
+import hashlib
+from pathlib import Path
+from typing import List, Dict, Any, Optional, FrozenSet
+from sqlalchemy import inspect, text
 from sqlalchemy.engine import Engine
 import logging
+from src.core.db_engine import get_engine
 from src.models.sql_query import TableSchema, DatabaseSchema, DatabaseType
 
 logger = logging.getLogger(__name__)
 
+# Cheap catalog summaries that change whenever tables, columns or keys change
+_CATALOG_FINGERPRINT_SQL: Dict[DatabaseType, str] = {
+    # relnatts never shrinks (dropped columns keep their slot), so live columns
+    # are summarised from pg_attribute: count plus a digest of name/type/nullability.
+    # PK/FK constraints get the same from pg_constraint
+    DatabaseType.POSTGRESQL: """WITH rels AS (
+    SELECT c.oid, c.relnatts
+    FROM pg_catalog.pg_class c
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind IN ('r', 'p', 'v', 'm')
+    AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+), cols AS (
+    SELECT count(*) AS n, md5(coalesce(string_agg(
+        a.attrelid::text || ':' || a.attname || ':' || a.atttypid::text || ':'
+            || a.atttypmod::text || ':' || a.attnotnull::text,
+        ',' ORDER BY a.attrelid, a.attnum
+    ), '')) AS digest
+    FROM pg_catalog.pg_attribute a
+    JOIN rels r ON r.oid = a.attrelid
+    WHERE a.attnum > 0 AND NOT a.attisdropped
+), cons AS (
+    SELECT count(*) AS n, md5(coalesce(string_agg(
+        concat_ws(':', con.conrelid, con.conname, con.contype, con.conkey, con.confrelid, con.confkey),
+        ',' ORDER BY con.conrelid, con.conname
+    ), '')) AS digest
+    FROM pg_catalog.pg_constraint con
+    JOIN rels r ON r.oid = con.conrelid
+    WHERE con.contype IN ('p', 'f', 'u')
+)
+SELECT count(*), coalesce(max(rels.oid::bigint), 0), coalesce(sum(rels.relnatts), 0),
+    (SELECT n FROM cols), (SELECT digest FROM cols),
+    (SELECT n FROM cons), (SELECT digest FROM cons)
+FROM rels""",
+    # Order-independent sums of per-column/per-key-column CRCs, so renames and
+    # type, nullability or key changes alter the fingerprint
+    DatabaseType.MYSQL: """SELECT cols.n, cols.n_tables, cols.max_position, cols.digest, keys_.n, keys_.digest
+FROM (
+    SELECT COUNT(*) AS n, COUNT(DISTINCT TABLE_NAME) AS n_tables, MAX(ORDINAL_POSITION) AS max_position,
+        COALESCE(SUM(CRC32(CONCAT_WS(':', TABLE_NAME, COLUMN_NAME, ORDINAL_POSITION, COLUMN_TYPE, IS_NULLABLE))), 0) AS digest
+    FROM INFORMATION_SCHEMA.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE()
+) cols
+CROSS JOIN (
+    SELECT COUNT(*) AS n,
+        COALESCE(SUM(CRC32(CONCAT_WS(':', TABLE_NAME, CONSTRAINT_NAME, COLUMN_NAME, ORDINAL_POSITION,
+            REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME))), 0) AS digest
+    FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE
+    WHERE TABLE_SCHEMA = DATABASE()
+) keys_""",
+}
+
 
 class SchemaExtractor:
     """Extract database schema information for PostgreSQL and MySQL"""
     
-    def __init__(self, connection_string: str, database_type: DatabaseType):
+    def __init__(
+        self,
+        connection_string: str,
+        database_type: DatabaseType,
+        engine: Optional[Engine] = None,
+        disk_cache_ttl: Optional[int] = None
+    ):
         """
         Initialize SchemaExtractor
         
         Args:
             connection_string: SQLAlchemy connection string
             database_type: Type of database (postgresql or mysql)
+            engine: Engine to borrow connections from (default: shared engine)
+            disk_cache_ttl: Seconds an on-disk schema snapshot stays valid
+                (default: SCHEMA_CACHE_TTL env or 900; 0 disables the disk cache)
         """
         self.connection_string = connection_string
         self.database_type = database_type
-        self.engine: Optional[Engine] = None
+        self.engine: Optional[Engine] = engine
         self._schema_cache: Optional[DatabaseSchema] = None
+        self._table_names: Optional[List[str]] = None
+        self._table_name_set: Optional[FrozenSet[str]] = None
         
+        # On-disk snapshots keyed by catalog fingerprint (skip introspection on cold start)
+        if disk_cache_ttl is None:
+            disk_cache_ttl = int(os.getenv("SCHEMA_CACHE_TTL", "900"))
+        self.disk_cache_ttl = disk_cache_ttl
+        self.disk_cache_dir = Path(os.getenv(
+            "SCHEMA_CACHE_DIR",
+            str(Path.home() / ".cache" / "nl2sql")
+        ))
+    
     def connect(self) -> Engine:
-        """Create and return database engine with connection pooling"""
+        """Return the shared pooled engine for this database"""
         if self.engine is None:
             try:
-                self.engine = create_engine(
-                    self.connection_string, 
-                    echo=False,
-                    pool_size=3,
-                    max_overflow=5,
-                    pool_timeout=30,
-                    pool_recycle=1800,
-                    pool_pre_ping=True
-                )
+                self.engine = get_engine(self.connection_string)
                 logger.info(f"Connected to {self.database_type} database")
             except Exception as e:
                 logger.error(f"Failed to connect to database: {e}")
@@ -45,27 +113,44 @@ class SchemaExtractor:
         return self.engine
     
     def disconnect(self):
-        """Close database connection"""
+        """Release the engine (its pool is shared, so it is not disposed)"""
         if self.engine:
-            self.engine.dispose()
             self.engine = None
             logger.info("Database connection closed")
     
-    def extract_schema(self, include_sample_data: bool = False, sample_limit: int = 3) -> DatabaseSchema:
+    def extract_schema(
+        self,
+        include_sample_data: bool = False,
+        sample_limit: int = 3,
+        refresh: bool = False
+    ) -> DatabaseSchema:
         """
         Extract complete database schema
         
         Args:
             include_sample_data: Whether to include sample data from tables
             sample_limit: Number of sample rows to fetch per table
+            refresh: Re-check the database instead of returning the in-memory
+                schema (the disk cache is still used if the catalog is unchanged)
             
         Returns:
             DatabaseSchema object containing all schema information
         """
-        if self._schema_cache is not None and not include_sample_data:
+        if self._schema_cache is not None and not include_sample_data and not refresh:
             return self._schema_cache
         
         engine = self.connect()
+        
+        cache_path = None
+        if not include_sample_data and self.disk_cache_ttl > 0:
+            cache_path = self._disk_cache_path(engine)
+            schema = self._load_disk_cache(cache_path)
+            if schema is not None:
+                self._schema_cache = schema
+                self._table_names = None
+                self._table_name_set = None
+                return schema
+        
         inspector = inspect(engine)
         
         # Get database name
@@ -99,9 +184,69 @@ class SchemaExtractor:
         # Cache schema if not including sample data
         if not include_sample_data:
             self._schema_cache = schema
+            self._table_names = None
+            self._table_name_set = None
+            if cache_path is not None:
+                self._save_disk_cache(cache_path, schema)
         
         return schema
     
+    def _disk_cache_path(self, engine: Engine) -> Optional[Path]:
+        """
+        Path of the schema snapshot for the database's current catalog
+        
+        The key hashes the connection string, server version and a catalog
+        summary, so DDL that adds, drops, renames or retypes tables/columns,
+        or changes primary/foreign keys, misses the cache.
+        
+        Args:
+            engine: SQLAlchemy engine
+        
+        Returns:
+            Snapshot path, or None if the catalog could not be fingerprinted
+        """
+        fingerprint_sql = _CATALOG_FINGERPRINT_SQL.get(self.database_type)
+        if fingerprint_sql is None:
+            return None
+        try:
+            with engine.connect() as conn:
+                catalog = conn.execute(text(fingerprint_sql)).fetchone()
+            server_version = engine.dialect.server_version_info
+        except Exception as e:
+            logger.warning(f"Failed to fingerprint schema catalog: {e}")
+            return None
+        
+        fingerprint = hashlib.sha256(
+            f"{self.connection_string}|{server_version}|{tuple(catalog)}".encode()
+        ).hexdigest()
+        return self.disk_cache_dir / f"{fingerprint}.json"
+    
+    def _load_disk_cache(self, path: Optional[Path]) -> Optional[DatabaseSchema]:
+        """Load a schema snapshot if it exists and is within the TTL"""
+        if path is None:
+            return None
+        try:
+            if time.time() - path.stat().st_mtime > self.disk_cache_ttl:
+                return None
+            schema = DatabaseSchema.model_validate_json(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable schema cache {path}: {e}")
+            return None
+        logger.info(f"Loaded schema from disk cache ({schema.total_tables} tables)")
+        return schema
+    
+    def _save_disk_cache(self, path: Path, schema: DatabaseSchema):
+        """Write a schema snapshot atomically (readers never see a partial file)"""
+        try:
+            path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(schema.model_dump_json())
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to write schema cache {path}: {e}")
+    
     def _extract_table_schema(
         self, 
         inspector, 
@@ -261,13 +406,26 @@ class SchemaExtractor:
     
     def get_table_names(self) -> List[str]:
         """
-        Get list of all table names
+        Get list of all table names (memoized with the cached schema)
         
         Returns:
-            List of table names
+            List of table names (shared; do not mutate)
         """
-        schema = self.extract_schema()
-        return [table.table_name for table in schema.tables]
+        if self._table_names is None or self._schema_cache is None:
+            schema = self.extract_schema()
+            self._table_names = [table.table_name for table in schema.tables]
+        return self._table_names
+    
+    def get_table_name_set(self) -> FrozenSet[str]:
+        """
+        Get lowercased table names for O(1) membership checks (memoized)
+        
+        Returns:
+            Frozen set of lowercase table names
+        """
+        if self._table_name_set is None:
+            self._table_name_set = frozenset(name.lower() for name in self.get_table_names())
+        return self._table_name_set
     
     def get_table_schema(self, table_name: str) -> Optional[TableSchema]:
         """
@@ -5,12 +5,41 @@ Implements compact schema representation with semantic grouping
 
 import re
 import logging
-from typing import List, Dict, Optional, Set, Tuple
+from collections import OrderedDict
+from typing import List, Dict, Optional, Set, Tuple, Callable
 from dataclasses import dataclass, field
 from src.models.sql_query import DatabaseSchema, TableSchema
 
 logger = logging.getLogger(__name__)
 
+# Entries kept in each per-question memo of a SchemaOptimizer
+_MEMO_SIZE = 256
+
+
+def get_token_counter(model: Optional[str] = None) -> Callable[[str], int]:
+    """
+    Get a token counting function for a model
+    
+    Uses tiktoken when installed (cl100k_base for unknown models), otherwise
+    the ~4 characters per token estimate.
+    
+    Args:
+        model: Model name used to pick the tokenizer
+    
+    Returns:
+        Function mapping text to its token count
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return lambda text: len(text) // 4
+    
+    try:
+        encoding = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+    except KeyError:
+        encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text))
+
 
 @dataclass
 class TableGroup:
@@ -68,11 +97,36 @@ class SchemaOptimizer:
     - Intelligent schema pruning based on question
     """
     
-    def __init__(self, schema: DatabaseSchema):
+    def __init__(self, schema: DatabaseSchema, model: Optional[str] = None):
         self.schema = schema
         self.table_groups: Dict[str, List[str]] = {}
         self.relationships: List[Dict] = []
         self._analyze_schema()
+        
+        # Rendered compact schemas (by include_types) and per-table token costs
+        self._compact_schemas: Dict[bool, str] = {}
+        self._count_tokens = get_token_counter(model)
+        self._table_tokens: Dict[str, int] = {
+            t.table_name: self._count_tokens(self._format_table_compact(t, False))
+            for t in self.schema.tables
+        }
+        self._full_schema_tokens: Optional[int] = None
+        
+        # Lowercased match terms per table: (table, name, name words, column names)
+        self._table_terms: List[Tuple[TableSchema, str, Tuple[str, ...], Tuple[str, ...]]] = [
+            (
+                t,
+                t.table_name.lower(),
+                tuple(w for w in re.split(r'[_\s]', t.table_name.lower()) if len(w) > 2),
+                tuple(c["name"].lower() for c in t.columns)
+            )
+            for t in self.schema.tables
+        ]
+        self._tables_by_name: Dict[str, TableSchema] = {t.table_name: t for t in self.schema.tables}
+        
+        # Per-question table scores and rendered table subsets (bounded LRUs)
+        self._score_cache: "OrderedDict[str, Tuple[Tuple[int, TableSchema], ...]]" = OrderedDict()
+        self._subset_schemas: "OrderedDict[Tuple[Tuple[str, ...], bool], str]" = OrderedDict()
     
     def _analyze_schema(self):
         """Analyze schema and build groups + relationships"""
@@ -133,6 +187,10 @@ class SchemaOptimizer:
         Returns:
             Compact schema string
         """
+        cached = self._compact_schemas.get(include_types)
+        if cached is not None:
+            return cached
+        
         output = []
         output.append(f"# Database: {self.schema.database_name}")
         output.append(f"# Tables: {self.schema.total_tables}\n")
@@ -158,7 +216,53 @@ class SchemaOptimizer:
                     f"{rel['to_table']}.{rel['to_column']}"
                 )
         
-        return "\n".join(output)
+        compact = "\n".join(output)
+        self._compact_schemas[include_types] = compact
+        return compact
+    
+    def format_budgeted_schema(
+        self,
+        question: str,
+        max_tokens: int = 4000,
+        min_matches: int = 3
+    ) -> str:
+        """
+        Compact schema that fits a token budget
+        
+        The full compact schema is used whenever it fits (or when fewer than
+        min_matches tables match the question), so the prompt stays identical
+        across questions. Otherwise the best-matching tables are packed
+        greedily up to the budget and listed in schema order.
+        
+        Args:
+            question: User's question
+            max_tokens: Token budget for the schema text
+            min_matches: Matching tables needed before pruning the schema
+        
+        Returns:
+            Compact schema string
+        """
+        full = self.format_compact_schema(include_types=False)
+        if self._full_schema_tokens is None:
+            self._full_schema_tokens = self._count_tokens(full)
+        if self._full_schema_tokens <= max_tokens:
+            return full
+        
+        scored = self._score_tables(question)
+        if len(scored) < min_matches:
+            return full
+        
+        selected: Set[str] = set()
+        used = 0
+        for _, table in scored:
+            cost = self._table_tokens[table.table_name]
+            if used + cost <= max_tokens:
+                selected.add(table.table_name)
+                used += cost
+        
+        tables = [t for t in self.schema.tables if t.table_name in selected]
+        logger.debug(f"Schema pruned to {len(tables)}/{self.schema.total_tables} tables (~{used} tokens)")
+        return self._format_table_subset(tables, include_types=False)
     
     def _format_table_compact(self, table: TableSchema, include_types: bool) -> str:
         """Format single table in compact format"""
@@ -199,10 +303,7 @@ class SchemaOptimizer:
     
     def _get_table(self, table_name: str) -> Optional[TableSchema]:
         """Get table by name"""
-        for table in self.schema.tables:
-            if table.table_name == table_name:
-                return table
-        return None
+        return self._tables_by_name.get(table_name)
     
     def get_relevant_tables(
         self, 
@@ -219,26 +320,37 @@ class SchemaOptimizer:
         Returns:
             List of relevant TableSchema objects
         """
+        scored_tables = self._score_tables(question)
+        
+        # If no matches, return all tables (up to max)
+        if not scored_tables:
+            return self.schema.tables[:max_tables]
+        
+        return [t for _, t in scored_tables[:max_tables]]
+    
+    def _score_tables(self, question: str) -> List[Tuple[int, TableSchema]]:
+        """Keyword-match tables against a question (matching tables only, best first)"""
         question_lower = question.lower()
-        scored_tables = []
+        cached = self._score_cache.get(question_lower)
+        if cached is not None:
+            self._score_cache.move_to_end(question_lower)
+            return list(cached)
         
-        for table in self.schema.tables:
+        scored_tables = []
+        for table, table_lower, table_words, column_names in self._table_terms:
             score = 0
-            table_lower = table.table_name.lower()
             
             # Check if table name appears in question
             if table_lower in question_lower:
                 score += 10
             
             # Check individual words
-            table_words = re.split(r'[_\s]', table_lower)
             for word in table_words:
-                if len(word) > 2 and word in question_lower:
+                if word in question_lower:
                     score += 5
             
             # Check column names
-            for col in table.columns:
-                col_lower = col["name"].lower()
+            for col_lower in column_names:
                 if col_lower in question_lower:
                     score += 3
             
@@ -248,11 +360,10 @@ class SchemaOptimizer:
         # Sort by score descending
         scored_tables.sort(key=lambda x: x[0], reverse=True)
         
-        # If no matches, return all tables (up to max)
-        if not scored_tables:
-            return self.schema.tables[:max_tables]
-        
-        return [t for _, t in scored_tables[:max_tables]]
+        self._score_cache[question_lower] = tuple(scored_tables)
+        if len(self._score_cache) > _MEMO_SIZE:
+            self._score_cache.popitem(last=False)
+        return scored_tables
     
     def format_relevant_schema(
         self, 
@@ -277,6 +388,16 @@ class SchemaOptimizer:
             # All tables relevant, use full compact schema
             return self.format_compact_schema(include_types)
         
+        return self._format_table_subset(relevant, include_types)
+    
+    def _format_table_subset(self, relevant: List[TableSchema], include_types: bool) -> str:
+        """Format a subset of tables with the JOIN keys between them (memoized)"""
+        key = (tuple(t.table_name for t in relevant), include_types)
+        cached = self._subset_schemas.get(key)
+        if cached is not None:
+            self._subset_schemas.move_to_end(key)
+            return cached
+        
         output = []
         output.append(f"# Relevant Tables ({len(relevant)}/{self.schema.total_tables})")
         
@@ -298,7 +419,11 @@ class SchemaOptimizer:
                     f"{rel['to_table']}.{rel['to_column']}"
                 )
         
-        return "\n".join(output)
+        formatted = "\n".join(output)
+        self._subset_schemas[key] = formatted
+        if len(self._subset_schemas) > _MEMO_SIZE:
+            self._subset_schemas.popitem(last=False)
+        return formatted
     
     def get_join_path(
         self, 
@@ -77,6 +77,9 @@ class SchemaVersionManager:
         self.max_history = max_history
         self.current_snapshot: Optional[SchemaSnapshot] = None
         self.history: List[SchemaSnapshot] = []
+        
+        # Tables added/removed/modified by the most recent schema change
+        self.last_changes: Dict[str, List[str]] = {}
     
     def compute_schema_hash(self, schema: Any) -> str:
         """
@@ -227,6 +230,7 @@ class SchemaVersionManager:
             
             # Log changes
             changes = self._detect_changes(self.history[-2], new_snapshot)
+            self.last_changes = changes
             logger.info(f"Schema changed: {old_hash} -> {new_snapshot.version_hash}")
             logger.info(f"Changes detected: {changes}")
             
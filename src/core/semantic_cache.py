@@ -16,10 +16,11 @@ Features:
 import os
 import re
 import json
+import asyncio
 import hashlib
 import logging
 from dataclasses import dataclass, field
-from typing import Optional, Dict, List, Any, Tuple
+from typing import Optional, Dict, List, Any, Set, Tuple
 from datetime import datetime
 import numpy as np
 
@@ -29,9 +30,14 @@ from src.core.embedding_provider import (
     get_default_embedder,
     cosine_similarity,
     batch_cosine_similarity,
+    top_k_indices,
+    quantize_embeddings,
+    batch_cosine_similarity_int8,
+    batch_hamming_similarity,
     EmbeddingConfig,
     EmbeddingProvider
 )
+from src.utils.validation import extract_table_names
 
 logger = logging.getLogger(__name__)
 
@@ -196,28 +202,97 @@ class QueryNormalizer:
         return intent
 
 
+class _HNSWIndex:
+    """
+    FAISS HNSW inner-product index over L2-normalized vectors
+    
+    HNSW can't delete, so removed keys are tombstoned and skipped in results;
+    the owner rebuilds the index once tombstones outnumber live entries.
+    """
+    
+    def __init__(self, dimension: int, neighbors: int = 32):
+        import faiss
+        self.index = faiss.IndexHNSWFlat(dimension, neighbors, faiss.METRIC_INNER_PRODUCT)
+        self._keys: List[Optional[str]] = []
+        self._positions: Dict[str, int] = {}
+        self._dead = 0
+    
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        """Reshape to a float32 row and L2-normalize"""
+        vector = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    @property
+    def needs_rebuild(self) -> bool:
+        """True once most indexed vectors are tombstoned"""
+        return self._dead > len(self._positions)
+    
+    def add(self, key: str, vector: np.ndarray):
+        """Add or replace a key's vector"""
+        self.remove(key)
+        self.index.add(self._normalize(vector))
+        self._positions[key] = len(self._keys)
+        self._keys.append(key)
+    
+    def remove(self, key: str):
+        """Tombstone a key (no-op if absent)"""
+        position = self._positions.pop(key, None)
+        if position is not None:
+            self._keys[position] = None
+            self._dead += 1
+    
+    def search(self, vector: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        """Approximate top-k (key, cosine similarity) pairs"""
+        scores, ids = self.index.search(self._normalize(vector), k)
+        return [
+            (self._keys[i], float(score))
+            for score, i in zip(scores[0], ids[0])
+            if i >= 0 and self._keys[i] is not None
+        ]
+
+
 class EmbeddingVectorStore:
     """
     In-memory vector store with Redis persistence for embeddings
     
-    Uses approximate nearest neighbor search for fast similarity lookup.
+    Small stores are searched exactly with one matrix product. Stores of at
+    least ANN_MIN_VECTORS use a FAISS HNSW index when faiss is installed.
+    With int8 or binary quantization vectors are kept (and scanned) in that
+    compact form instead, 4x or 32x smaller than float32; there is no ANN index.
     """
     
+    # Below this many vectors an exact matrix scan is already sub-millisecond
+    ANN_MIN_VECTORS = 2000
+    
     def __init__(
         self,
         cache_manager: CacheManager,
         dimension: int,
-        max_vectors: int = 5000
+        max_vectors: int = 5000,
+        quantization: str = "fp32"
     ):
         self.cache_manager = cache_manager
         self.dimension = dimension
         self.max_vectors = max_vectors
+        self.quantization = quantization
         
         # In-memory vector index
         self._vectors: Dict[str, np.ndarray] = {}  # cache_key -> embedding
         self._metadata: Dict[str, Dict] = {}  # cache_key -> {query_type, tables, schema_version}
         self._keys_order: List[str] = []  # For LRU eviction
         
+        # Stacked (n, dim) matrix of _vectors, rebuilt lazily after writes
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+        self._matrix_versions: Optional[np.ndarray] = None
+        self._matrix_types: Optional[np.ndarray] = None
+        self._matrix_norms: Optional[np.ndarray] = None  # Row norms, int8 only
+        
+        # Optional ANN index, built once the store reaches ANN_MIN_VECTORS
+        self._ann: Optional[_HNSWIndex] = None
+        
         # Load from Redis on init
         self._load_from_redis()
     
@@ -227,8 +302,9 @@ class EmbeddingVectorStore:
             index_data = self.cache_manager.get("embedding_index", CacheLevel.SEMANTIC)
             if index_data:
                 for key, entry in index_data.items():
-                    if entry.get("embedding"):
-                        self._vectors[key] = np.array(entry["embedding"], dtype=np.float32)
+                    # Vectors stored under another quantization can't be compared
+                    if entry.get("embedding") and entry.get("quantization", "fp32") == self.quantization:
+                        self._vectors[key] = np.array(entry["embedding"], dtype=self._storage_dtype)
                         self._metadata[key] = {
                             "query_type": entry.get("query_type", "unknown"),
                             "tables": entry.get("tables", []),
@@ -239,6 +315,11 @@ class EmbeddingVectorStore:
         except Exception as e:
             logger.warning(f"Failed to load vector index from Redis: {e}")
     
+    @property
+    def _storage_dtype(self) -> type:
+        """dtype of stored vectors for the configured quantization"""
+        return {"int8": np.int8, "binary": np.uint8}.get(self.quantization, np.float32)
+    
     def _save_to_redis(self):
         """Save vector index to Redis"""
         try:
@@ -246,6 +327,7 @@ class EmbeddingVectorStore:
             for key in self._vectors:
                 index_data[key] = {
                     "embedding": self._vectors[key].tolist(),
+                    "quantization": self.quantization,
                     **self._metadata.get(key, {})
                 }
             
@@ -271,7 +353,10 @@ class EmbeddingVectorStore:
         while len(self._vectors) >= self.max_vectors:
             self._evict_oldest()
         
-        self._vectors[key] = embedding
+        self._vectors[key] = quantize_embeddings(embedding, self.quantization)
+        self._matrix = None
+        if self._ann is not None:
+            self._ann.add(key, embedding)
         self._metadata[key] = {
             "query_type": query_type,
             "tables": tables or [],
@@ -291,11 +376,28 @@ class EmbeddingVectorStore:
         """Remove vector from store"""
         if key in self._vectors:
             del self._vectors[key]
+            self._matrix = None
+            if self._ann is not None:
+                self._ann.remove(key)
         if key in self._metadata:
             del self._metadata[key]
         if key in self._keys_order:
             self._keys_order.remove(key)
     
+    def keys(self) -> List[str]:
+        """Keys of all stored vectors"""
+        return list(self._vectors)
+    
+    def get_metadata(self, key: str) -> Dict[str, Any]:
+        """Metadata (query_type, tables, schema_version) stored for a key"""
+        return self._metadata.get(key, {})
+    
+    def set_schema_version(self, key: str, schema_version: Optional[str]):
+        """Re-tag a stored vector with another schema version"""
+        if key in self._metadata:
+            self._metadata[key]["schema_version"] = schema_version
+            self._matrix = None
+    
     def search(
         self,
         query_embedding: np.ndarray,
@@ -320,45 +422,92 @@ class EmbeddingVectorStore:
         if not self._vectors:
             return []
         
-        # Filter candidates by metadata
-        candidate_keys = []
-        candidate_vectors = []
+        ann = self._get_ann()
+        if ann is not None:
+            return self._search_ann(ann, query_embedding, top_k, query_type, schema_version, min_similarity)
         
-        for key, embedding in self._vectors.items():
-            meta = self._metadata.get(key, {})
-            
-            # Schema version filter
-            if schema_version and meta.get("schema_version"):
-                if meta["schema_version"] != schema_version:
-                    continue
-            
-            # Query type filter (soft - boost matching types)
-            candidate_keys.append(key)
-            candidate_vectors.append(embedding)
+        matrix, keys = self._get_matrix()
         
-        if not candidate_vectors:
-            return []
+        # Compute similarities against every vector in one matrix product
+        query = quantize_embeddings(query_embedding, self.quantization)
+        if self.quantization == "int8":
+            similarities = batch_cosine_similarity_int8(query, matrix, self._matrix_norms)
+        elif self.quantization == "binary":
+            similarities = batch_hamming_similarity(query, matrix, self.dimension)
+        else:
+            similarities = batch_cosine_similarity(query, matrix)
         
-        # Compute similarities
-        vectors_matrix = np.array(candidate_vectors)
-        similarities = batch_cosine_similarity(query_embedding, vectors_matrix)
+        # Schema version filter (entries without a version always match)
+        if schema_version:
+            stale = (self._matrix_versions != schema_version) & (self._matrix_versions != "")
+            similarities = np.where(stale, -np.inf, similarities)
         
-        # Apply query type boost
+        # Query type boost (soft - 10% for matching types)
         if query_type:
-            for i, key in enumerate(candidate_keys):
-                meta = self._metadata.get(key, {})
-                if meta.get("query_type") == query_type:
-                    similarities[i] *= 1.1  # 10% boost for matching type
+            similarities = np.where(self._matrix_types == query_type, similarities * 1.1, similarities)
+        
+        # Top k by similarity (best first), then drop those under the threshold
+        return [
+            (keys[i], float(similarities[i]))
+            for i in top_k_indices(similarities, top_k)
+            if similarities[i] >= min_similarity
+        ]
+    
+    def _get_matrix(self) -> Tuple[np.ndarray, List[str]]:
+        """Return the stacked vector matrix and its row keys, rebuilding after writes"""
+        if self._matrix is None:
+            self._matrix_keys = list(self._vectors)
+            # Contiguous and in storage dtype (float32 unless quantized), so
+            # fp32 similarity search is a single SGEMV
+            self._matrix = np.ascontiguousarray(
+                np.stack([self._vectors[k] for k in self._matrix_keys]), dtype=self._storage_dtype
+            )
+            if self.quantization == "int8":
+                self._matrix_norms = np.linalg.norm(self._matrix.astype(np.float32), axis=1)
+            metas = [self._metadata.get(k, {}) for k in self._matrix_keys]
+            self._matrix_versions = np.array([m.get("schema_version") or "" for m in metas], dtype=object)
+            self._matrix_types = np.array([m.get("query_type") for m in metas], dtype=object)
+        return self._matrix, self._matrix_keys
+    
+    def _get_ann(self) -> Optional[_HNSWIndex]:
+        """Return the ANN index for large fp32 stores (None if small, quantized or faiss is missing)"""
+        if self.quantization != "fp32" or len(self._vectors) < self.ANN_MIN_VECTORS:
+            return None
+        if self._ann is None or self._ann.needs_rebuild:
+            try:
+                ann = _HNSWIndex(self.dimension)
+            except ImportError:
+                return None
+            for key, vector in self._vectors.items():
+                ann.add(key, vector)
+            self._ann = ann
+        return self._ann
+    
+    def _search_ann(
+        self,
+        ann: _HNSWIndex,
+        query_embedding: np.ndarray,
+        top_k: int,
+        query_type: Optional[str],
+        schema_version: Optional[str],
+        min_similarity: float
+    ) -> List[Tuple[str, float]]:
+        """search() over ANN candidates, with the same filters and boost as the exact scan"""
+        # Over-fetch so the version filter still leaves enough candidates
+        candidates = ann.search(query_embedding, min(len(self._vectors), max(top_k * 4, 64)))
         
-        # Get top k above threshold
         results = []
-        for i, sim in enumerate(similarities):
-            if sim >= min_similarity:
-                results.append((candidate_keys[i], float(sim)))
+        for key, similarity in candidates:
+            meta = self._metadata.get(key, {})
+            version = meta.get("schema_version")
+            if schema_version and version and version != schema_version:
+                continue
+            if query_type and meta.get("query_type") == query_type:
+                similarity *= 1.1
+            if similarity >= min_similarity:
+                results.append((key, similarity))
         
-        # Sort by similarity descending
         results.sort(key=lambda x: x[1], reverse=True)
-        
         return results[:top_k]
     
     def _evict_oldest(self):
@@ -370,6 +519,8 @@ class EmbeddingVectorStore:
     def clear(self):
         """Clear all vectors"""
         self._vectors.clear()
+        self._matrix = None
+        self._ann = None
         self._metadata.clear()
         self._keys_order.clear()
         self.cache_manager.invalidate("embedding_index", CacheLevel.SEMANTIC)
@@ -380,7 +531,8 @@ class EmbeddingVectorStore:
             "total_vectors": len(self._vectors),
             "dimension": self.dimension,
             "max_vectors": self.max_vectors,
-            "memory_mb": len(self._vectors) * self.dimension * 4 / (1024 * 1024)  # float32
+            "quantization": self.quantization,
+            "memory_mb": sum(v.nbytes for v in self._vectors.values()) / (1024 * 1024)
         }
 
 
@@ -428,7 +580,8 @@ class SemanticCache:
         self.vector_store = EmbeddingVectorStore(
             cache_manager=self.cache_manager,
             dimension=self.embedder.dimension,
-            max_vectors=max_entries
+            max_vectors=max_entries,
+            quantization=self.embedder.config.quantization
         )
         
         # Stats
@@ -476,17 +629,8 @@ class SemanticCache:
             
             # Generate embedding
             embedding = self.embedder.embed_single(normalized)
-            
-            # Create entry
-            entry = CachedSQLEntry(
-                question=question,
-                normalized_question=normalized,
-                sql=sql,
-                explanation=explanation,
-                query_type=query_type,
-                tables_used=tables_used or [],
-                embedding=embedding.tolist(),
-                schema_version=schema_version
+            entry = self._build_entry(
+                question, normalized, sql, explanation, query_type, tables_used, embedding, schema_version
             )
             
             # Store in cache
@@ -498,15 +642,7 @@ class SemanticCache:
             )
             
             if success:
-                # Add to vector store
-                self.vector_store.add(
-                    key=cache_key,
-                    embedding=embedding,
-                    query_type=query_type,
-                    tables=tables_used,
-                    schema_version=schema_version
-                )
-                logger.debug(f"Cached SQL with embedding: {cache_key[:8]}...")
+                self._index_entry(cache_key, embedding, query_type, tables_used, schema_version)
             
             return success
             
@@ -514,6 +650,82 @@ class SemanticCache:
             logger.error(f"Failed to cache SQL: {e}")
             return False
     
+    async def acache_sql(
+        self,
+        question: str,
+        sql: str,
+        explanation: str = "",
+        query_type: str = "unknown",
+        tables_used: Optional[List[str]] = None,
+        schema_version: Optional[str] = None
+    ) -> bool:
+        """Async version of cache_sql() (embedding in a worker thread, async Redis write)"""
+        try:
+            normalized = self.normalizer.normalize(question)
+            cache_key = self._compute_hash(normalized)
+            
+            embedding = await asyncio.to_thread(self.embedder.embed_single, normalized)
+            entry = self._build_entry(
+                question, normalized, sql, explanation, query_type, tables_used, embedding, schema_version
+            )
+            
+            success = await self.cache_manager.aset(
+                f"sql:{cache_key}",
+                entry.to_dict(),
+                CacheLevel.SQL,
+                schema_version=schema_version
+            )
+            
+            if success:
+                self._index_entry(cache_key, embedding, query_type, tables_used, schema_version)
+            
+            return success
+        
+        except Exception as e:
+            logger.error(f"Failed to cache SQL: {e}")
+            return False
+    
+    @staticmethod
+    def _build_entry(
+        question: str,
+        normalized: str,
+        sql: str,
+        explanation: str,
+        query_type: str,
+        tables_used: Optional[List[str]],
+        embedding: np.ndarray,
+        schema_version: Optional[str]
+    ) -> CachedSQLEntry:
+        """Create the cache entry stored for a question"""
+        return CachedSQLEntry(
+            question=question,
+            normalized_question=normalized,
+            sql=sql,
+            explanation=explanation,
+            query_type=query_type,
+            tables_used=tables_used or [],
+            embedding=embedding.tolist(),
+            schema_version=schema_version
+        )
+    
+    def _index_entry(
+        self,
+        cache_key: str,
+        embedding: np.ndarray,
+        query_type: str,
+        tables_used: Optional[List[str]],
+        schema_version: Optional[str]
+    ):
+        """Add a stored entry's embedding to the vector store"""
+        self.vector_store.add(
+            key=cache_key,
+            embedding=embedding,
+            query_type=query_type,
+            tables=tables_used,
+            schema_version=schema_version
+        )
+        logger.debug(f"Cached SQL with embedding: {cache_key[:8]}...")
+    
     def get_sql(
         self,
         question: str,
@@ -538,18 +750,7 @@ class SemanticCache:
             # Try exact match first
             cached_data = self.cache_manager.get(f"sql:{cache_key}", CacheLevel.SQL)
             if cached_data:
-                entry = CachedSQLEntry.from_dict(cached_data)
-                
-                # Validate schema version
-                if schema_version and entry.schema_version:
-                    if entry.schema_version != schema_version:
-                        logger.debug("Cache miss: schema version mismatch")
-                        self._misses += 1
-                        return None
-                
-                self._exact_hits += 1
-                logger.debug(f"Exact cache hit: {cache_key[:8]}...")
-                return (entry, 1.0)
+                return self._exact_hit(cached_data, cache_key, schema_version)
             
             if not allow_semantic:
                 self._misses += 1
@@ -557,52 +758,196 @@ class SemanticCache:
             
             # Semantic search using embeddings
             query_embedding = self.embedder.embed_single(normalized)
+            similar_entries = self._search_similar(question, query_embedding, schema_version)
             
-            # Extract query intent for matching
-            query_intent = None
-            if self.enable_intent_matching:
-                intent = self.normalizer.extract_query_intent(question)
-                query_intent = intent.get("aggregation", "none")
-                if query_intent == "none":
-                    query_intent = intent.get("operation", "select")
-            
-            # Search vector store
-            similar_entries = self.vector_store.search(
-                query_embedding=query_embedding,
-                top_k=5,
-                query_type=query_intent,
-                schema_version=schema_version,
-                min_similarity=self.similarity_threshold
+            # Find best match (fetch all candidates in one round trip)
+            candidates = self.cache_manager.batch_get(
+                [(f"sql:{matched_key}", CacheLevel.SQL) for matched_key, _ in similar_entries]
             )
+            return self._best_candidate(similar_entries, candidates, schema_version)
             
-            # Find best match
-            for matched_key, similarity in similar_entries:
-                cached_data = self.cache_manager.get(f"sql:{matched_key}", CacheLevel.SQL)
-                if not cached_data:
-                    continue
-                
-                entry = CachedSQLEntry.from_dict(cached_data)
-                
-                # Double-check schema version
-                if schema_version and entry.schema_version:
-                    if entry.schema_version != schema_version:
-                        continue
-                
-                self._semantic_hits += 1
-                logger.info(
-                    f"Semantic cache hit: similarity={similarity:.3f}, "
-                    f"query_type={entry.query_type}"
-                )
-                return (entry, similarity)
-            
+        except Exception as e:
+            logger.error(f"Error in get_sql: {e}")
             self._misses += 1
             return None
+    
+    async def aget_sql(
+        self,
+        question: str,
+        schema_version: Optional[str] = None,
+        allow_semantic: bool = True
+    ) -> Optional[Tuple[CachedSQLEntry, float]]:
+        """
+        Async version of get_sql()
+        
+        Redis reads go through the cache manager's async client and the
+        (possibly remote) embedding call runs in a worker thread, so the event
+        loop is never blocked.
+        """
+        try:
+            normalized = self.normalizer.normalize(question)
+            cache_key = self._compute_hash(normalized)
+            
+            cached_data = await self.cache_manager.aget(f"sql:{cache_key}", CacheLevel.SQL)
+            if cached_data:
+                return self._exact_hit(cached_data, cache_key, schema_version)
+            
+            if not allow_semantic:
+                self._misses += 1
+                return None
+            
+            query_embedding = await asyncio.to_thread(self.embedder.embed_single, normalized)
+            similar_entries = self._search_similar(question, query_embedding, schema_version)
+            
+            candidates = await self.cache_manager.abatch_get(
+                [(f"sql:{matched_key}", CacheLevel.SQL) for matched_key, _ in similar_entries]
+            )
+            return self._best_candidate(similar_entries, candidates, schema_version)
             
         except Exception as e:
-            logger.error(f"Error in get_sql: {e}")
+            logger.error(f"Error in aget_sql: {e}")
             self._misses += 1
             return None
     
+    def _exact_hit(
+        self,
+        cached_data: Dict[str, Any],
+        cache_key: str,
+        schema_version: Optional[str]
+    ) -> Optional[Tuple[CachedSQLEntry, float]]:
+        """Turn an exact-key cache read into a hit, unless its schema version is stale"""
+        entry = CachedSQLEntry.from_dict(cached_data)
+        
+        # Validate schema version
+        if schema_version and entry.schema_version:
+            if entry.schema_version != schema_version:
+                logger.debug("Cache miss: schema version mismatch")
+                self._misses += 1
+                return None
+        
+        self._exact_hits += 1
+        logger.debug(f"Exact cache hit: {cache_key[:8]}...")
+        return (entry, 1.0)
+    
+    def _search_similar(
+        self,
+        question: str,
+        query_embedding: np.ndarray,
+        schema_version: Optional[str]
+    ) -> List[Tuple[str, float]]:
+        """Vector store candidates for a question, boosted by matching intent"""
+        # Extract query intent for matching
+        query_intent = None
+        if self.enable_intent_matching:
+            intent = self.normalizer.extract_query_intent(question)
+            query_intent = intent.get("aggregation", "none")
+            if query_intent == "none":
+                query_intent = intent.get("operation", "select")
+        
+        # Search vector store
+        return self.vector_store.search(
+            query_embedding=query_embedding,
+            top_k=5,
+            query_type=query_intent,
+            schema_version=schema_version,
+            min_similarity=self.similarity_threshold
+        )
+    
+    def _best_candidate(
+        self,
+        similar_entries: List[Tuple[str, float]],
+        candidates: List[Optional[Dict[str, Any]]],
+        schema_version: Optional[str]
+    ) -> Optional[Tuple[CachedSQLEntry, float]]:
+        """First still-cached candidate (best first) with a matching schema version"""
+        for (matched_key, similarity), cached_data in zip(similar_entries, candidates):
+            if not cached_data:
+                continue
+            
+            entry = CachedSQLEntry.from_dict(cached_data)
+            
+            # Double-check schema version
+            if schema_version and entry.schema_version:
+                if entry.schema_version != schema_version:
+                    continue
+            
+            self._semantic_hits += 1
+            logger.info(
+                f"Semantic cache hit: similarity={similarity:.3f}, "
+                f"query_type={entry.query_type}"
+            )
+            return (entry, similarity)
+        
+        self._misses += 1
+        return None
+    
+    def invalidate_tables(self, tables: List[str]) -> int:
+        """
+        Invalidate cached SQL that references any of the given tables
+        
+        Tables are read from the cached SQL itself (plus the model-reported
+        tables_used), so a table the model left out still invalidates the
+        entry. Entries whose tables can't be determined are invalidated too.
+        
+        Args:
+            tables: Table names (case-insensitive, schema prefix ignored)
+        
+        Returns:
+            Number of entries invalidated
+        """
+        targets = {_bare_table_name(t) for t in tables}
+        keys = list(self.vector_store.keys())
+        entries = self.cache_manager.batch_get([(f"sql:{key}", CacheLevel.SQL) for key in keys]) if keys else []
+        removed = 0
+        for key, data in zip(keys, entries):
+            used = _tables_read(data) if data else set()
+            if not used or used & targets:
+                self.vector_store.remove(key)
+                self.cache_manager.invalidate(f"sql:{key}", CacheLevel.SQL)
+                removed += 1
+        
+        if removed:
+            self.vector_store._save_to_redis()
+        logger.info(f"Invalidated {removed} cached SQL entries for tables: {sorted(targets)}")
+        return removed
+    
+    def restamp_schema_version(self, old_version: str, new_version: str) -> int:
+        """
+        Carry cached SQL over to a new schema version
+        
+        Call after invalidate_tables() has dropped entries touching changed
+        tables; the remaining entries stay valid under the new schema.
+        
+        Args:
+            old_version: Schema version the entries were cached under
+            new_version: Current schema version
+        
+        Returns:
+            Number of entries carried over
+        """
+        keys = [
+            key for key in self.vector_store.keys()
+            if self.vector_store.get_metadata(key).get("schema_version") == old_version
+        ]
+        if not keys:
+            return 0
+        
+        entries = self.cache_manager.batch_get([(f"sql:{key}", CacheLevel.SQL) for key in keys])
+        items = []
+        for key, data in zip(keys, entries):
+            if not data:
+                self.vector_store.remove(key)
+                continue
+            data["schema_version"] = new_version
+            items.append((f"sql:{key}", data, CacheLevel.SQL))
+            self.vector_store.set_schema_version(key, new_version)
+        
+        carried = self.cache_manager.batch_set(items, schema_version=new_version) if items else 0
+        # Persist the restamped index (and the removals above), or a restart
+        # reloads the old stamps and similarity search skips these entries
+        self.vector_store._save_to_redis()
+        return carried
+    
     def invalidate_all(self):
         """Invalidate all cached SQL and embeddings"""
         self.cache_manager.invalidate_level(CacheLevel.SQL)
@@ -630,6 +975,17 @@ class SemanticCache:
         }
 
 
+def _bare_table_name(name: str) -> str:
+    """Lowercase table name without schema prefix or quotes"""
+    return name.rsplit(".", 1)[-1].strip('"`[]').lower()
+
+
+def _tables_read(data: Dict[str, Any]) -> Set[str]:
+    """Bare names of the tables a cached entry's SQL reads, plus its reported tables_used"""
+    tables = extract_table_names(data.get("sql") or "") + list(data.get("tables_used") or [])
+    return {_bare_table_name(t) for t in tables}
+
+
 # Backwards compatibility aliases
 SemanticSQLCache = SemanticCache
 EmbeddingSemanticCache = SemanticCache
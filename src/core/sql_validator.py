@@ -11,6 +11,15 @@ from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+# Clause keywords SQLPostProcessor pads with single spaces, matched in one pass
+# (multi-word keywords first so "LEFT JOIN" wins over "JOIN")
+_CLAUSE_KEYWORD_RE = re.compile(
+    r'\s*\b(LEFT\s+JOIN|RIGHT\s+JOIN|INNER\s+JOIN|GROUP\s+BY|ORDER\s+BY'
+    r'|SELECT|FROM|WHERE|AND|OR|JOIN|ON|HAVING|LIMIT)\b\s*',
+    re.IGNORECASE
+)
+_MULTI_SPACE_RE = re.compile(r' +')
+
 
 class ValidationErrorType(Enum):
     """Types of SQL validation errors"""
@@ -434,19 +443,13 @@ class SQLPostProcessor:
     def _clean_whitespace(self, sql: str) -> str:
         """Clean up whitespace while preserving structure"""
         # Replace multiple spaces with single space
-        sql = re.sub(r' +', ' ', sql)
-        
-        # Ensure proper spacing around keywords
-        keywords = ['SELECT', 'FROM', 'WHERE', 'AND', 'OR', 'JOIN', 
-                    'LEFT JOIN', 'RIGHT JOIN', 'INNER JOIN', 'ON',
-                    'GROUP BY', 'ORDER BY', 'HAVING', 'LIMIT']
+        sql = _MULTI_SPACE_RE.sub(' ', sql)
         
-        for kw in keywords:
-            pattern = rf'\s*\b{kw}\b\s*'
-            sql = re.sub(pattern, f' {kw} ', sql, flags=re.IGNORECASE)
+        # Ensure proper spacing around keywords (uppercased, one space inside)
+        sql = _CLAUSE_KEYWORD_RE.sub(lambda m: f" {' '.join(m.group(1).upper().split())} ", sql)
         
         # Clean up extra spaces
-        sql = re.sub(r' +', ' ', sql)
+        sql = _MULTI_SPACE_RE.sub(' ', sql)
         sql = sql.strip()
         
         return sql
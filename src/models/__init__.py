@@ -1,5 +1,5 @@
 """Data models for NL2SQL"""
 
-from src.models.sql_query import SQLQuery, DatabaseConfig, QueryResult, ErrorResponse
+from src.models.sql_query import SQLQuery, SQLQueryBatch, DatabaseConfig, QueryResult, ErrorResponse
 
-__all__ = ["SQLQuery", "DatabaseConfig", "QueryResult", "ErrorResponse"]
+__all__ = ["SQLQuery", "SQLQueryBatch", "DatabaseConfig", "QueryResult", "ErrorResponse"]
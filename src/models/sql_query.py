@@ -79,6 +79,14 @@ class SQLQuery(BaseModel):
         }
 
 
+class SQLQueryBatch(BaseModel):
+    """Answers to several numbered questions asked in one LLM call"""
+    queries: List[SQLQuery] = Field(
+        ...,
+        description="One SQLQuery per question, in question order"
+    )
+
+
 class QueryResult(BaseModel):
     """Model for query execution results"""
     success: bool = Field(..., description="Whether the query executed successfully")
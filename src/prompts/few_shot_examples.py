@@ -1,6 +1,7 @@
 """Few-shot examples for NL2SQL conversion"""
 
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple, Callable
 
 
 def get_few_shot_examples(database_type: str = "postgresql") -> List[Dict[str, Any]]:
@@ -234,6 +235,35 @@ def format_examples_for_prompt(examples: List[Dict[str, Any]]) -> str:
     return "\n".join(formatted)
 
 
+def fit_examples_to_budget(
+    examples: List[Dict[str, Any]],
+    max_tokens: int,
+    token_len: Callable[[Dict[str, Any]], int]
+) -> List[Dict[str, Any]]:
+    """
+    Keep the examples that fit a prompt token budget
+    
+    Examples are taken greedily in the given (relevance) order; one that does
+    not fit is skipped so a smaller, less relevant one can still be used.
+    
+    Args:
+        examples: Examples ranked by relevance
+        max_tokens: Token budget for the examples
+        token_len: Function mapping an example to its formatted token count
+    
+    Returns:
+        Examples that fit, in their given order
+    """
+    selected = []
+    remaining = max_tokens
+    for example in examples:
+        tokens = token_len(example)
+        if tokens <= remaining:
+            selected.append(example)
+            remaining -= tokens
+    return selected
+
+
 def get_examples_by_complexity(complexity: str = "simple") -> List[Dict[str, Any]]:
     """
     Get examples filtered by complexity level
@@ -261,6 +291,27 @@ def get_examples_by_complexity(complexity: str = "simple") -> List[Dict[str, Any
     return all_examples
 
 
+@lru_cache(maxsize=1)
+def _example_index() -> Tuple[Tuple[Dict[str, Any], frozenset, bool, bool, bool, bool], ...]:
+    """
+    Default examples with their word sets and SQL features, computed once
+    
+    Returns:
+        (example, question words, has COUNT, has AVG, has JOIN, has ORDER BY) tuples
+    """
+    return tuple(
+        (
+            example,
+            frozenset(example["question"].lower().split()),
+            "COUNT" in example["query"],
+            "AVG" in example["query"],
+            "JOIN" in example["query"],
+            "ORDER BY" in example["query"],
+        )
+        for example in get_few_shot_examples()
+    )
+
+
 def get_relevant_examples(question: str, max_examples: int = 3) -> List[Dict[str, Any]]:
     """
     Get most relevant examples based on the question
@@ -272,29 +323,32 @@ def get_relevant_examples(question: str, max_examples: int = 3) -> List[Dict[str
     Returns:
         List of relevant examples
     """
-    all_examples = get_few_shot_examples()
     question_lower = question.lower()
+    question_words = set(question_lower.split())
+    
+    # Question-side keyword checks don't depend on the example
+    wants_count = "count" in question_lower
+    says_average = "average" in question_lower
+    says_avg = "avg" in question_lower
+    says_join = "join" in question_lower
+    says_with = "with" in question_lower
+    says_top = "top" in question_lower
+    says_most = "most" in question_lower
     
     # Simple keyword matching for relevance
     scored_examples = []
-    for example in all_examples:
-        score = 0
-        example_lower = example["question"].lower()
-        
+    for example, example_words, has_count, has_avg, has_join, has_order_by in _example_index():
         # Check for common words
-        question_words = set(question_lower.split())
-        example_words = set(example_lower.split())
-        common_words = question_words & example_words
-        score += len(common_words)
+        score = len(question_words & example_words)
         
         # Check for specific keywords
-        if "count" in question_lower and "COUNT" in example["query"]:
+        if wants_count and has_count:
             score += 5
-        if "average" in question_lower or "avg" in question_lower and "AVG" in example["query"]:
+        if says_average or says_avg and has_avg:
             score += 5
-        if "join" in question_lower or "with" in question_lower and "JOIN" in example["query"]:
+        if says_join or says_with and has_join:
             score += 3
-        if "top" in question_lower or "most" in question_lower and "ORDER BY" in example["query"]:
+        if says_top or says_most and has_order_by:
             score += 3
         
         scored_examples.append((score, example))
@@ -1,5 +1,7 @@
 """System prompts for LLM-based NL2SQL conversion with advanced optimizations"""
 
+from typing import List, Union
+
 
 def get_system_prompt(schema_info: str, database_type: str = "postgresql") -> str:
     """
@@ -251,10 +253,30 @@ def get_query_type_prompt(query_type: str) -> str:
     return prompts.get(query_type, "")
 
 
+# Filled with str.format_map; values are substituted verbatim (braces in them are safe)
+_SELF_CORRECTION_TEMPLATE = """The previous SQL query had errors:
+
+FAILED QUERY:
+{query}
+
+ERROR:
+{error}
+
+AVAILABLE TABLES:
+{tables}
+
+Please generate a CORRECTED query that:
+1. Fixes the error above
+2. Uses ONLY tables from the available list
+3. Still answers the original question
+
+Generate the fixed SQL query."""
+
+
 def get_self_correction_prompt(
     original_query: str, 
     error_message: str,
-    available_tables: list
+    available_tables: Union[str, List[str]]
 ) -> str:
     """
     Generate prompt for self-correcting a failed query
@@ -262,27 +284,16 @@ def get_self_correction_prompt(
     Args:
         original_query: The query that failed
         error_message: Error description
-        available_tables: List of valid table names
+        available_tables: Valid table names, or the same already joined with ", "
         
     Returns:
         Self-correction prompt
     """
-    tables_str = ", ".join(available_tables)
+    if not isinstance(available_tables, str):
+        available_tables = ", ".join(available_tables)
     
-    return f"""The previous SQL query had errors:
-
-FAILED QUERY:
-{original_query}
-
-ERROR:
-{error_message}
-
-AVAILABLE TABLES:
-{tables_str}
-
-Please generate a CORRECTED query that:
-1. Fixes the error above
-2. Uses ONLY tables from the available list
-3. Still answers the original question
-
-Generate the fixed SQL query."""
+    return _SELF_CORRECTION_TEMPLATE.format_map({
+        "query": original_query,
+        "error": error_message,
+        "tables": available_tables,
+    })
@@ -1,20 +1,32 @@
 """SQL formatting and output formatting utilities"""
 
 import sqlparse
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
-from rich.console import Console
-from rich.table import Table
-from rich.syntax import Syntax
-from rich.panel import Panel
 import json
 
-console = Console()
+# Rich is only needed by the print_* helpers and takes ~90ms to import, so it is
+# loaded on first use rather than by every importer of format_sql
+_console = None
 
 
+def _get_console():
+    """Get or create the shared Rich console"""
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+
+@lru_cache(maxsize=512)
 def format_sql(query: str, reindent: bool = True, keyword_case: str = 'upper') -> str:
     """
     Format SQL query for better readability
     
+    Memoized: sqlparse re-tokenizes on every call, and the same SQL is often
+    formatted again (template fills, retries, repeated questions).
+    
     Args:
         query: SQL query to format
         reindent: Whether to reindent the query
@@ -95,10 +107,13 @@ def print_sql(query: str, title: str = "Generated SQL"):
         query: SQL query to print
         title: Title for the panel
     """
+    from rich.syntax import Syntax
+    from rich.panel import Panel
+    
     formatted = format_sql(query)
     syntax = Syntax(formatted, "sql", theme="monokai", line_numbers=True)
     panel = Panel(syntax, title=title, border_style="blue")
-    console.print(panel)
+    _get_console().print(panel)
 
 
 def print_results_table(
@@ -114,6 +129,9 @@ def print_results_table(
         title: Title for the table
         max_rows: Maximum rows to display
     """
+    from rich.table import Table
+    
+    console = _get_console()
     if not results:
         console.print(f"[yellow]{title}: No results found[/yellow]")
         return
@@ -150,13 +168,15 @@ def print_schema_info(schema_text: str):
     Args:
         schema_text: Formatted schema text
     """
+    from rich.panel import Panel
+    
     panel = Panel(
         schema_text,
         title="Database Schema",
         border_style="green",
         padding=(1, 2)
     )
-    console.print(panel)
+    _get_console().print(panel)
 
 
 def print_error(error_message: str, title: str = "Error"):
@@ -167,12 +187,14 @@ def print_error(error_message: str, title: str = "Error"):
         error_message: Error message to print
         title: Title for the error panel
     """
+    from rich.panel import Panel
+    
     panel = Panel(
         f"[red]{error_message}[/red]",
         title=title,
         border_style="red"
     )
-    console.print(panel)
+    _get_console().print(panel)
 
 
 def print_warning(warning_message: str, title: str = "Warning"):
@@ -183,12 +205,14 @@ def print_warning(warning_message: str, title: str = "Warning"):
         warning_message: Warning message to print
         title: Title for the warning panel
     """
+    from rich.panel import Panel
+    
     panel = Panel(
         f"[yellow]{warning_message}[/yellow]",
         title=title,
         border_style="yellow"
     )
-    console.print(panel)
+    _get_console().print(panel)
 
 
 def print_success(success_message: str, title: str = "Success"):
@@ -199,12 +223,14 @@ def print_success(success_message: str, title: str = "Success"):
         success_message: Success message to print
         title: Title for the success panel
     """
+    from rich.panel import Panel
+    
     panel = Panel(
         f"[green]{success_message}[/green]",
         title=title,
         border_style="green"
     )
-    console.print(panel)
+    _get_console().print(panel)
 
 
 def format_json(data: Dict[str, Any], indent: int = 2) -> str:
@@ -2,7 +2,7 @@
 
 import re
 import sqlparse
-from typing import Tuple, List
+from typing import Tuple, List, Set, Union, AbstractSet
 import logging
 
 logger = logging.getLogger(__name__)
@@ -156,10 +156,89 @@ def add_query_limit(query: str, default_limit: int = 100) -> str:
     return f"{query.rstrip(';')} LIMIT {default_limit}"
 
 
+def _is_query(tokens: List[sqlparse.sql.Token]) -> bool:
+    """Whether a token list is a statement or subquery (it holds a SELECT or WITH)"""
+    return any(
+        token.ttype is sqlparse.tokens.DML or token.ttype is sqlparse.tokens.CTE
+        for token in tokens
+    )
+
+
+def _add_table_source(
+    item: sqlparse.sql.Token,
+    tables: List[str],
+    cte_names: Set[str]
+):
+    """Record the table read by a FROM/JOIN item, descending into derived tables"""
+    first = item.token_first(skip_ws=True, skip_cm=True) if item.is_group else item
+    if isinstance(first, sqlparse.sql.Parenthesis):
+        # (SELECT ...) AS x: the alias is not a table, the subquery may read some
+        _collect_table_names(first.tokens, tables, cte_names)
+        return
+    if isinstance(item, sqlparse.sql.Function) or isinstance(first, sqlparse.sql.Function):
+        # Table-valued function such as generate_series(...)
+        return
+    table_name = item.get_real_name() if isinstance(item, sqlparse.sql.Identifier) else None
+    if table_name and table_name.lower() not in cte_names:
+        tables.append(table_name)
+
+
+def _collect_table_names(
+    tokens: List[sqlparse.sql.Token],
+    tables: List[str],
+    cte_names: Set[str]
+):
+    """Walk a token list, collecting FROM/JOIN tables of it and its subqueries"""
+    # FROM outside a query, e.g. EXTRACT(YEAR FROM col), doesn't name a table
+    is_query = _is_query(tokens)
+    from_seen = False
+    cte_seen = False
+    for token in tokens:
+        if token.is_whitespace or token.ttype in sqlparse.tokens.Comment:
+            continue
+        
+        if cte_seen:
+            if token.ttype is sqlparse.tokens.Keyword and token.value.upper() == 'RECURSIVE':
+                continue
+            if isinstance(token, sqlparse.sql.IdentifierList):
+                definitions = list(token.get_identifiers())
+            else:
+                definitions = [token]
+            for definition in definitions:
+                if isinstance(definition, sqlparse.sql.Identifier):
+                    # Registered before its body, which may refer to itself
+                    cte_names.add(definition.get_real_name().lower())
+                    _collect_table_names(definition.tokens, tables, cte_names)
+            cte_seen = False
+            continue
+        
+        if from_seen:
+            from_seen = False
+            if isinstance(token, sqlparse.sql.IdentifierList):
+                for identifier in token.get_identifiers():
+                    _add_table_source(identifier, tables, cte_names)
+                continue
+            if isinstance(token, sqlparse.sql.Identifier):
+                _add_table_source(token, tables, cte_names)
+                continue
+        
+        if token.ttype is sqlparse.tokens.CTE:
+            cte_seen = True
+        elif is_query and token.ttype is sqlparse.tokens.Keyword and (
+            token.value.upper() == 'FROM' or token.value.upper().endswith('JOIN')
+        ):
+            from_seen = True
+        elif token.is_group:
+            _collect_table_names(token.tokens, tables, cte_names)
+
+
 def extract_table_names(query: str) -> List[str]:
     """
     Extract table names from SQL query
     
+    CTE names, derived-table aliases and table-valued functions are not
+    tables and are skipped; tables read inside CTEs and subqueries are included.
+    
     Args:
         query: SQL query
         
@@ -168,40 +247,31 @@ def extract_table_names(query: str) -> List[str]:
     """
     tables = []
     
+    # Tables are only read after FROM/JOIN; skip the (slow) parse without them
+    query_upper = query.upper()
+    if "FROM" not in query_upper and "JOIN" not in query_upper:
+        return tables
+    
     try:
         parsed = sqlparse.parse(query)[0]
-        
-        # Look for FROM and JOIN clauses
-        from_seen = False
-        for token in parsed.tokens:
-            if from_seen:
-                if isinstance(token, sqlparse.sql.IdentifierList):
-                    for identifier in token.get_identifiers():
-                        table_name = identifier.get_real_name()
-                        if table_name:
-                            tables.append(table_name)
-                elif isinstance(token, sqlparse.sql.Identifier):
-                    table_name = token.get_real_name()
-                    if table_name:
-                        tables.append(table_name)
-                from_seen = False
-            
-            if token.ttype is sqlparse.tokens.Keyword and token.value.upper() in ('FROM', 'JOIN'):
-                from_seen = True
-    
+        _collect_table_names(parsed.tokens, tables, set())
     except Exception as e:
         logger.warning(f"Failed to extract table names: {e}")
     
     return list(set(tables))  # Remove duplicates
 
 
-def validate_query_against_schema(query: str, available_tables: List[str]) -> Tuple[bool, str]:
+def validate_query_against_schema(
+    query: str,
+    available_tables: Union[List[str], AbstractSet[str]]
+) -> Tuple[bool, str]:
     """
     Validate that query only references tables that exist in schema
     
     Args:
         query: SQL query
-        available_tables: List of available table names
+        available_tables: List of available table names, or a set of lowercased
+            names (used as-is, so repeated checks don't rebuild it)
         
     Returns:
         Tuple of (is_valid, error_message)
@@ -212,7 +282,10 @@ def validate_query_against_schema(query: str, available_tables: List[str]) -> Tu
         return False, "Could not extract any table names from query"
     
     # Check if all tables exist
-    available_tables_lower = [t.lower() for t in available_tables]
+    if isinstance(available_tables, AbstractSet):
+        available_tables_lower = available_tables
+    else:
+        available_tables_lower = {t.lower() for t in available_tables}
     invalid_tables = []
     
     for table in query_tables:
@@ -2,9 +2,16 @@
 
 import pytest
 import os
-from unittest.mock import Mock, patch
+import json
+import asyncio
+import time
+from unittest.mock import AsyncMock, Mock, patch
 from src.core.converter import NL2SQLConverter
-from src.models.sql_query import DatabaseType, SQLQuery
+from src.core.async_converter import AsyncNL2SQLConverter
+from src.core.sql_validator import SQLValidator, SQLPostProcessor
+from src.core.async_llm_provider import RateLimiter
+from src.core.llm_provider import LLMProvider
+from src.models.sql_query import DatabaseType, SQLQuery, SQLQueryBatch
 
 
 class TestNL2SQLConverter:
@@ -40,6 +47,274 @@ class TestNL2SQLConverter:
                     assert converter.database_type == DatabaseType.POSTGRESQL
 
 
+class TestSchemaQueryDetection:
+    """Test schema/metadata question detection"""
+    
+    @pytest.fixture
+    def converter(self):
+        """Bare converter instance - detection needs no DB or LLM"""
+        return NL2SQLConverter.__new__(NL2SQLConverter)
+    
+    @pytest.mark.parametrize("question", [
+        "Show tables",
+        "What tables are in the database?",
+        "Database có những bảng nào?",
+        "DESCRIBE orders",
+        "Cho tôi xem cấu trúc database",
+        "Mô tả cơ sở dữ liệu",
+        "Which columns are in the users table?",
+        "Database information please",
+    ])
+    def test_detects_schema_questions(self, converter, question):
+        assert converter._is_schema_query(question) is True
+    
+    @pytest.mark.parametrize("question", [
+        "How many customers placed orders last month?",
+        "Top 10 sản phẩm bán chạy nhất",
+        "Doanh thu tháng này là bao nhiêu?",
+    ])
+    def test_ignores_data_questions(self, converter, question):
+        assert converter._is_schema_query(question) is False
+
+
+class TestBatchGenerate:
+    """Test concurrent batch generation"""
+    
+    @pytest.fixture
+    def converter(self):
+        """Converter with prompt preparation and finalization stubbed out"""
+        converter = NL2SQLConverter.__new__(NL2SQLConverter)
+        converter.llm_config = Mock()
+        converter.max_concurrent_requests = 2
+        converter._rate_limiter = RateLimiter(requests_per_minute=100, tokens_per_minute=10000)
+        
+        def prepare(question, conversation_history=None, use_cache=True):
+            if question == "Show tables":
+                return SQLQuery(query="SELECT 1", explanation="schema", confidence=1.0)
+            return [{"role": "user", "content": question}], "v1", None
+        
+        converter._prepare_generation = prepare
+        converter._finalize_response = lambda question, response, *args, **kwargs: response
+        return converter
+    
+    def test_results_keep_question_order(self, converter):
+        async def create_completion(response_model, messages, temperature=0.1, max_retries=2):
+            question = messages[-1]["content"]
+            if question == "broken":
+                raise RuntimeError("LLM error")
+            return SQLQuery(query=f"SELECT '{question}'", explanation="ok", confidence=0.9)
+        
+        with patch("src.core.converter.AsyncLLMClient") as client_cls:
+            client_cls.return_value.create_completion = create_completion
+            results = converter.batch_generate(["first", "Show tables", "broken", "last"])
+        
+        assert [r.query for r in results] == [
+            "SELECT 'first'",
+            "SELECT 1",
+            "-- Error generating query",
+            "SELECT 'last'",
+        ]
+        assert results[2].confidence == 0.0
+    
+    def test_repeated_questions_call_llm_once(self, converter):
+        calls = []
+        
+        async def create_completion(response_model, messages, temperature=0.1, max_retries=2):
+            calls.append(messages[-1]["content"])
+            return SQLQuery(query=f"SELECT '{messages[-1]['content']}'", explanation="ok", confidence=0.9)
+        
+        with patch("src.core.converter.AsyncLLMClient") as client_cls:
+            client_cls.return_value.create_completion = create_completion
+            results = converter.batch_generate(["first", "last", "first", " first  "])
+        
+        assert sorted(calls) == ["first", "last"]
+        assert [r.query for r in results] == ["SELECT 'first'", "SELECT 'last'", "SELECT 'first'", "SELECT 'first'"]
+        assert results[2] is not results[0]
+    
+    def test_iter_yields_in_completion_order(self, converter):
+        delays = {"slow": 0.05, "fast": 0.0, "stuck": 10}
+        
+        async def create_completion(response_model, messages, temperature=0.1, max_retries=2):
+            question = messages[-1]["content"]
+            await asyncio.sleep(delays[question])
+            return SQLQuery(query=f"SELECT '{question}'", explanation="ok", confidence=0.9)
+        
+        async def collect():
+            return [
+                (i, result.query)
+                async for i, result in converter.batch_generate_iter(
+                    ["slow", "Show tables", "fast", "stuck"], timeout=0.2
+                )
+            ]
+        
+        with patch("src.core.converter.AsyncLLMClient") as client_cls:
+            client_cls.return_value.create_completion = create_completion
+            results = asyncio.run(collect())
+        
+        assert results == [
+            (1, "SELECT 1"),
+            (2, "SELECT 'fast'"),
+            (0, "SELECT 'slow'"),
+            (3, "-- Error generating query"),
+        ]
+    
+    def test_packs_questions_and_falls_back_per_question(self, converter):
+        converter.model = "gpt-4o-mini"
+        converter._prepare_generation = lambda question, **kwargs: (
+            [{"role": "system", "content": "schema"}, {"role": "user", "content": question}], "v1", None
+        )
+        calls = []
+        
+        async def create_completion(response_model, messages, temperature=0.1, max_retries=2):
+            calls.append(response_model)
+            content = messages[-1]["content"]
+            if response_model is SQLQueryBatch:
+                if "broken" in content:
+                    raise RuntimeError("unparseable")
+                questions = [line for line in content.splitlines() if line in ("first", "second", "third")]
+                return SQLQueryBatch(queries=[
+                    SQLQuery(query=f"SELECT '{q}'", explanation="ok", confidence=0.9) for q in questions
+                ])
+            return SQLQuery(query=f"SELECT '{content}'", explanation="ok", confidence=0.9)
+        
+        with patch("src.core.converter.AsyncLLMClient") as client_cls:
+            client_cls.return_value.create_completion = create_completion
+            results = converter.batch_generate(
+                ["first", "second", "third", "broken", "last"], questions_per_call=2
+            )
+        
+        assert [r.query for r in results] == [
+            "SELECT 'first'", "SELECT 'second'", "SELECT 'third'", "SELECT 'broken'", "SELECT 'last'"
+        ]
+        assert calls.count(SQLQueryBatch) == 2
+        assert calls.count(SQLQuery) == 3
+    
+    def test_running_loop_uses_the_same_packed_request_path(self, converter):
+        converter.model = "gpt-4o-mini"
+        converter._prepare_generation = lambda question, **kwargs: (
+            [{"role": "system", "content": "schema"}, {"role": "user", "content": question}], "v1", None
+        )
+        calls = []
+        
+        async def create_completion(response_model, messages, temperature=0.1, max_retries=2):
+            calls.append(response_model)
+            questions = messages[-1]["content"].splitlines()
+            return SQLQueryBatch(queries=[
+                SQLQuery(query=f"SELECT '{q}'", explanation="ok", confidence=0.9)
+                for q in questions if q in ("first", "second")
+            ])
+        
+        async def from_handler():
+            return converter.batch_generate(["first", "second"], questions_per_call=2)
+        
+        with patch("src.core.converter.AsyncLLMClient") as client_cls:
+            client_cls.return_value.create_completion = create_completion
+            results = asyncio.run(from_handler())
+        
+        assert [r.query for r in results] == ["SELECT 'first'", "SELECT 'second'"]
+        assert calls == [SQLQueryBatch]
+    
+    def test_running_loop_applies_per_call_timeout(self, converter):
+        async def create_completion(response_model, messages, temperature=0.1, max_retries=2):
+            if messages[-1]["content"] == "hung":
+                await asyncio.sleep(10)
+            return SQLQuery(query="SELECT 1", explanation="ok", confidence=0.9)
+        
+        async def from_handler():
+            return converter.batch_generate(["hung", "fast"], timeout=0.05)
+        
+        with patch("src.core.converter.AsyncLLMClient") as client_cls:
+            client_cls.return_value.create_completion = create_completion
+            started = time.monotonic()
+            results = asyncio.run(from_handler())
+        
+        assert time.monotonic() - started < 5
+        assert [r.query for r in results] == ["-- Error generating query", "SELECT 1"]
+    
+    def test_offline_maps_batch_output_by_custom_id(self, converter):
+        converter.llm_config.provider = LLMProvider.OPENAI
+        converter.model = "gpt-4o-mini"
+        raw_client = Mock()
+        converter.client = Mock(client=raw_client)
+        raw_client.batches.create.return_value = Mock(id="batch_1", status="in_progress")
+        raw_client.batches.retrieve.return_value = Mock(
+            id="batch_1", status="completed", output_file_id="out", error_file_id=None
+        )
+        sql = SQLQuery(query="SELECT 'last'", explanation="ok", confidence=0.9)
+        output = [
+            {"custom_id": "2", "response": {"status_code": 200, "body": {"choices": [{"message": {
+                "tool_calls": [{"function": {"arguments": sql.model_dump_json()}}]
+            }}]}}},
+            {"custom_id": "0", "response": {"status_code": 400, "body": {"error": "bad"}}},
+        ]
+        raw_client.files.content.return_value.text = "\n".join(json.dumps(line) for line in output)
+        
+        results = converter.batch_generate_offline(["first", "Show tables", "last"], poll_interval=0)
+        
+        assert [r.query for r in results] == ["-- Error generating query", "SELECT 1", "SELECT 'last'"]
+        submitted = raw_client.files.create.call_args.kwargs["file"][1].decode().splitlines()
+        assert [json.loads(line)["custom_id"] for line in submitted] == ["0", "2"]
+        assert json.loads(submitted[0])["url"] == "/v1/chat/completions"
+    
+    def test_offline_uses_azure_batch_endpoint(self, converter):
+        converter.llm_config.provider = LLMProvider.AZURE_OPENAI
+        converter.model = "my-gpt4o-deployment"
+        raw_client = Mock()
+        converter.client = Mock(client=raw_client)
+        raw_client.batches.create.return_value = Mock(
+            id="batch_1", status="completed", output_file_id=None, error_file_id=None
+        )
+        
+        converter.batch_generate_offline(["first"], poll_interval=0)
+        
+        request = json.loads(raw_client.files.create.call_args.kwargs["file"][1].decode())
+        assert request["url"] == "/chat/completions"
+        assert request["body"]["model"] == "my-gpt4o-deployment"
+        assert raw_client.batches.create.call_args.kwargs["endpoint"] == "/chat/completions"
+
+
+class TestAsyncValidateAndProcess:
+    """Test validation of generated SQL in the async converter"""
+    
+    @pytest.fixture
+    def converter(self):
+        """Converter over a one-table schema, with self-correction stubbed out"""
+        converter = AsyncNL2SQLConverter.__new__(AsyncNL2SQLConverter)
+        converter.sql_validator = SQLValidator(table_names=["users"], column_map={"users": ["id", "name"]})
+        converter.sql_postprocessor = SQLPostProcessor()
+        converter._table_name_set = frozenset({"users"})
+        with patch.object(AsyncNL2SQLConverter, "_async_self_correct", AsyncMock(return_value=None)):
+            yield converter
+    
+    def validate(self, converter, sql, **kwargs):
+        response = SQLQuery(query=sql, explanation="ok", confidence=0.95)
+        return asyncio.run(converter._validate_and_process(
+            response, "question", [], 0.1, enable_self_correction=True, **kwargs
+        ))
+    
+    def test_confident_query_on_unknown_table_is_corrected(self, converter):
+        result = self.validate(converter, "SELECT id FROM invented_table")
+        
+        converter._async_self_correct.assert_awaited_once()
+        assert result.potential_issues
+        assert result.confidence < 0.9
+    
+    def test_confident_query_on_known_table_skips_validation(self, converter):
+        result = self.validate(converter, "SELECT id FROM users")
+        
+        converter._async_self_correct.assert_not_awaited()
+        assert not result.potential_issues
+    
+    def test_precomputed_invalid_result_is_not_dropped(self, converter):
+        streamed = converter.sql_validator.validate("SELECT users.missing_column FROM users")
+        assert not streamed.is_valid
+        
+        result = self.validate(converter, "SELECT users.missing_column FROM users", validation_result=streamed)
+        
+        converter._async_self_correct.assert_awaited_once()
+        assert result.potential_issues
+
+
 class TestSQLQueryModel:
     """Test SQLQuery model validation"""
     
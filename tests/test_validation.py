@@ -125,6 +125,21 @@ class TestExtractTableNames:
         query = "SELECT u.name FROM users u"
         tables = extract_table_names(query)
         assert "users" in tables
+    
+    def test_skip_cte_names(self):
+        query = "WITH t AS (SELECT id FROM orders) SELECT * FROM t"
+        tables = extract_table_names(query)
+        assert tables == ["orders"]
+    
+    def test_skip_derived_table_alias(self):
+        query = "SELECT x.name FROM (SELECT name FROM users) AS x"
+        tables = extract_table_names(query)
+        assert tables == ["users"]
+    
+    def test_skip_table_valued_function(self):
+        query = "SELECT * FROM generate_series(1, 10) AS g JOIN orders ON orders.id = g"
+        tables = extract_table_names(query)
+        assert tables == ["orders"]
 
 
 class TestValidateQueryAgainstSchema: